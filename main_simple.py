@@ -1,21 +1,23 @@
 # main_simple.py
-# Wersja 4.1: Usunięto logikę obliczania skuteczności VAD.
+# Wersja 4.4: Przechwytywanie w natywnej częstotliwości urządzenia, przepróbkowanie do 16 kHz w aplikacji.
 
-import configparser
-import sys
 import time
+_PROCESS_START = time.perf_counter() # Punkt odniesienia dla statystyk uruchamiania
+
+import sys
 import numpy as np
-import sounddevice as sd
-import pyperclip
 import subprocess
 import threading
-from faster_whisper import WhisperModel
-from pynput import keyboard, mouse
 import logging
 
 from src.audio_preprocessing import apply_preprocessing_pipeline, SAMPLE_RATE
 from src.logger_setup import setup_loggers
-from src.core_utils import load_configuration, load_model
+from src.core_utils import load_configuration, BackgroundModelLoader, StartupTimer
+from src.audio_capture import PersistentAudioCapture
+from src.resampler import open_input_stream
+from src.session_metrics import SessionMetrics, create_metrics_writer
+from src import metrics_server
+from src import memory_budget
 
 # --- Inicjalizacja Loggerów ---
 app_logger = logging.getLogger('app')
@@ -28,35 +30,70 @@ is_recording = False
 audio_frames = []
 app_settings = {}
 recording_stop_time = 0
+audio_capture = None # PersistentAudioCapture w trybie capture_mode = persistent
+metrics_writer = None # MetricsWriter – zapis rekordów JSONL sesji (None = wyłączone)
 
-def record_and_transcribe(settings, model_instance):
+def record_and_transcribe(settings, model_loader):
     global audio_frames, recording_stop_time
     app_logger.info("\n🎙️  Nagrywanie... Mów teraz.")
+    session_metrics = SessionMetrics(settings, mode='simple')
+    recording_start_time = time.time()
+    overflows_at_start = metrics_server.AUDIO_CALLBACK_STATUS.value('input_overflow')
     audio_frames = []
-    def audio_callback(indata, frames, time, status):
-        if status: app_logger.warning(f"Status strumienia audio: {status}", file=sys.stderr)
-        audio_frames.append(indata.copy())
-    stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype='float32', callback=audio_callback)
-    stream.start()
-    while is_recording:
-        time.sleep(0.1)
-    stream.stop()
-    stream.close()
+    
+    # Tryb budżetu pamięci: całe nagranie jest trzymane w pamięci, więc jego długość jest ograniczona
+    limit_seconds = memory_budget.recording_limit_seconds(settings)
+    limit_samples = int(limit_seconds * SAMPLE_RATE) if limit_seconds is not None else None
+    collected = {'samples': 0, 'truncated': False}
+    def collect_block(block):
+        if limit_samples is not None and collected['samples'] >= limit_samples:
+            collected['truncated'] = True
+            return
+        audio_frames.append(block)
+        collected['samples'] += len(block)
+    
+    if audio_capture is not None:
+        # Stały strumień: nagranie zaczyna się od bufora pre-roll
+        audio_capture.begin_session(collect_block)
+        while is_recording:
+            time.sleep(0.1)
+        audio_capture.end_session()
+    else:
+        def audio_callback(block, status):
+            if status:
+                metrics_server.count_callback_status(status)
+                app_logger.warning("Status strumienia audio: %s", status)
+            collect_block(block)
+        stream, _ = open_input_stream(audio_callback, settings.capture_samplerate)
+        stream.start()
+        while is_recording:
+            time.sleep(0.1)
+        stream.stop()
+        stream.close()
     app_logger.info("🎙️  Nagrywanie zatrzymane.")
+    session_metrics.extra['input_overflows'] = int(metrics_server.AUDIO_CALLBACK_STATUS.value('input_overflow') - overflows_at_start)
     if not audio_frames:
         app_logger.warning("Nie nagrano żadnego dźwięku.")
         return
+    if collected['truncated']:
+        app_logger.warning(f"⚠️ Nagranie ucięte do {limit_seconds:.0f}s (memory_budget_mb). Do długich dyktowań użyj main_streaming.py.")
     raw_audio_data = np.concatenate(audio_frames, axis=0).flatten().astype(np.float32)
+    audio_frames = [] # Bloki nie są już potrzebne – zwalniamy je przed przetwarzaniem
+    
+    if not model_loader.is_ready():
+        transcription_logger.info("⏳ Model jeszcze się ładuje – nagranie zostanie przetworzone, gdy będzie gotowy...")
+    model_instance = model_loader.wait()
     
+    processing_start_time = time.time()
     processed_audio = apply_preprocessing_pipeline(raw_audio_data)
+    preprocessing_duration = time.time() - processing_start_time
     original_duration_seconds = len(processed_audio) / SAMPLE_RATE
     
-    lang_setting = settings['language']
-    language_for_model = None if lang_setting.lower() == 'auto' else lang_setting
+    language_for_model = settings.model_language
     
     transcription_logger.info("🧠 Rozpoczynanie transkrypcji...")
     transcription_logger.info(f"   -> Długość audio (po preprocessingu): {original_duration_seconds:.2f}s")
-    transcription_logger.debug(f"   -> Używane parametry: VAD={settings['vad_filter']}, LogProb={settings['log_prob_threshold']}, NoSpeech={settings['no_speech_threshold']}")
+    transcription_logger.debug(f"   -> Używane parametry: VAD={settings.vad_filter}, LogProb={settings.log_prob_threshold}, NoSpeech={settings.no_speech_threshold}")
     
     transcription_start_time = time.time()
     
@@ -64,9 +101,9 @@ def record_and_transcribe(settings, model_instance):
         processed_audio,
         language=language_for_model,
         beam_size=5,
-        vad_filter=settings['vad_filter'],
-        log_prob_threshold=settings['log_prob_threshold'],
-        no_speech_threshold=settings['no_speech_threshold']
+        vad_filter=settings.vad_filter,
+        log_prob_threshold=settings.log_prob_threshold,
+        no_speech_threshold=settings.no_speech_threshold
     )
     
     if language_for_model is None:
@@ -77,10 +114,16 @@ def record_and_transcribe(settings, model_instance):
     transcription_end_time = time.time()
     
     transcription_duration = transcription_end_time - transcription_start_time
+    session_metrics.add_chunk("FULL_RECORDING", original_duration_seconds, processing_start_time - recording_stop_time,
+                              preprocessing_duration, transcription_duration)
+    session_metrics.recording_duration = recording_stop_time - recording_start_time
+    session_metrics.user_latency = transcription_end_time - recording_stop_time
+    session_metrics.text_length = len(final_text.strip())
     
     app_logger.info("\n--- Wynik Końcowy ---")
     app_logger.info(f"Tekst: {final_text}")
     if final_text.strip():
+        import pyperclip
         before_clipboard_time = time.time()
         pyperclip.copy(final_text)
         after_clipboard_time = time.time()
@@ -110,12 +153,16 @@ def record_and_transcribe(settings, model_instance):
             app_logger.error("❌ BŁĄD: Polecenie 'xdotool' nie zostało znalezione.")
         except Exception as e:
             app_logger.error(f"❌ Błąd podczas wklejania tekstu: {e}")
+        session_metrics.paste_time = time.time() - before_clipboard_time
+    
+    if metrics_writer is not None:
+        metrics_writer.submit(session_metrics)
 
-def start_recording_flag(model_instance): # ZMIANA: Funkcja przyjmuje model jako argument
+def start_recording_flag(model_loader): # ZMIANA: Funkcja przyjmuje loader modelu jako argument
     global is_recording
     if not is_recording:
         is_recording = True
-        threading.Thread(target=record_and_transcribe, args=(app_settings, model_instance)).start() 
+        threading.Thread(target=record_and_transcribe, args=(app_settings, model_loader)).start() 
 
 def stop_recording_flag():
     global is_recording, recording_stop_time
@@ -124,6 +171,7 @@ def stop_recording_flag():
         is_recording = False
 
 def parse_hotkey(hotkey_string):
+    from pynput import keyboard, mouse
     hotkey_string = hotkey_string.lower().strip()
     if hotkey_string.startswith('mouse:'):
         button_name = hotkey_string.split(':')[1].strip()
@@ -153,13 +201,24 @@ def parse_hotkey(hotkey_string):
         return {'type': 'keyboard', 'key_set': keys}
 
 if __name__ == "__main__":
+    startup_timer = StartupTimer(origin=_PROCESS_START)
     setup_loggers()
     
     app_logger.info("--- Uruchamianie Lokalnego Asystenta Dyktowania (Wersja Wsadowa) ---")
     app_settings = load_configuration()
-    model_instance = load_model(app_settings) 
-    hotkey_str = app_settings['hotkey']
-    hotkey_config = parse_hotkey(hotkey_str)
+    model_loader = BackgroundModelLoader(app_settings, timer=startup_timer, preload=('sounddevice',)).start()
+    metrics_writer = create_metrics_writer(app_settings)
+    if app_settings.capture_mode == 'persistent':
+        with startup_timer.phase("otwarcie stałego strumienia audio"):
+            try:
+                audio_capture = PersistentAudioCapture(app_settings.preroll_seconds, app_settings.capture_samplerate).start()
+            except Exception as e:
+                app_logger.error(f"❌ Nie udało się otworzyć stałego strumienia audio, używam trybu on_demand: {e}")
+                audio_capture = None
+    hotkey_str = app_settings.hotkey
+    with startup_timer.phase("import pynput i parsowanie skrótu"):
+        from pynput import keyboard, mouse
+        hotkey_config = parse_hotkey(hotkey_str)
     
     if not hotkey_config:
         app_logger.critical("❌ BŁĄD KRYTYCZNY: Nie udało się sparsować skrótu. Kończenie pracy.")
@@ -175,7 +234,7 @@ if __name__ == "__main__":
         def on_press_keyboard(key):
             if key in HOTKEY_COMBINATION:
                 current_keys.add(key)
-                if current_keys == HOTKEY_COMBINATION: start_recording_flag(model_instance) 
+                if current_keys == HOTKEY_COMBINATION: start_recording_flag(model_loader) 
         def on_release_keyboard(key):
             if key in HOTKEY_COMBINATION:
                 stop_recording_flag()
@@ -186,10 +245,14 @@ if __name__ == "__main__":
         MOUSE_BUTTON = hotkey_config['button']
         def on_click_mouse(x, y, button, pressed):
             if button == MOUSE_BUTTON:
-                if pressed: start_recording_flag(model_instance) 
+                if pressed: start_recording_flag(model_loader) 
                 else: stop_recording_flag()
         listener = mouse.Listener(on_click=on_click_mouse)
 
     if listener:
         with listener:
+            startup_timer.mark("listener skrótu aktywny")
+            model_loader.wait()
+            startup_timer.mark("gotowość (time-to-ready)")
+            startup_timer.report()
             listener.join()
\ No newline at end of file
@@ -1,36 +1,55 @@
 # record_raw.py
-# Proste narzędzie do nagrywania surowego, nieprzetworzonego audio do pliku WAV.
-# Użycie: python record_raw.py <nazwa_pliku_wyjsciowego.wav>
+# Proste narzędzie do nagrywania surowego, nieprzetworzonego audio do pliku WAV, FLAC lub Opus.
+# Bloki są zapisywane na dysk na bieżąco (pamięć nie rośnie z długością nagrania), a nagłówek
+# WAV jest aktualizowany co sekundę – po awarii plik jest poprawny do ostatniej aktualizacji.
+# Nagranie można transkrybować w trakcie: python transcribe_file.py <plik> --follow
+# Strumień pracuje w natywnej częstotliwości urządzenia; plik ma zawsze 16 kHz (src/resampler.py).
+# Użycie: python record_raw.py <nazwa_pliku_wyjsciowego.wav|.flac|.opus> [--samplerate 0]
 
-import sounddevice as sd
-import numpy as np
-from scipy.io.wavfile import write
 import argparse
+import os
+import queue
 import sys
 
+# Dodaj katalog główny do ścieżki, aby umożliwić import
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.audio_io import open_audio_writer
+from src.audio_preprocessing import SAMPLE_RATE
+from src.resampler import open_input_stream
+
 # --- Konfiguracja ---
-SAMPLE_RATE = 16000  # 16kHz
 CHANNELS = 1         # Mono
 
 def main():
     # --- Parsowanie argumentów linii poleceń ---
     parser = argparse.ArgumentParser(
-        description="Nagrywa surowe audio z mikrofonu do pliku WAV."
+        description="Nagrywa surowe audio z mikrofonu do pliku WAV, FLAC lub Opus (według rozszerzenia)."
     )
     parser.add_argument(
         "filename",
-        help="Ścieżka do pliku wyjściowego, np. 'sibilants_test.wav'"
+        help="Ścieżka do pliku wyjściowego, np. 'sibilants_test.wav' lub 'spotkanie.flac'"
+    )
+    parser.add_argument(
+        "--samplerate", type=int, default=0,
+        help="Częstotliwość strumienia w Hz (0 = natywna urządzenia, domyślnie); plik ma zawsze 16 kHz."
     )
     args = parser.parse_args()
 
-    # Lista do przechowywania nagranych fragmentów audio
-    audio_frames = []
+    # Bloki z callbacku trafiają do kolejki; zapis na dysk odbywa się w wątku głównym,
+    # aby operacje plikowe nie opóźniały callbacku audio
+    block_queue = queue.Queue()
 
-    def audio_callback(indata, frames, time, status):
-        """Ta funkcja jest wywoływana dla każdego nowego bloku audio."""
+    def audio_callback(block, status):
+        """Ta funkcja jest wywoływana dla każdego nowego bloku audio (już w 16 kHz)."""
         if status:
             print(f"Status strumienia: {status}", file=sys.stderr)
-        audio_frames.append(indata.copy())
+        block_queue.put(block)
+
+    try:
+        writer = open_audio_writer(args.filename, SAMPLE_RATE, CHANNELS)
+    except Exception as e:
+        print(f"❌ Nie udało się utworzyć pliku: {e}")
+        sys.exit(1)
 
     print("--- Rozpoczynanie Nagrywania Surowego Audio ---")
     print(f"Plik wyjściowy: {args.filename}")
@@ -38,36 +57,35 @@ def main():
 
     try:
         # --- Uruchomienie strumienia nagrywania ---
-        with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype='float32', callback=audio_callback):
-            # Pętla czeka na przerwanie przez użytkownika (Ctrl+C)
+        stream, resampler = open_input_stream(audio_callback, args.samplerate)
+        print(f"Strumień: {resampler.input_rate} Hz -> plik: {SAMPLE_RATE} Hz")
+        with stream:
+            # Pętla zapisuje bloki aż do przerwania przez użytkownika (Ctrl+C)
             while True:
-                sd.sleep(1000) # Czekaj w pętli, callback wykonuje pracę w tle
+                try:
+                    writer.write(block_queue.get(timeout=0.5))
+                except queue.Empty:
+                    continue
 
     except KeyboardInterrupt:
         print("\n🎙️  Nagrywanie zatrzymane przez użytkownika.")
 
     except Exception as e:
         print(f"❌ Wystąpił błąd podczas nagrywania: {e}")
+        writer.close()
         sys.exit(1)
 
-    if not audio_frames:
+    # Zapis bloków, które zostały w kolejce po zatrzymaniu strumienia
+    while not block_queue.empty():
+        writer.write(block_queue.get_nowait())
+    writer.close()
+
+    if writer.frames == 0:
+        os.remove(args.filename)
         print("⚠️ Nie nagrano żadnego dźwięku. Plik nie został zapisany.")
         return
 
-    print("\n💾 Przetwarzanie i zapisywanie pliku...")
-
-    # Połącz wszystkie fragmenty w jeden ciągły sygnał
-    audio_data_float32 = np.concatenate(audio_frames, axis=0)
-
-    # Konwertuj format z float32 (-1.0 do 1.0) na int16 (standard dla WAV)
-    audio_data_int16 = np.int16(audio_data_float32 * 32767)
-
-    # Zapisz plik WAV
-    try:
-        write(args.filename, SAMPLE_RATE, audio_data_int16)
-        print(f"✅ Plik z surowym audio został pomyślnie zapisany w: {args.filename}")
-    except Exception as e:
-        print(f"❌ Nie udało się zapisać pliku: {e}")
+    print(f"✅ Plik z surowym audio ({writer.duration:.1f}s) został pomyślnie zapisany w: {args.filename}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,156 @@
+# src/audio_capture.py
+"""
+Trwale otwarty strumień wejściowy z buforem pre-roll.
+
+Zamiast otwierać nowy `sd.InputStream` przy każdym naciśnięciu skrótu
+(co ucina pierwsze sylaby i dodaje opóźnienie startu urządzenia), strumień
+działa cały czas i w bezczynności zapisuje dźwięk do małego bufora
+pierścieniowego. Sesja nagrania zaczyna się od zawartości tego bufora.
+Strumień pracuje w natywnej częstotliwości urządzenia; bloki są
+przepróbkowywane do 16 kHz w callbacku (src/resampler.py).
+"""
+import logging
+import threading
+import time
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+from src.resampler import open_input_stream
+from src import metrics_server
+
+app_logger = logging.getLogger('app')
+performance_logger = logging.getLogger('performance')
+
+CAPTURE_BLOCK_SECONDS = 0.05    # [s] Rozmiar bloku strumienia; większy = mniej wybudzeń w bezczynności.
+
+
+class PrerollBuffer:
+    """Bufor pierścieniowy o stałym rozmiarze, przechowujący ostatnie N próbek."""
+
+    def __init__(self, num_samples):
+        self.capacity = max(0, int(num_samples))
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        self._write_pos = 0
+        self._filled = 0
+
+    def write(self, samples):
+        if self.capacity == 0:
+            return
+        samples = samples[-self.capacity:]
+        n = len(samples)
+        end = self._write_pos + n
+        if end <= self.capacity:
+            self._data[self._write_pos:end] = samples
+        else:
+            first = self.capacity - self._write_pos
+            self._data[self._write_pos:] = samples[:first]
+            self._data[:n - first] = samples[first:]
+        self._write_pos = end % self.capacity
+        self._filled = min(self.capacity, self._filled + n)
+
+    def read(self):
+        """Zwraca kopię zawartości bufora w kolejności chronologicznej i go opróżnia."""
+        if self._filled < self.capacity:
+            start = (self._write_pos - self._filled) % self.capacity if self.capacity else 0
+            if start + self._filled <= self.capacity:
+                out = self._data[start:start + self._filled].copy()
+            else:
+                out = np.concatenate((self._data[start:], self._data[:self._write_pos]))
+        else:
+            out = np.concatenate((self._data[self._write_pos:], self._data[:self._write_pos]))
+        self._filled = 0
+        return out
+
+
+class PersistentAudioCapture:
+    """
+    Strumień wejściowy otwarty przez cały czas działania aplikacji.
+
+    W bezczynności bloki trafiają do bufora pre-roll. `begin_session(sink)`
+    przekazuje do `sink` najpierw zawartość pre-rollu, a następnie każdy
+    kolejny blok (kształt (N, 1), float32, 16 kHz – jak w callbacku sounddevice).
+    `end_session()` dostarcza jeszcze bieżący blok i odłącza odbiorcę.
+    `capture_samplerate` to częstotliwość strumienia (0 = natywna urządzenia).
+    """
+
+    def __init__(self, preroll_seconds, capture_samplerate=0, block_seconds=CAPTURE_BLOCK_SECONDS):
+        self.samplerate = SAMPLE_RATE
+        self.capture_samplerate = capture_samplerate
+        self.block_seconds = block_seconds
+        self.preroll = PrerollBuffer(preroll_seconds * SAMPLE_RATE)
+        self._lock = threading.Lock()
+        self._sink = None
+        self._end_requested = False
+        self._session_closed = threading.Event()
+        self._stream = None
+
+        # Statystyki kosztu strumienia (CPU zużyte w callbacku)
+        self.callback_count = 0
+        self.callback_cpu_time = 0.0
+        self._opened_at = None
+
+    def start(self, stream_factory=open_input_stream):
+        """Otwiera strumień; `stream_factory` (jak `open_input_stream`) pozwala podać bloki syntetyczne."""
+        self._stream, resampler = stream_factory(self._callback, self.capture_samplerate, self.block_seconds)
+        self._stream.start()
+        self._opened_at = time.perf_counter()
+        app_logger.info(f"🎙️  Strumień audio otwarty na stałe ({resampler.input_rate} Hz, "
+                        f"pre-roll: {self.preroll.capacity / self.samplerate:.2f}s).")
+        return self
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _callback(self, block, status):
+        cpu_start = time.thread_time()
+        if status:
+            metrics_server.count_callback_status(status)
+            app_logger.warning("Status strumienia audio: %s", status)
+        with self._lock:
+            if self._sink is not None:
+                self._sink(block)
+                if self._end_requested:
+                    self._sink = None
+                    self._session_closed.set()
+            else:
+                self.preroll.write(block[:, 0])
+        self.callback_count += 1
+        self.callback_cpu_time += time.thread_time() - cpu_start
+
+    def begin_session(self, sink):
+        """Podłącza odbiorcę bloków; pierwszym blokiem jest zawartość pre-rollu."""
+        with self._lock:
+            preroll_audio = self.preroll.read()
+            if len(preroll_audio) > 0:
+                sink(preroll_audio.reshape(-1, 1))
+            self._end_requested = False
+            self._session_closed.clear()
+            self._sink = sink
+        return len(preroll_audio) / self.samplerate
+
+    def end_session(self):
+        """Dostarcza bieżący (niepełny) blok i odłącza odbiorcę."""
+        with self._lock:
+            if self._sink is None:
+                return
+            self._end_requested = True
+        # Czekamy na jeszcze jeden blok, aby nie uciąć końcówki nagrania.
+        if not self._session_closed.wait(timeout=4 * self.block_seconds):
+            with self._lock:
+                self._sink = None
+
+    def idle_cpu_percent(self):
+        """Średni udział CPU (jednego rdzenia) zużywany przez callback od otwarcia strumienia."""
+        if self._opened_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._opened_at
+        return 100.0 * self.callback_cpu_time / elapsed if elapsed > 0 else 0.0
+
+    def log_stats(self):
+        performance_logger.debug(
+            f"🎙️  Koszt otwartego strumienia: {self.idle_cpu_percent():.3f}% CPU "
+            f"({self.callback_count} callbacków, {self.callback_cpu_time * 1000:.1f} ms CPU łącznie)"
+        )
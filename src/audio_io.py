@@ -0,0 +1,283 @@
+# src/audio_io.py
+"""
+Strumieniowy zapis i odczyt plików audio.
+
+Odczyt (PyAV): plik jest dekodowany i przepróbkowywany do 16 kHz mono pakiet
+po pakiecie, a wynik oddawany w blokach o stałej długości – w pamięci nigdy
+nie ma całego nagrania. W trybie `follow` plik może być jeszcze zapisywany
+(np. przez record_raw.py): czytanie czeka na nowe dane, aż plik przestanie rosnąć.
+
+Zapis: bloki trafiają na dysk od razu po nagraniu. Nagłówek WAV jest
+aktualizowany co `HEADER_UPDATE_SECONDS`, więc po awarii plik jest poprawny
+do ostatniej aktualizacji. `av` jest zależnością faster-whisper i jest
+importowany leniwie.
+"""
+import io
+import os
+import struct
+import time
+
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+
+FILE_BLOCK_SECONDS = 0.5    # [s] Długość bloku oddawanego przez iter_audio_blocks
+HEADER_UPDATE_SECONDS = 1.0 # [s] Co ile sekund nagrania WavFileWriter aktualizuje nagłówek i opróżnia bufor
+FOLLOW_POLL_SECONDS = 0.2   # [s] Odstęp sprawdzania, czy śledzony plik urósł
+FOLLOW_IDLE_SECONDS = 10.0  # [s] Brak nowych danych przez ten czas = koniec nagrania (tryb follow)
+
+# Format kontenera dla odczytu z nieprzewijalnego strumienia (tryb follow)
+_FOLLOW_FORMATS = {'.wav': 'wav', '.flac': 'flac', '.ogg': 'ogg', '.opus': 'ogg', '.mp3': 'mp3'}
+
+
+class AudioFileError(Exception):
+    """Pliku nie da się otworzyć lub nie zawiera ścieżki audio."""
+
+
+# --- Zapis ---
+
+def _to_int16(block):
+    return (np.clip(np.asarray(block, dtype=np.float32), -1.0, 1.0) * 32767).astype(np.int16)
+
+
+class WavFileWriter:
+    """Zapis 16-bitowego PCM WAV blok po bloku, z okresową aktualizacją nagłówka."""
+
+    def __init__(self, path, samplerate=SAMPLE_RATE, channels=1):
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.frames = 0
+        self._frames_at_update = 0
+        self._file = open(path, 'wb')
+        self._file.write(self._header(0))
+
+    def _header(self, data_bytes):
+        block_align = self.channels * 2
+        return (b'RIFF' + struct.pack('<I', 36 + data_bytes) + b'WAVE'
+                + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, self.channels, self.samplerate,
+                                        self.samplerate * block_align, block_align, 16)
+                + b'data' + struct.pack('<I', data_bytes))
+
+    def write(self, block):
+        samples = _to_int16(block).reshape(-1, self.channels)
+        self._file.write(samples.tobytes())
+        self.frames += len(samples)
+        if self.frames - self._frames_at_update >= HEADER_UPDATE_SECONDS * self.samplerate:
+            self.update_header()
+
+    def update_header(self):
+        """Wpisuje bieżący rozmiar danych do nagłówka i opróżnia bufor pliku."""
+        self._file.seek(0)
+        self._file.write(self._header(self.frames * self.channels * 2))
+        self._file.seek(0, os.SEEK_END)
+        self._file.flush()
+        self._frames_at_update = self.frames
+
+    def close(self):
+        if not self._file.closed:
+            self.update_header()
+            self._file.close()
+
+    @property
+    def duration(self):
+        return self.frames / self.samplerate
+
+
+class FlacFileWriter:
+    """
+    Zapis FLAC przez PyAV. Ramki trafiają do pliku w trakcie nagrywania; nagłówek
+    STREAMINFO (łączna liczba próbek) jest uzupełniany przy zamknięciu, ale
+    niedomknięty plik nadal daje się zdekodować.
+    """
+    CONTAINER = 'flac'
+    CODEC = 'flac'
+    BIT_RATE = None
+
+    def __init__(self, path, samplerate=SAMPLE_RATE, channels=1):
+        import av
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.frames = 0
+        self._layout = 'mono' if channels == 1 else 'stereo'
+        # flush_packets: każda ramka trafia do pliku od razu (bez bufora avio), co pozwala go śledzić
+        self._container = av.open(path, 'w', format=self.CONTAINER, options={'flush_packets': '1'})
+        self._stream = self._container.add_stream(self.CODEC, rate=samplerate)
+        self._stream.layout = self._layout
+        if self.BIT_RATE:
+            self._stream.bit_rate = self.BIT_RATE
+
+    def write(self, block):
+        import av
+        samples = _to_int16(block).reshape(-1, self.channels)
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format='s16', layout=self._layout)
+        frame.sample_rate = self.samplerate
+        frame.pts = self.frames
+        self.frames += len(samples)
+        for packet in self._stream.encode(frame):
+            self._container.mux(packet)
+
+    def close(self):
+        if self._container is not None:
+            for packet in self._stream.encode(None):
+                self._container.mux(packet)
+            self._container.close()
+            self._container = None
+
+    @property
+    def duration(self):
+        return self.frames / self.samplerate
+
+
+class OpusFileWriter(FlacFileWriter):
+    """Zapis Opus (kontener Ogg) przez PyAV – stratny, ok. 10x mniejszy niż FLAC przy mowie."""
+    CONTAINER = 'ogg'
+    CODEC = 'libopus'
+    BIT_RATE = 24000
+
+
+def open_audio_writer(path, samplerate=SAMPLE_RATE, channels=1):
+    """WavFileWriter, FlacFileWriter lub OpusFileWriter zależnie od rozszerzenia pliku."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.flac':
+        return FlacFileWriter(path, samplerate, channels)
+    if extension == '.opus':
+        return OpusFileWriter(path, samplerate, channels)
+    return WavFileWriter(path, samplerate, channels)
+
+
+# --- Odczyt ---
+
+def _wav_size_offsets(header):
+    """Pozycje pól rozmiaru (RIFF i `data`) w nagłówku WAV lub None, gdy nagłówek jest niepełny."""
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    position = 12
+    while position + 8 <= len(header):
+        chunk_id, chunk_size = header[position:position + 4], struct.unpack('<I', header[position + 4:position + 8])[0]
+        if chunk_id == b'data':
+            return (4, position + 4)
+        position += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+class FollowedFile(io.RawIOBase):
+    """
+    Plik czytany w trakcie zapisu: przy braku nowych danych odczyt czeka, a koniec
+    pliku jest zgłaszany po `idle_timeout` sekundach bez wzrostu. W plikach WAV pola
+    rozmiaru są podmieniane na „nieznany”, bo nagłówek opisuje tylko dane zapisane
+    przy jego ostatniej aktualizacji.
+    """
+
+    def __init__(self, path, idle_timeout=FOLLOW_IDLE_SECONDS):
+        self._file = open(path, 'rb')
+        self._position = 0
+        self._idle_timeout = idle_timeout
+        self._patch_offsets = ()
+        if path.lower().endswith('.wav'):
+            offsets = None
+            deadline = time.monotonic() + idle_timeout
+            while offsets is None and time.monotonic() < deadline:
+                offsets = _wav_size_offsets(self._file.read(4096))
+                self._file.seek(0)
+                if offsets is None:
+                    time.sleep(FOLLOW_POLL_SECONDS)
+            self._patch_offsets = offsets or ()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        idle_since = time.monotonic()
+        while True:
+            count = self._file.readinto(buffer)
+            if count:
+                self._patch(buffer, count)
+                self._position += count
+                return count
+            if time.monotonic() - idle_since >= self._idle_timeout:
+                return 0
+            time.sleep(FOLLOW_POLL_SECONDS)
+
+    def _patch(self, buffer, count):
+        for offset in self._patch_offsets:
+            start = offset - self._position
+            if 0 <= start and start + 4 <= count:
+                buffer[start:start + 4] = b'\xff\xff\xff\xff'
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _open_container(path, follow, idle_timeout):
+    import av
+    try:
+        if follow:
+            source = io.BufferedReader(FollowedFile(path, idle_timeout))
+            return av.open(source, format=_FOLLOW_FORMATS.get(os.path.splitext(path)[1].lower()))
+        return av.open(path)
+    except av.error.FFmpegError as e:
+        raise AudioFileError(f"Nie udało się otworzyć pliku audio: {e}") from e
+
+
+def probe_duration(path):
+    """Długość nagrania w sekundach z nagłówka kontenera (None, gdy nieznana)."""
+    import av
+    try:
+        with av.open(path) as container:
+            if container.duration is not None:
+                return container.duration / av.time_base
+            stream = container.streams.audio[0] if container.streams.audio else None
+            if stream is not None and stream.duration is not None:
+                return float(stream.duration * stream.time_base)
+    except av.error.FFmpegError:
+        pass
+    return None
+
+
+def iter_audio_blocks(path, block_seconds=FILE_BLOCK_SECONDS, samplerate=SAMPLE_RATE, follow=False,
+                      idle_timeout=FOLLOW_IDLE_SECONDS):
+    """
+    Generator bloków float32 (mono, `samplerate`) o długości `block_seconds`.
+    Ostatni blok może być krótszy. Z `follow=True` czyta plik w trakcie zapisu.
+    Rzuca AudioFileError przy błędzie otwarcia pliku.
+    """
+    import av
+    block_size = max(1, int(block_seconds * samplerate))
+    container = _open_container(path, follow, idle_timeout)
+
+    with container:
+        if not container.streams.audio:
+            raise AudioFileError(f"Plik nie zawiera ścieżki audio: {path}")
+        stream = container.streams.audio[0]
+        stream.thread_type = "AUTO"
+        resampler = av.AudioResampler(format='flt', layout='mono', rate=samplerate)
+        block = np.empty(block_size, dtype=np.float32)
+        filled = 0
+
+        def frames():
+            for frame in container.decode(stream):
+                yield from resampler.resample(frame)
+            yield from resampler.resample(None)  # Opróżnienie bufora resamplera
+
+        for frame in frames():
+            samples = frame.to_ndarray().reshape(-1)
+            position = 0
+            while position < len(samples):
+                count = min(block_size - filled, len(samples) - position)
+                block[filled:filled + count] = samples[position:position + count]
+                filled += count
+                position += count
+                if filled == block_size:
+                    yield block.copy()
+                    filled = 0
+        if filled:
+            yield block[:filled].copy()
+
+
+def load_audio(path, samplerate=SAMPLE_RATE):
+    """Całe nagranie jako jedna tablica float32 (krótkie pliki, np. klipy benchmarku)."""
+    blocks = list(iter_audio_blocks(path, samplerate=samplerate))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
@@ -4,11 +4,12 @@ Moduł odpowiedzialny za zaawansowane przetwarzanie wstępne sygnału audio.
 """
 import time
 import numpy as np
-import noisereduce as nr
-from pydub import AudioSegment
-from pydub.effects import normalize
 import logging
 
+# UWAGA: noisereduce i pydub są importowane leniwie wewnątrz funkcji.
+# Ich import (scipy, librosa-podobne zależności) kosztuje setki milisekund,
+# a nie są potrzebne, dopóki nie pojawi się pierwszy fragment audio.
+
 logger = logging.getLogger('preprocessing')
 
 # --- Globalne Parametry Potoku Przetwarzania ---
@@ -25,6 +26,7 @@ def dynamic_de_esser_smooth(audio_segment, threshold_db, freq_start, freq_end, a
     """
     Dynamiczny de-esser z wygładzaniem (fade in/out) w celu eliminacji trzasków.
     """
+    from pydub import AudioSegment
     sibilance_band = audio_segment.high_pass_filter(freq_start).low_pass_filter(freq_end)
     chunk_length_ms = 10
     is_attenuating = False
@@ -57,18 +59,24 @@ def apply_preprocessing_pipeline(audio_data_float32):
     pipeline_start_time = time.time()
     last_step_time = pipeline_start_time
     try:
-        audio_data_int16 = np.int16(audio_data_float32 * 32767)
+        import noisereduce as nr
+        from pydub import AudioSegment
+        from pydub.effects import normalize
+
+        # Kolejne etapy pracują na kopiach; pośrednie segmenty są zwalniane zaraz po użyciu,
+        # aby w pamięci nie było jednocześnie kilku wersji tego samego fragmentu.
         audio_segment = AudioSegment(
-            audio_data_int16.tobytes(),
+            (audio_data_float32 * 32767).astype(np.int16).tobytes(),
             frame_rate=SAMPLE_RATE,
-            sample_width=audio_data_int16.dtype.itemsize,
+            sample_width=2,
             channels=1
         )
 
         logger.debug("   - Krok 1: Normalizacja głośności...")
         normalized_segment = normalize(audio_segment)
+        del audio_segment
         current_time = time.time()
-        logger.debug(f"     (czas: {current_time - last_step_time:.2f}s)")
+        logger.debug("     (czas: %.2fs)", current_time - last_step_time)
         last_step_time = current_time
 
         logger.debug("   - Krok 2: Aplikowanie de-essera z wygładzaniem...")
@@ -77,17 +85,21 @@ def apply_preprocessing_pipeline(audio_data_float32):
             DEESSER_THRESH_DB, DEESSER_FREQ_START, DEESSER_FREQ_END,
             DEESSER_ATTENUATION_DB, DEESSER_ATTACK_MS, DEESSER_RELEASE_MS
         )
+        del normalized_segment
         current_time = time.time()
-        logger.debug(f"     (czas: {current_time - last_step_time:.2f}s)")
+        logger.debug("     (czas: %.2fs)", current_time - last_step_time)
         last_step_time = current_time
 
-        logger.debug(f"   - Krok 3: Podbicie głośności o +{FINAL_GAIN_DB} dB...")
+        logger.debug("   - Krok 3: Podbicie głośności o +%s dB...", FINAL_GAIN_DB)
         boosted_segment = deessed_segment + FINAL_GAIN_DB
+        del deessed_segment
         current_time = time.time()
-        logger.debug(f"     (czas: {current_time - last_step_time:.2f}s)")
+        logger.debug("     (czas: %.2fs)", current_time - last_step_time)
         last_step_time = current_time
 
-        processed_before_nr = np.array(boosted_segment.get_array_of_samples(), dtype=np.float32) / 32767.0
+        processed_before_nr = np.frombuffer(boosted_segment.raw_data, dtype=np.int16).astype(np.float32)
+        del boosted_segment
+        processed_before_nr /= 32767.0
 
         logger.debug("   - Krok 4: Aplikowanie redukcji szumu...")
         noise_clip = processed_before_nr[:int(SAMPLE_RATE * 0.5)]
@@ -95,9 +107,9 @@ def apply_preprocessing_pipeline(audio_data_float32):
             y=processed_before_nr, y_noise=noise_clip, sr=SAMPLE_RATE, prop_decrease=0.85
         )
         current_time = time.time()
-        logger.debug(f"     (czas: {current_time - last_step_time:.2f}s)")
+        logger.debug("     (czas: %.2fs)", current_time - last_step_time)
         
-        logger.info(f"🔊 Przetwarzanie wstępne zakończone pomyślnie (całkowity czas: {time.time() - pipeline_start_time:.2f}s).")
+        logger.info("🔊 Przetwarzanie wstępne zakończone pomyślnie (całkowity czas: %.2fs).", time.time() - pipeline_start_time)
         return final_audio_float32
     except Exception as e:
         logger.warning(f"⚠️ OSTRZEŻENIE: Przetwarzanie wstępne nie powiodło się: {e}.")
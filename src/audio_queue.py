@@ -0,0 +1,252 @@
+# src/audio_queue.py
+"""
+Ograniczona kolejka przechwyconego audio (limit wyrażony w sekundach nagrania).
+
+`put()` (callback audio) tylko odkłada blok do skrzynki i budzi wątek podający
+– callback nigdy nie czeka ani nie pisze na dysk. Gdy transkrypcja nie nadąża,
+kolejka nie rośnie bez końca – po osiągnięciu limitu wątek podający stosuje
+jawną politykę (`audio_queue_policy` w config.ini):
+
+  block   - wątek podający czeka na miejsce (maks. BLOCK_TIMEOUT_SECONDS); jeśli
+            go nie ma, blok jest odrzucany i liczony jako utracone audio
+            (kolejne bloki są odrzucane od razu, aż zwolni się miejsce),
+  spill   - nadmiar trafia do pliku tymczasowego na dysku i jest odczytywany
+            w kolejności FIFO, gdy konsument nadrobi zaległości,
+  degrade - jak `block`, ale powyżej połowy limitu konsument transkrybuje
+            z mniejszą wiązką (DEGRADED_BEAM_SIZE), aby szybciej nadrobić.
+
+Kolejka zbiera statystyki sesji: maksymalną głębokość, czas spędzony za
+czasem rzeczywistym, ilość audio wyrzuconego na dysk i utraconego.
+"""
+import collections
+import os
+import queue
+import tempfile
+import threading
+import time
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+from src import metrics_server
+from src import memory_budget
+
+BLOCK_TIMEOUT_SECONDS = 1.0     # Maks. czas czekania wątku podającego na miejsce w pełnej kolejce
+BEHIND_REALTIME_SECONDS = 1.0   # Zaległość (audio w kolejce), od której uznajemy, że nie nadążamy
+DEGRADED_BEAM_SIZE = 1          # Wiązka używana w polityce `degrade` przy dużej zaległości
+
+
+class BoundedAudioQueue:
+    """
+    Kolejka FIFO bloków (N, 1) float32 z limitem `max_seconds` audio.
+
+    Interfejs jak `queue.Queue` w zakresie używanym przez wątki sesji:
+    `put(block)`, `get(timeout)` (zwraca `(chwila_przechwycenia, blok)`,
+    rzuca `queue.Empty`), `empty()`, `qsize()`, `clear()`. Po `end_input()`
+    `get()` bez limitu czasu oddaje resztę bloków, a potem rzuca `queue.Empty`
+    – konsument czeka na dane lub koniec nagrania bez odpytywania.
+    Bloki z `put()` trafiają do kolejki przez wątek podający (zob. opis modułu).
+    """
+
+    def __init__(self, max_seconds, policy='block', samplerate=SAMPLE_RATE):
+        self.policy = policy
+        self.samplerate = samplerate
+        self.max_samples = int(max_seconds * samplerate)
+        self._memory = collections.deque()      # (enqueued_at, blok)
+        self._memory_samples = 0
+        self._spilled = collections.deque()     # (enqueued_at, liczba próbek) bloków w pliku
+        self._spilled_samples = 0
+        self._spill_file = None
+        self._spill_read_pos = 0
+        self._dropping = False
+        self._input_ended = False
+        self._condition = threading.Condition()
+        # Skrzynka callbacku: bloki czekające na wątek podający
+        self._inbox = collections.deque()       # (enqueued_at, blok)
+        self._inbox_samples = 0
+        self._inbox_closed = False
+        self._inbox_condition = threading.Condition()
+        self.reset_stats()
+        self._feeder = threading.Thread(target=self._feed, name="audio-queue-feeder", daemon=True)
+        self._feeder.start()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Kolejka sesji; w trybie budżetu pamięci limit jest dodatkowo obcięty do budżetu."""
+        return cls(memory_budget.queue_limit_seconds(settings), settings.audio_queue_policy)
+
+    # --- Statystyki ---
+
+    def reset_stats(self):
+        with self._condition:
+            self.max_depth_seconds = 0.0
+            self.behind_realtime_seconds = 0.0
+            self.spilled_seconds = 0.0
+            self.dropped_seconds = 0.0
+            self._behind_since = None
+
+    def depth_seconds(self):
+        return (self._inbox_samples + self._memory_samples + self._spilled_samples) / self.samplerate
+
+    def _update_depth(self):
+        # Wywoływane pod blokadą po każdej zmianie zawartości kolejki
+        depth = self.depth_seconds()
+        self.max_depth_seconds = max(self.max_depth_seconds, depth)
+        now = time.perf_counter()
+        if depth > BEHIND_REALTIME_SECONDS:
+            if self._behind_since is None:
+                self._behind_since = now
+        elif self._behind_since is not None:
+            self.behind_realtime_seconds += now - self._behind_since
+            self._behind_since = None
+
+    def stats(self):
+        """Słownik statystyk sesji (do SessionMetrics)."""
+        with self._condition:
+            behind = self.behind_realtime_seconds
+            if self._behind_since is not None:
+                behind += time.perf_counter() - self._behind_since
+            return {
+                'queue_policy': self.policy,
+                'queue_max_depth_seconds': round(self.max_depth_seconds, 3),
+                'behind_realtime_seconds': round(behind, 3),
+                'spilled_seconds': round(self.spilled_seconds, 3),
+                'dropped_seconds': round(self.dropped_seconds, 3),
+            }
+
+    @property
+    def degraded(self):
+        """True, gdy w polityce `degrade` zaległość przekracza połowę limitu."""
+        return self.policy == 'degrade' and 2 * (self._memory_samples + self._spilled_samples) > self.max_samples
+
+    # --- Producent ---
+
+    def put(self, block, enqueued_at=None):
+        """Odkłada blok dla wątku podającego i wraca od razu (bezpieczne w callbacku audio)."""
+        enqueued_at = time.perf_counter() if enqueued_at is None else enqueued_at
+        with self._inbox_condition:
+            self._inbox.append((enqueued_at, block))
+            self._inbox_samples += len(block)
+            self._inbox_condition.notify()
+
+    def _feed(self):
+        """Wątek podający: przenosi bloki ze skrzynki do kolejki według polityki przepełnienia."""
+        while True:
+            with self._inbox_condition:
+                while not self._inbox and not self._inbox_closed:
+                    self._inbox_condition.wait()
+                if not self._inbox:
+                    break
+                enqueued_at, block = self._inbox.popleft()
+                self._inbox_samples -= len(block)
+            self._admit(enqueued_at, block)
+        # Wszystkie bloki sprzed end_input() są już w kolejce
+        with self._condition:
+            self._input_ended = True
+            self._condition.notify_all()
+
+    def _admit(self, enqueued_at, block):
+        samples = len(block)
+        with self._condition:
+            if self.policy == 'spill':
+                # Gdy coś czeka już na dysku, kolejne bloki też tam trafiają (zachowanie kolejności)
+                if self._spilled or self._memory_samples + samples > self.max_samples:
+                    self._spill(enqueued_at, block)
+                else:
+                    self._memory.append((enqueued_at, block))
+                    self._memory_samples += samples
+            else:
+                # Po odrzuceniu bloku nie czekamy ponownie, dopóki kolejka jest pełna
+                deadline = time.perf_counter() + (0.0 if self._dropping else BLOCK_TIMEOUT_SECONDS)
+                while self._memory_samples > 0 and self._memory_samples + samples > self.max_samples:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._dropping = True
+                        self.dropped_seconds += samples / self.samplerate
+                        metrics_server.AUDIO_DROPPED_SECONDS.inc(amount=samples / self.samplerate)
+                        return
+                    self._condition.wait(remaining)
+                self._memory.append((enqueued_at, block))
+                self._memory_samples += samples
+                self._dropping = False
+            self._update_depth()
+            self._condition.notify_all()
+
+    def _spill(self, enqueued_at, block):
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="dictation_audio_")
+        self._spill_file.seek(0, os.SEEK_END)
+        self._spill_file.write(np.ascontiguousarray(block, dtype=np.float32).tobytes())
+        self._spilled.append((enqueued_at, len(block)))
+        self._spilled_samples += len(block)
+        self.spilled_seconds += len(block) / self.samplerate
+
+    # --- Konsument ---
+
+    def end_input(self):
+        """Producent skończył (koniec nagrania): po podaniu reszty skrzynki budzi konsumenta czekającego w `get()`."""
+        with self._inbox_condition:
+            self._inbox_closed = True
+            self._inbox_condition.notify()
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._condition:
+            while not self._memory and not self._spilled and not self._input_ended:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            if self._memory:
+                enqueued_at, block = self._memory.popleft()
+                self._memory_samples -= len(block)
+            elif self._spilled:
+                enqueued_at, block = self._read_spilled()
+            else:
+                raise queue.Empty
+            self._update_depth()
+            self._condition.notify_all()
+        return enqueued_at, block
+
+    def _read_spilled(self):
+        enqueued_at, samples = self._spilled.popleft()
+        self._spilled_samples -= samples
+        self._spill_file.seek(self._spill_read_pos)
+        data = self._spill_file.read(samples * 4)
+        self._spill_read_pos += len(data)
+        if not self._spilled:
+            # Plik opróżniony – zaczynamy go od nowa, aby nie rósł
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_pos = 0
+        return enqueued_at, np.frombuffer(data, dtype=np.float32).reshape(-1, 1)
+
+    def empty(self):
+        with self._condition:
+            return not self._inbox and not self._memory and not self._spilled
+
+    def qsize(self):
+        with self._condition:
+            return len(self._inbox) + len(self._memory) + len(self._spilled)
+
+    def clear(self):
+        with self._inbox_condition:
+            self._inbox.clear()
+            self._inbox_samples = 0
+        with self._condition:
+            self._memory.clear()
+            self._memory_samples = 0
+            self._spilled.clear()
+            self._spilled_samples = 0
+            if self._spill_file is not None:
+                self._spill_file.seek(0)
+                self._spill_file.truncate()
+            self._spill_read_pos = 0
+            self._update_depth()
+            self._condition.notify_all()
+
+    def close(self):
+        self.end_input()
+        with self._condition:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
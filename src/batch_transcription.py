@@ -0,0 +1,192 @@
+# src/batch_transcription.py
+"""
+Elementy trybu wsadowego `transcribe_file.py` (katalogi, wzorce glob, listy plików).
+
+- `expand_inputs` zamienia argumenty wiersza poleceń na listę plików audio,
+- `BatchManifest` zapisuje wynik każdego pliku (JSONL), dzięki czemu przerwany
+  przebieg można wznowić z pominięciem plików już zakończonych,
+- `ChunkPrefetcher` dekoduje i przetwarza wstępnie kolejne pliki w puli wątków,
+  podczas gdy model transkrybuje bieżący. Kolejka fragmentów każdego pliku jest
+  ograniczona, więc pamięć nie rośnie z długością plików.
+"""
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.opus', '.m4a', '.aac', '.wma', '.webm', '.mp4', '.mkv')
+PREFETCH_CHUNKS = 4         # Maks. liczba przygotowanych fragmentów czekających na transkrypcję (na plik)
+MANIFEST_NAME = "manifest.jsonl"
+
+
+class BatchInputError(Exception):
+    """Nieprawidłowe wejście trybu wsadowego (brak pliku, konflikt nazw wyników)."""
+
+
+def _is_audio_file(path):
+    return os.path.isfile(path) and path.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def _expand_item(item):
+    """Pary (ścieżka, nazwa względna) dla jednego argumentu."""
+    if item.startswith('@'):
+        with open(item[1:], encoding='utf-8') as f:
+            entries = [line.strip() for line in f]
+        for entry in entries:
+            if entry and not entry.startswith('#'):
+                yield from _expand_item(entry)
+    elif os.path.isdir(item):
+        for directory, subdirectories, files in os.walk(item):
+            subdirectories.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if _is_audio_file(path):
+                    yield path, os.path.relpath(path, item)
+    elif glob.has_magic(item):
+        # Nazwa względna liczona od części wzorca bez symboli wieloznacznych
+        root = item
+        while glob.has_magic(root):
+            root = os.path.dirname(root)
+        for path in sorted(glob.glob(item, recursive=True)):
+            if _is_audio_file(path):
+                yield path, os.path.relpath(path, root or '.')
+    elif os.path.isfile(item):
+        yield item, os.path.basename(item)
+    else:
+        raise BatchInputError(f"Plik lub katalog nie istnieje: {item}")
+
+
+def expand_inputs(inputs):
+    """
+    Zamienia argumenty (pliki, katalogi, wzorce glob, `@lista.txt`) na listę par
+    (ścieżka bezwzględna, nazwa względna wyniku). Duplikaty są pomijane.
+    """
+    results, seen, names = [], set(), {}
+    for item in inputs:
+        for path, name in _expand_item(item):
+            path = os.path.abspath(path)
+            if path in seen:
+                continue
+            stem = os.path.splitext(name)[0]
+            if stem in names:
+                raise BatchInputError(f"Pliki {names[stem]} i {path} dałyby ten sam plik wyniku ({stem}).")
+            seen.add(path)
+            names[stem] = path
+            results.append((path, name))
+    return results
+
+
+class BatchManifest:
+    """Dziennik przebiegu wsadowego: jedna linia JSON na przetworzony plik (ostatni wpis wygrywa)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry['path']] = entry
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue  # Niedokończona linia po przerwaniu zapisu
+
+    @staticmethod
+    def _fingerprint(path):
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def is_done(self, path):
+        """Plik został już przetworzony i od tego czasu się nie zmienił."""
+        entry = self.entries.get(path)
+        return (entry is not None and entry.get('status') == 'done'
+                and all(entry.get(key) == value for key, value in self._fingerprint(path).items()))
+
+    def record(self, path, status, **fields):
+        entry = {'path': path, 'status': status, **self._fingerprint(path),
+                 'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'), **fields}
+        self.entries[path] = entry
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+_END = object()
+
+
+class _FailedPreparation:
+    def __init__(self, error):
+        self.error = error
+
+
+class PreparedFile:
+    """Ograniczona kolejka fragmentów jednego pliku, wypełniana przez wątek puli."""
+
+    def __init__(self, path, max_chunks):
+        self.path = path
+        self.queue = queue.Queue(max_chunks)
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        """Porzucenie pliku – zwalnia wątek puli czekający na miejsce w kolejce."""
+        self.cancelled.set()
+
+    def put(self, item):
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(self, prepare):
+        if self.cancelled.is_set():
+            return
+        try:
+            for item in prepare(self.path):
+                if not self.put(item):
+                    return
+        except Exception as e:
+            self.put(_FailedPreparation(e))
+            return
+        self.put(_END)
+
+    def chunks(self):
+        """Fragmenty w kolejności; błąd przygotowania jest rzucany w wątku wywołującym."""
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, _FailedPreparation):
+                    raise item.error
+                yield item
+        finally:
+            self.cancel()
+
+
+class ChunkPrefetcher:
+    """
+    Przygotowuje fragmenty (`prepare(ścieżka)` -> generator) kolejnych plików w puli
+    `workers` wątków. Zadania startują w kolejności plików, więc wyprzedzenie
+    względem transkrypcji wynosi najwyżej `workers` plików.
+    """
+
+    def __init__(self, paths, prepare, workers=2, max_chunks=PREFETCH_CHUNKS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self._files = [PreparedFile(path, max_chunks) for path in paths]
+        for prepared in self._files:
+            self._executor.submit(prepared.produce, prepare)
+
+    def __iter__(self):
+        return iter(self._files)
+
+    def close(self):
+        for prepared in self._files:
+            prepared.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,153 @@
+# src/chunking.py
+"""
+Cięcie strumienia audio na fragmenty w miejscach ciszy (RMS-VAD).
+
+`ChunkBuffer` trzyma bieżący bufor w jednej, wstępnie zaalokowanej tablicy
+i liczy RMS tylko dla nowych okien – koszt dołożenia bloku nie rośnie z
+długością bufora (wcześniej cały bufor był sklejany i podnoszony do kwadratu
+przy każdym bloku). Po wycięciu fragmentu reszta jest przesuwana na początek
+tablicy, więc przetworzone audio nie jest dłużej przetrzymywane w pamięci.
+"""
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+
+RMS_WINDOW_SECONDS = 0.1    # [s] Rozdzielczość analizy ciszy
+
+
+def window_rms(audio_data, window_size):
+    """RMS kolejnych pełnych okien; iloczyn skalarny wierszy zamiast tablicy kwadratów całego bufora."""
+    count = len(audio_data) // window_size
+    windows = audio_data[:count * window_size].reshape(count, window_size)
+    return np.sqrt(np.einsum('ij,ij->i', windows, windows) / window_size)
+
+
+def _split_from_rms(rms_values, window_size, settings):
+    """Indeks cięcia na początku ostatniej wystarczająco długiej ciszy (lub None)."""
+    silent_windows = np.flatnonzero(rms_values < settings.vad_rms_threshold)
+    required_windows = int(int(settings.vad_silence_threshold_seconds * SAMPLE_RATE) / window_size)
+    min_chunk_samples = int(settings.vad_min_chunk_seconds * SAMPLE_RATE)
+    if len(silent_windows) < max(required_windows, 1):
+        return None
+    # Ciąg `required_windows` kolejnych okien ciszy zaczynający się w silent_windows[i]
+    span = max(required_windows, 1) - 1
+    starts = silent_windows[:len(silent_windows) - span]
+    consecutive = silent_windows[span:] - starts == span
+    candidates = starts[consecutive & (starts * window_size >= min_chunk_samples)]
+    if len(candidates) == 0:
+        return None
+    return int(candidates[-1]) * window_size
+
+
+def _analysed_windows(num_samples, window_size):
+    # Jak w pierwotnej implementacji: okna zaczynające się przed `len - window_size`
+    return max(0, (num_samples - 1) // window_size)
+
+
+def find_silence_split(audio_data, settings):
+    """
+    Analizuje bufor audio i szuka punktu cięcia opartego na ciszy (RMS).
+    Zwraca indeks cięcia lub None.
+    """
+    window_size = int(SAMPLE_RATE * RMS_WINDOW_SECONDS)
+    rms_values = window_rms(audio_data, window_size)[:_analysed_windows(len(audio_data), window_size)]
+    return _split_from_rms(rms_values, window_size, settings)
+
+
+class ChunkBuffer:
+    """Bufor bieżącego fragmentu z przyrostową analizą RMS."""
+
+    def __init__(self, settings, samplerate=SAMPLE_RATE):
+        self.settings = settings
+        self.window_size = int(samplerate * RMS_WINDOW_SECONDS)
+        self.max_samples = int(settings.vad_max_buffer_seconds * samplerate)
+        self.min_samples = int(settings.vad_min_chunk_seconds * samplerate)
+        self._data = np.empty(self.max_samples + samplerate, dtype=np.float32)
+        self._length = 0
+        self._rms = np.empty(len(self._data) // self.window_size + 1, dtype=np.float32)
+        self._rms_count = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, block):
+        samples = np.asarray(block, dtype=np.float32).reshape(-1)
+        end = self._length + len(samples)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._length:end] = samples
+        self._length = end
+        self._update_rms()
+
+    def _grow(self, required):
+        capacity = max(required, 2 * len(self._data))
+        data = np.empty(capacity, dtype=np.float32)
+        data[:self._length] = self._data[:self._length]
+        rms = np.empty(capacity // self.window_size + 1, dtype=np.float32)
+        rms[:self._rms_count] = self._rms[:self._rms_count]
+        self._data, self._rms = data, rms
+
+    def _update_rms(self):
+        complete = self._length // self.window_size
+        if complete > self._rms_count:
+            start = self._rms_count * self.window_size
+            new_values = window_rms(self._data[start:complete * self.window_size], self.window_size)
+            self._rms[self._rms_count:complete] = new_values
+            self._rms_count = complete
+
+    def find_split(self):
+        """Punkt cięcia: cisza (`VAD_SILENCE`), wymuszony limit (`MAX_BUFFER_LIMIT`) lub (None, None)."""
+        if self._length >= self.min_samples:
+            windows = min(self._rms_count, _analysed_windows(self._length, self.window_size))
+            split_index = _split_from_rms(self._rms[:windows], self.window_size, self.settings)
+            if split_index is not None:
+                return split_index, "VAD_SILENCE"
+        if self._length >= self.max_samples:
+            return self.max_samples, "MAX_BUFFER_LIMIT"
+        return None, None
+
+    def levels(self, split_index=None):
+        """Kopia RMS pełnych okien pierwszych `split_index` próbek (domyślnie całości) – przed `take()`."""
+        split_index = self._length if split_index is None else split_index
+        return self._rms[:min(self._rms_count, split_index // self.window_size)].copy()
+
+    def take(self, split_index=None):
+        """Zwraca kopię pierwszych `split_index` próbek (domyślnie całości) i usuwa je z bufora."""
+        split_index = self._length if split_index is None else split_index
+        chunk = self._data[:split_index].copy()
+        remaining = self._length - split_index
+        self._data[:remaining] = self._data[split_index:self._length]
+        self._length = remaining
+        if split_index % self.window_size == 0:
+            shift = split_index // self.window_size
+            self._rms[:self._rms_count - shift] = self._rms[shift:self._rms_count]
+            self._rms_count -= shift
+        else:
+            self._rms_count = 0
+            self._update_rms()
+        return chunk
+
+
+def iter_silence_chunks(blocks, settings, samplerate=SAMPLE_RATE, with_levels=False):
+    """
+    Generator fragmentów ze strumienia bloków (np. src/audio_io.iter_audio_blocks).
+    Zwraca krotki (początek fragmentu [s], fragment, przyczyna cięcia); w pamięci jest
+    najwyżej jeden niepełny fragment. Z `with_levels=True` krotka ma na końcu RMS okien fragmentu.
+    """
+    buffer = ChunkBuffer(settings, samplerate)
+    position = 0
+
+    def take(split_index, split_reason):
+        levels = buffer.levels(split_index) if with_levels else None
+        chunk = (position / samplerate, buffer.take(split_index), split_reason)
+        return chunk + (levels,) if with_levels else chunk
+
+    for block in blocks:
+        buffer.append(block)
+        split_index, split_reason = buffer.find_split()
+        while split_index is not None:
+            yield take(split_index, split_reason)
+            position += split_index
+            split_index, split_reason = buffer.find_split()
+    if len(buffer) > 0:
+        yield take(None, "END_OF_RECORDING")
@@ -1,67 +1,237 @@
 # FILE: src/core_utils.py
 
-import configparser
 import sys
 import time
 import logging
-from faster_whisper import WhisperModel
+import importlib
+import threading
 import os
+from contextlib import contextmanager
+
+from src.settings import CONFIG_PATH, SettingsError, load_settings
+from src import metrics_server
+from src.logger_setup import stop_logging
 
 # --- Inicjalizacja Loggerów ---
 app_logger = logging.getLogger('app')
+performance_logger = logging.getLogger('performance')
 
-def load_configuration():
+def load_configuration(**overrides):
     """
-    Wczytuje konfigurację z pliku config.ini z podziałem na sekcje.
-    Obsługuje ścieżki względne z poziomu głównego katalogu projektu.
+    Wczytuje i waliduje konfigurację z pliku config.ini (patrz src/settings.py).
+    Zwraca niemutowalny obiekt Settings; przy błędzie kończy program.
     """
-    config = configparser.ConfigParser()
-    # Ścieżka do config.ini jest względna do głównego katalogu projektu
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.ini')
-    
     try:
-        config.read(config_path)
-        settings = {
-            'model_path': config.get('settings', 'model_path', fallback='medium'),
-            'device': config.get('settings', 'device', fallback='cuda'),
-            'hotkey': config.get('settings', 'hotkey', fallback='<ctrl>+f8'),
-            'language': config.get('settings', 'language', fallback='auto'),
-        }
-        settings.update({
-            'compute_type': config.get('advanced', 'compute_type', fallback='int8'),
-            'vad_filter': config.getboolean('advanced', 'vad_filter', fallback=True),
-            'log_prob_threshold': config.getfloat('advanced', 'log_prob_threshold', fallback=-1.0),
-            'no_speech_threshold': config.getfloat('advanced', 'no_speech_threshold', fallback=0.6),
-            'local_files_only': config.getboolean('advanced', 'local_files_only', fallback=True),
-            'beam_size': config.getint('advanced', 'beam_size', fallback=5),
-            'compression_ratio_threshold': config.getfloat('advanced', 'compression_ratio_threshold', fallback=3.0), # ZMIANA
-            # NOWE PARAMETRY VAD
-            'vad_max_buffer_seconds': config.getint('advanced', 'vad_max_buffer_seconds', fallback=20),
-            'vad_min_chunk_seconds': config.getint('advanced', 'vad_min_chunk_seconds', fallback=10),
-            'vad_silence_threshold_seconds': config.getfloat('advanced', 'vad_silence_threshold_seconds', fallback=1.5),
-            'vad_rms_threshold': config.getfloat('advanced', 'vad_rms_threshold', fallback=0.005)
-        })
-        # USUNIĘTO: streaming_vad_mode
+        settings = load_settings(CONFIG_PATH, **overrides)
         app_logger.info("Konfiguracja załadowana pomyślnie.")
         return settings
-    except (FileNotFoundError, configparser.Error) as e:
+    except SettingsError as e:
         app_logger.error(f"Błąd wczytywania config.ini: {e}")
         sys.exit(1)
 
+def lower_thread_priority(nice):
+    """Obniża priorytet bieżącego wątku (Linux: nice per wątek); gdzie nie jest to możliwe – bez zmian."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError) as e:
+        app_logger.debug("Nie można obniżyć priorytetu wątku: %s", e)
+
+
+def create_model(settings):
+    """
+    Tworzy instancję modelu Whisper. Import faster_whisper (ciężki: ctranslate2,
+    tokenizers, onnxruntime) odbywa się dopiero tutaj, a nie przy starcie programu.
+    Błędy są propagowane do wywołującego.
+    """
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        settings.model_path, 
+        device=settings.device, 
+        compute_type=settings.compute_type, 
+        local_files_only=settings.local_files_only
+    )
+
+def warm_up_model(model):
+    """
+    Wykonuje krótką transkrypcję ciszy, aby zainicjalizować jądra obliczeniowe
+    (CUDA/CPU) i bufory modelu przed pierwszą prawdziwą sesją. Zwraca czas trwania.
+    """
+    import numpy as np
+    start_time = time.perf_counter()
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language='en', beam_size=1)
+    for _ in segments:
+        pass
+    return time.perf_counter() - start_time
+
 def load_model(settings):
     """Wczytuje i zwraca model Whisper na podstawie ustawień."""
     app_logger.info("\n--- Ładowanie Modelu ---")
-    app_logger.info(f"Próba załadowania modelu: '{settings['model_path']}' ({settings['device']}, {settings['compute_type']})")
+    app_logger.info(f"Próba załadowania modelu: '{settings.model_path}' ({settings.device}, {settings.compute_type})")
     start_time = time.time()
     try:
-        model = WhisperModel(
-            settings['model_path'], 
-            device=settings['device'], 
-            compute_type=settings['compute_type'], 
-            local_files_only=settings['local_files_only']
-        )
+        model = create_model(settings)
         app_logger.info(f"✅ Model załadowany pomyślnie w {time.time() - start_time:.2f}s.")
         return model
     except Exception as e:
         app_logger.critical(f"❌ BŁĄD KRYTYCZNY: Nie udało się załadować modelu Whisper: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+# --- Pomiar Czasu Uruchamiania ---
+
+class StartupTimer:
+    """
+    Zbiera czasy poszczególnych faz uruchamiania (importy, konfiguracja,
+    listener, model) względem wspólnego punktu odniesienia, aby można było
+    śledzić czas do pełnej gotowości (time-to-ready).
+    """
+
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name, start):
+        """Zapisuje fazę, która rozpoczęła się w chwili `start` (perf_counter) i właśnie się skończyła."""
+        end = time.perf_counter()
+        with self._lock:
+            self.phases.append((name, end - start, end - self.origin))
+
+    @contextmanager
+    def phase(self, name):
+        """Mierzy czas trwania bloku kodu i zapisuje go jako fazę."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def mark(self, name):
+        """Zapisuje moment osiągnięcia kamienia milowego (bez czasu trwania)."""
+        now = time.perf_counter()
+        with self._lock:
+            self.phases.append((name, 0.0, now - self.origin))
+        return now - self.origin
+
+    def report(self, title="Statystyki Uruchamiania"):
+        """Wypisuje wszystkie zebrane fazy w kolejności ich zakończenia."""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p[2])
+        performance_logger.info(f"\n--- {title} ---")
+        for name, duration, finished_at in phases:
+            if duration > 0:
+                performance_logger.info(f"⏱️ {name}: {duration:.3f}s (zakończono po {finished_at:.3f}s)")
+            else:
+                performance_logger.info(f"🏁 {name}: po {finished_at:.3f}s")
+
+
+def preload_modules(module_names, timer=None):
+    """
+    Importuje podane moduły (np. w wątku w tle), aby pierwsze użycie w ścieżce
+    krytycznej nie płaciło za import. Błędy importu są tylko logowane –
+    właściwe miejsce użycia zgłosi je ponownie.
+    """
+    for name in module_names:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            app_logger.warning(f"⚠️ Nie udało się wstępnie zaimportować modułu '{name}': {e}")
+            continue
+        if timer is not None:
+            timer.record(f"import {name}", start)
+
+
+class BackgroundModelLoader:
+    """
+    Ładuje model Whisper w wątku w tle. Pozwala uruchomić listener skrótu
+    i nagrywanie natychmiast; konsumenci wywołują `wait()`, które blokuje
+    do momentu, gdy model będzie gotowy (audio w tym czasie czeka w kolejce).
+    `reload()` podmienia model w tle – do czasu gotowości nowego model
+    dotychczasowy pozostaje w użyciu.
+    """
+
+    def __init__(self, settings, timer=None, preload=()):
+        self.settings = settings
+        self.timer = timer
+        self.preload = tuple(preload)
+        self.model = None
+        self.load_duration = None
+        self.warmup_duration = None
+        self._ready = threading.Event()
+        self._reload_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Zwraca załadowany model, czekając na zakończenie ładowania."""
+        self._ready.wait(timeout)
+        return self.model
+
+    def reload(self, settings):
+        """Ładuje w tle model dla nowych ustawień i podmienia go po udanym załadowaniu."""
+        threading.Thread(target=self._reload, args=(settings,), name="model-reloader", daemon=True).start()
+
+    def _reload(self, settings):
+        # Przeładowania są szeregowane; najpierw czekamy na zakończenie ładowania startowego.
+        with self._reload_lock:
+            self._ready.wait()
+            app_logger.info(f"🔄 Przeładowanie modelu w tle: '{settings.model_path}' ({settings.device}, {settings.compute_type})...")
+            start_time = time.perf_counter()
+            try:
+                model = create_model(settings)
+            except Exception as e:
+                app_logger.error(f"❌ Nie udało się przeładować modelu, pozostaje poprzedni ('{self.settings.model_path}'): {e}")
+                return
+            load_duration = time.perf_counter() - start_time
+            self._warm_up(model, settings)
+            self.model, self.settings = model, settings
+            self.load_duration = load_duration
+            metrics_server.MODEL_LOAD_SECONDS.set(load_duration)
+            app_logger.info(f"✅ Nowy model aktywny (załadowany w {self.load_duration:.2f}s).")
+
+    def _warm_up(self, model, settings):
+        if not settings.model_warmup:
+            return
+        try:
+            self.warmup_duration = warm_up_model(model)
+        except Exception as e:
+            app_logger.warning(f"⚠️ Rozgrzewka modelu nie powiodła się (model pozostaje w użyciu): {e}")
+            return
+        metrics_server.MODEL_WARMUP_SECONDS.set(self.warmup_duration)
+        app_logger.info(f"🔥 Model rozgrzany w {self.warmup_duration:.2f}s.")
+
+    def _run(self):
+        if self.preload:
+            preload_modules(self.preload, self.timer)
+
+        app_logger.info(f"⏳ Ładowanie modelu '{self.settings.model_path}' ({self.settings.device}, {self.settings.compute_type}) w tle...")
+        start_time = time.perf_counter()
+        try:
+            model = create_model(self.settings)
+        except Exception as e:
+            app_logger.critical(f"❌ BŁĄD KRYTYCZNY: Nie udało się załadować modelu Whisper: {e}")
+            # Bez modelu demon jest bezużyteczny – kończymy cały proces, jak robi to load_model().
+            # os._exit pomija atexit: najpierw zapisujemy rekordy czekające w kolejce logowania
+            stop_logging()
+            logging.shutdown()
+            os._exit(1)
+
+        self.load_duration = time.perf_counter() - start_time
+        metrics_server.MODEL_LOAD_SECONDS.set(self.load_duration)
+        if self.timer is not None:
+            self.timer.record("ładowanie modelu", start_time)
+        app_logger.info(f"✅ Model załadowany pomyślnie w {self.load_duration:.2f}s.")
+        
+        warmup_start = time.perf_counter()
+        self._warm_up(model, self.settings)
+        if self.timer is not None and self.warmup_duration is not None:
+            self.timer.record("rozgrzewka modelu", warmup_start)
+        self.model = model
+        self._ready.set()
@@ -0,0 +1,123 @@
+# src/draft_preview.py
+"""
+Kaskada modeli: szybki model szkicu (np. `tiny`/`base`, int8 na CPU) dla
+podglądu na żywo, główny model (`model_path`) dla tekstu wklejanego.
+
+Z `model_path = medium` na słabszym sprzęcie RTF fragmentu jest za wysoki,
+żeby pokazać cokolwiek w trakcie dyktowania. `DraftTranscriber` dostaje każdy
+fragment w chwili jego wycięcia (to samo audio, bez preprocessingu) i transkrybuje
+go małym modelem we własnym wątku. Podgląd trafia do logu `transcription`
+(linia „👁️ Podgląd”) i pod `/preview` serwera metryk.
+
+Szkic nigdy nie opóźnia tekstu końcowego: `submit()` nie blokuje, kolejka
+szkicu ma `DRAFT_QUEUE_CHUNKS` miejsc (gdy szkic nie nadąża, najstarszy
+fragment jest pomijany), wątek szkicu ma obniżony priorytet (nice) i ograniczoną
+liczbę wątków CPU, a błąd modelu szkicu tylko wyłącza podgląd. Finalizacja
+sesji nie czeka na szkic – wyniki, które przyjdą później, są pomijane.
+"""
+import collections
+import logging
+import threading
+import time
+
+from src import metrics_server
+from src.core_utils import lower_thread_priority
+
+app_logger = logging.getLogger('app')
+
+DRAFT_QUEUE_CHUNKS = 2      # Ile fragmentów może czekać na szkic; starsze są pomijane
+DRAFT_CPU_THREADS = 2       # Wątki CTranslate2 modelu szkicu (reszta rdzeni dla modelu głównego)
+DRAFT_NICE = 10             # Obniżenie priorytetu wątku szkicu (Linux: nice per wątek)
+
+
+def create_draft_model(settings):
+    """Model szkicu z ustawień `draft_*`; import faster_whisper dopiero tutaj (jak w create_model)."""
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        settings.draft_model_path,
+        device=settings.draft_device,
+        compute_type=settings.draft_compute_type,
+        cpu_threads=DRAFT_CPU_THREADS,
+        local_files_only=settings.local_files_only
+    )
+
+
+class DraftTranscriber:
+    """
+    Model szkicu w wątku w tle. `submit(audio, language, callback)` wkłada fragment
+    do kolejki i wraca od razu; `callback(tekst, latencja)` jest wołany z wątku szkicu.
+    `model_factory(settings)` tworzy model (domyślnie faster-whisper; w testach atrapa).
+    """
+
+    def __init__(self, settings, model_factory=create_draft_model):
+        self.settings = settings
+        self.model_factory = model_factory
+        self.model = None
+        self.failed = False
+        self.dropped = 0
+        self._pending = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.ready = threading.Event()      # Ustawiane po załadowaniu modelu (lub błędzie ładowania)
+        self._thread = threading.Thread(target=self._run, name="draft-transcriber", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, audio, language, callback):
+        """Nie blokuje. Zwraca False, jeśli szkic jest wyłączony (błąd modelu)."""
+        if self.failed or self._closed:
+            return False
+        with self._condition:
+            if len(self._pending) >= DRAFT_QUEUE_CHUNKS:
+                self._pending.popleft()
+                self.dropped += 1
+                metrics_server.DRAFT_DROPPED.inc()
+            self._pending.append((time.perf_counter(), audio, language, callback))
+            self._condition.notify()
+        return True
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify()
+
+    def _run(self):
+        lower_thread_priority(DRAFT_NICE)
+        settings = self.settings
+        app_logger.info(f"⏳ Ładowanie modelu szkicu '{settings.draft_model_path}' ({settings.draft_device}, {settings.draft_compute_type}) w tle...")
+        start_time = time.perf_counter()
+        try:
+            self.model = self.model_factory(settings)
+        except Exception as e:
+            app_logger.error(f"❌ Nie udało się załadować modelu szkicu – podgląd wyłączony: {e}")
+            self.failed = True
+            self.close()
+            return
+        finally:
+            self.ready.set()
+        app_logger.info(f"✅ Model szkicu załadowany w {time.perf_counter() - start_time:.2f}s.")
+
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                submitted_at, audio, language, callback = self._pending.popleft()
+            try:
+                text = self._transcribe(audio, language)
+            except Exception as e:
+                app_logger.error(f"❌ Błąd modelu szkicu – podgląd wyłączony: {e}")
+                self.failed = True
+                self.close()
+                return
+            callback(text, time.perf_counter() - submitted_at)
+
+    def _transcribe(self, audio, language):
+        # Najtańsze dekodowanie: jedna ścieżka, bez kontekstu i bez VAD (fragment jest już wycięty)
+        segments, _ = self.model.transcribe(audio, language=language, beam_size=1, vad_filter=False,
+                                            condition_on_previous_text=False)
+        return "".join(segment.text for segment in segments).strip()
@@ -0,0 +1,366 @@
+# src/inference_worker.py
+"""
+Proces inferencji: model Whisper i preprocessing poza procesem przechwytywania audio.
+
+W jednym interpreterze dekodowanie, preprocessing (pydub i noisereduce działają
+częściowo w Pythonie) i callback `sounddevice` rywalizują o GIL – pod obciążeniem
+callback się spóźnia, a strumień zgłasza `input_overflow`. Z `inference_process = true`
+model żyje w osobnym procesie (`spawn`):
+
+- fragment audio trafia do procesu przez `multiprocessing.shared_memory` – jedna kopia
+  do wspólnego bufora, proces inferencji czyta ją bez serializacji,
+- przez `Pipe` idą tylko krótkie komunikaty: parametry transkrypcji i gotowe segmenty,
+- po awarii procesu (np. błąd CUDA, OOM) `InferenceWorker` uruchamia go ponownie
+  i powtarza bieżący fragment; nagrywanie w tym czasie trwa, audio czeka w kolejce sesji.
+
+`InferenceWorker` ma interfejs `BackgroundModelLoader` (`start`, `is_ready`, `wait`,
+`reload`), a `wait()` zwraca obiekt z metodą `transcribe()` jak `WhisperModel` –
+sesja dyktowania nie musi wiedzieć, gdzie działa model. Ten obiekt (`PinnedWorker`)
+jest przypięty do procesu z chwili `wait()`: przeładowanie modelu w trakcie
+dyktowania obowiązuje od następnej sesji.
+"""
+import collections
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+from src import metrics_server
+from src.logger_setup import stop_logging
+
+app_logger = logging.getLogger('app')
+
+SHARED_BUFFER_MARGIN_SECONDS = 5.0  # Zapas wspólnego bufora ponad vad_max_buffer_seconds
+MAX_ATTEMPTS = 2                    # Próby przetworzenia fragmentu (pierwsza + jedna po restarcie procesu)
+LOGGER_NAMES = ('app', 'preprocessing', 'transcription', 'performance')
+
+WorkerSegment = collections.namedtuple('WorkerSegment', ['start', 'end', 'text'])
+WorkerInfo = collections.namedtuple('WorkerInfo', ['language', 'language_probability', 'duration', 'preprocessing_duration'])
+
+
+class InferenceWorkerError(RuntimeError):
+    """Proces inferencji nie uruchomił się lub nie przetworzył fragmentu."""
+
+
+# --- Proces inferencji ---
+
+def _worker_main(connection, settings, model_factory, preprocess, logger_levels):
+    """Pętla procesu inferencji: ładuje model, potem obsługuje żądania aż do `stop` lub zamknięcia potoku."""
+    from src.logger_setup import setup_loggers
+    from src.core_utils import create_model, warm_up_model
+    from src.audio_preprocessing import apply_preprocessing_pipeline
+
+    setup_loggers()
+    for name, level in logger_levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    start_time = time.perf_counter()
+    try:
+        model = model_factory(settings) if model_factory is not None else create_model(settings)
+        load_duration = time.perf_counter() - start_time
+        warmup_duration = warm_up_model(model) if settings.model_warmup else None
+    except Exception as e:
+        connection.send(('failed', f"{type(e).__name__}: {e}"))
+        return
+    # Tokenizer wraca do procesu głównego – prompt jest budowany tam (src/prompt_context.py)
+    tokenizer = getattr(model, 'hf_tokenizer', None)
+    connection.send(('ready', load_duration, warmup_duration, tokenizer.to_str() if tokenizer is not None else None))
+
+    shared = None
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                break # Proces główny zakończył się
+            if message[0] == 'stop':
+                break
+            _, buffer_name, samples, kwargs = message
+            try:
+                if shared is None or shared.name != buffer_name:
+                    if shared is not None:
+                        shared.close()
+                    # Bufor należy do procesu głównego – to on go usuwa (unlink); resource_tracker jest wspólny
+                    shared = shared_memory.SharedMemory(name=buffer_name)
+                audio = np.ndarray((samples,), dtype=np.float32, buffer=shared.buf)
+                preprocessing_duration = 0.0
+                if preprocess:
+                    preprocessing_start = time.perf_counter()
+                    audio = apply_preprocessing_pipeline(audio)
+                    preprocessing_duration = time.perf_counter() - preprocessing_start
+                segments, info = model.transcribe(audio, **kwargs)
+                result = [(segment.start, segment.end, segment.text) for segment in segments]
+                del audio # Widok na wspólny bufor musi zniknąć przed jego zamknięciem
+                connection.send(('result', result, (info.language, info.language_probability, info.duration), preprocessing_duration))
+            except Exception as e:
+                connection.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        if shared is not None:
+            shared.close()
+
+
+# --- Strona procesu głównego ---
+
+class _ModelProcess:
+    """Proces inferencji z jednym modelem; `users` to uchwyty (sesje), które go przypięły."""
+
+    def __init__(self, process, connection, settings, hf_tokenizer):
+        self.process = process
+        self.connection = connection
+        self.settings = settings
+        self.hf_tokenizer = hf_tokenizer
+        self.users = 0
+        self.retired = False    # Zastąpiony przez przeładowanie; zatrzymywany po zwolnieniu ostatniego uchwytu
+
+
+class PinnedWorker:
+    """
+    Uchwyt z `InferenceWorker.wait()`: model przypięty na czas sesji. Przeładowanie
+    w tle uruchamia nowy proces dla kolejnych sesji, a ten uchwyt do końca używa
+    modelu (i tokenizera) z chwili `wait()`. Proces zastąpionego modelu jest
+    zatrzymywany po `release()` ostatniego uchwytu (lub po jego usunięciu).
+    """
+
+    def __init__(self, worker, model_process):
+        self.worker = worker
+        self.preprocesses_audio = worker.preprocesses_audio
+        self.hf_tokenizer = model_process.hf_tokenizer
+        self.settings = model_process.settings
+        self._model_process = model_process
+        self.release = weakref.finalize(self, worker._unpin, model_process)
+
+    def transcribe(self, audio, **kwargs):
+        return self.worker._transcribe(self._model_process, audio, kwargs)
+
+
+class InferenceWorker:
+    """
+    Proces inferencji widziany jak `BackgroundModelLoader` i `WhisperModel` jednocześnie.
+    Żądania są szeregowane (jeden wspólny bufor). `model_factory`
+    (funkcja `settings -> model`, musi dać się zapiklować) zastępuje `create_model`,
+    np. atrapą modelu w benchmarku.
+    """
+
+    preprocesses_audio = True # Sesja pomija lokalny preprocessing, gdy `preprocess=True`
+
+    def __init__(self, settings, timer=None, preload=(), model_factory=None, preprocess=True):
+        self.settings = settings
+        self.timer = timer
+        self.preload = tuple(preload)
+        self.model_factory = model_factory
+        self.preprocesses_audio = preprocess
+        self.load_duration = None
+        self.warmup_duration = None
+        self.restarts = 0
+        self.hf_tokenizer = None # Tokenizer bieżącego modelu (jak WhisperModel.hf_tokenizer) po uruchomieniu procesu
+        self._context = multiprocessing.get_context('spawn')
+        self._current = None
+        self._retired = []       # Zastąpione procesy, których modelu używają jeszcze przypięte sesje
+        self._shared = None
+        self._lock = threading.Lock()            # Krótko: bieżący proces, przypięcia, uchwyty procesów
+        self._request_lock = threading.Lock()    # Na cały fragment: wspólny bufor i Pipe (jedno żądanie naraz)
+        self._reload_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inference-worker-starter", daemon=True)
+
+    # --- Interfejs BackgroundModelLoader ---
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Czeka na gotowość procesu i zwraca `PinnedWorker` z bieżącym modelem (None po przekroczeniu `timeout`)."""
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            self._current.users += 1
+            return PinnedWorker(self, self._current)
+
+    def reload(self, settings):
+        """Uruchamia w tle proces z nowym modelem; kolejne sesje używają go po udanym załadowaniu."""
+        threading.Thread(target=self._reload, args=(settings,), name="inference-worker-reloader", daemon=True).start()
+
+    def _run(self):
+        from src.core_utils import preload_modules
+        if self.preload:
+            preload_modules(self.preload, self.timer)
+        app_logger.info(f"⏳ Uruchamianie procesu inferencji z modelem '{self.settings.model_path}' "
+                        f"({self.settings.device}, {self.settings.compute_type}) w tle...")
+        start_time = time.perf_counter()
+        try:
+            self._current = self._launch(self.settings)
+        except Exception as e:
+            app_logger.critical(f"❌ BŁĄD KRYTYCZNY: Proces inferencji nie załadował modelu Whisper: {e}")
+            # Bez modelu demon jest bezużyteczny – kończymy cały proces, jak robi to BackgroundModelLoader.
+            # os._exit pomija atexit: najpierw zapisujemy rekordy czekające w kolejce logowania
+            stop_logging()
+            logging.shutdown()
+            os._exit(1)
+        self.hf_tokenizer = self._current.hf_tokenizer
+        if self.timer is not None:
+            self.timer.record("proces inferencji gotowy", start_time)
+        app_logger.info(f"✅ Proces inferencji gotowy (PID {self._current.process.pid}, model załadowany w {self.load_duration:.2f}s).")
+        self._ready.set()
+
+    def _reload(self, settings):
+        with self._reload_lock:
+            self._ready.wait()
+            app_logger.info(f"🔄 Przeładowanie modelu w nowym procesie inferencji: '{settings.model_path}' ({settings.device}, {settings.compute_type})...")
+            try:
+                model_process = self._launch(settings)
+            except Exception as e:
+                app_logger.error(f"❌ Nie udało się przeładować modelu, pozostaje poprzedni ('{self.settings.model_path}'): {e}")
+                return
+            with self._lock:
+                old = self._current
+                self._current, self.settings, self.hf_tokenizer = model_process, settings, model_process.hf_tokenizer
+                old.retired = True
+                pinned = old.users > 0
+                if pinned:
+                    self._retired.append(old)
+            if pinned:
+                app_logger.info(f"✅ Nowy model aktywny od następnej sesji (załadowany w {self.load_duration:.2f}s); "
+                                f"trwające sesje kończą na poprzednim.")
+            else:
+                # Fragment w toku (transcribe() bez uchwytu) kończy się jeszcze na poprzednim modelu
+                with self._request_lock:
+                    self._stop_process(old)
+                app_logger.info(f"✅ Nowy model aktywny (załadowany w {self.load_duration:.2f}s).")
+
+    def _unpin(self, model_process):
+        # Wywoływane przez PinnedWorker.release() lub przy usunięciu uchwytu
+        with self._lock:
+            model_process.users -= 1
+            if not (model_process.retired and model_process.users == 0 and model_process in self._retired):
+                return
+            self._retired.remove(model_process)
+        with self._request_lock:
+            self._stop_process(model_process)
+
+    # --- Zarządzanie procesem ---
+
+    def _launch(self, settings):
+        """Uruchamia proces i czeka na załadowanie modelu. Zwraca _ModelProcess, rzuca InferenceWorkerError."""
+        parent_connection, child_connection = self._context.Pipe()
+        logger_levels = {name: logging.getLogger(name).getEffectiveLevel() for name in LOGGER_NAMES}
+        process = self._context.Process(
+            target=_worker_main, name="inference-worker", daemon=True,
+            args=(child_connection, settings, self.model_factory, self.preprocesses_audio, logger_levels),
+        )
+        process.start()
+        child_connection.close() # Po śmierci procesu recv() w procesie głównym zgłosi EOFError
+        try:
+            reply = parent_connection.recv()
+        except EOFError:
+            process.join()
+            raise InferenceWorkerError(f"proces zakończył się podczas ładowania modelu (kod {process.exitcode})")
+        if reply[0] == 'failed':
+            process.join()
+            raise InferenceWorkerError(reply[1])
+        _, self.load_duration, self.warmup_duration, tokenizer_json = reply
+        hf_tokenizer = None
+        if tokenizer_json is not None:
+            from tokenizers import Tokenizer
+            hf_tokenizer = Tokenizer.from_str(tokenizer_json)
+        metrics_server.MODEL_LOAD_SECONDS.set(self.load_duration)
+        if self.warmup_duration is not None:
+            metrics_server.MODEL_WARMUP_SECONDS.set(self.warmup_duration)
+        return _ModelProcess(process, parent_connection, settings, hf_tokenizer)
+
+    def _restart(self, model_process):
+        # Wywoływane pod self._request_lock; proces wraca z modelem tych samych ustawień.
+        # Model ładuje się poza self._lock, więc wait(), przeładowanie i zwalnianie uchwytów nie czekają.
+        if model_process.process is None:
+            app_logger.error("💥 Proces inferencji nie działa (poprzednie uruchomienie nie powiodło się) – kolejna próba, nagrywanie trwa dalej...")
+        else:
+            app_logger.error(f"💥 Proces inferencji zakończył się nieoczekiwanie (kod {model_process.process.exitcode}) – ponowne uruchomienie, nagrywanie trwa dalej...")
+        self._stop_process(model_process)
+        self.restarts += 1
+        metrics_server.INFERENCE_WORKER_RESTARTS.inc()
+        start_time = time.perf_counter()
+        restarted = self._launch(model_process.settings) # Po błędzie process zostaje None – kolejny fragment ponawia restart
+        with self._lock:
+            model_process.process, model_process.connection = restarted.process, restarted.connection
+        app_logger.info(f"✅ Proces inferencji uruchomiony ponownie w {time.perf_counter() - start_time:.2f}s (PID {model_process.process.pid}).")
+
+    def _stop_process(self, model_process):
+        with self._lock:
+            if model_process is None or model_process.process is None:
+                return
+            process, connection = model_process.process, model_process.connection
+            model_process.process = model_process.connection = None
+        try:
+            connection.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        connection.close()
+        process.join(timeout=5.0)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def _shared_buffer(self, samples):
+        """Wspólny bufor na co najmniej `samples` próbek; większy fragment = nowy bufor."""
+        if self._shared is None or self._shared.size < samples * 4:
+            capacity = max(samples, int((self.settings.vad_max_buffer_seconds + SHARED_BUFFER_MARGIN_SECONDS) * SAMPLE_RATE))
+            self._release_shared()
+            self._shared = shared_memory.SharedMemory(create=True, size=capacity * 4)
+        return self._shared
+
+    def _release_shared(self):
+        if self._shared is not None:
+            self._shared.close()
+            self._shared.unlink()
+            self._shared = None
+
+    # --- Interfejs WhisperModel ---
+
+    def transcribe(self, audio, **kwargs):
+        """
+        Przetwarza fragment bieżącym modelem. Zwraca `(segmenty, info)` jak `WhisperModel`;
+        `info.preprocessing_duration` to czas preprocessingu w procesie (0, gdy wyłączony).
+        Sesje używają `wait()` – uchwyt zachowuje model z początku sesji.
+        """
+        return self._transcribe(None, audio, kwargs)
+
+    def _transcribe(self, model_process, audio, kwargs):
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        with self._request_lock:
+            if model_process is None:
+                with self._lock:
+                    model_process = self._current
+            shared = self._shared_buffer(len(audio))
+            np.ndarray((len(audio),), dtype=np.float32, buffer=shared.buf)[:] = audio
+            for attempt in range(MAX_ATTEMPTS):
+                if attempt > 0 or model_process.process is None or not model_process.process.is_alive():
+                    self._restart(model_process)
+                try:
+                    model_process.connection.send(('transcribe', shared.name, len(audio), kwargs))
+                    reply = model_process.connection.recv()
+                except (EOFError, OSError):
+                    model_process.process.join(timeout=1.0)
+                    continue
+                if reply[0] == 'error':
+                    raise InferenceWorkerError(reply[1])
+                _, result, info, preprocessing_duration = reply
+                return iter([WorkerSegment(*segment) for segment in result]), WorkerInfo(*info, preprocessing_duration)
+        raise InferenceWorkerError(f"fragment nie został przetworzony po {MAX_ATTEMPTS} próbach")
+
+    def close(self):
+        """Zatrzymuje procesy inferencji (także przypięte przez sesje) i zwalnia wspólny bufor."""
+        with self._request_lock:
+            with self._lock:
+                model_processes, self._retired = [self._current] + self._retired, []
+            for model_process in model_processes:
+                self._stop_process(model_process)
+            self._release_shared()
@@ -0,0 +1,160 @@
+# src/job_server.py
+"""
+Zadania wsadowe wykonywane modelem demona (main_streaming.py) w przerwach między dyktowaniem.
+
+Przy `batch_jobs_port > 0` demon nasłuchuje na 127.0.0.1 i przyjmuje pojedyncze
+fragmenty audio (`POST /jobs/transcribe`: próbki float32 16 kHz w treści,
+parametry dekodowania w nagłówku `X-Transcribe-Options` jako JSON). Fragment
+jest transkrybowany przez `ModelScheduler` z klasą `batch`, więc czeka, dopóki
+trwa sesja dyktowania. Odpowiedź (JSON) zawiera segmenty, informacje o języku
+i czas oczekiwania na model.
+
+`DaemonModel` to klient z interfejsem `WhisperModel.transcribe` używany przez
+`transcribe_file.py --daemon`: dekodowanie pliku, cięcie w ciszy, kompaktowanie
+i prompt działają jak dotąd lokalnie, a demon wykonuje tylko inferencję –
+zadanie jest wywłaszczane na granicy każdego fragmentu.
+"""
+import json
+import logging
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+from src.inference_worker import WorkerInfo, WorkerSegment
+from src.model_scheduler import BATCH
+
+app_logger = logging.getLogger('app')
+
+JOBS_HOST = '127.0.0.1'     # Tylko lokalnie: serwer przyjmuje dowolne audio do transkrypcji
+# Parametry `transcribe()` przyjmowane od klienta (pozostałe są odrzucane)
+JOB_OPTIONS = ('language', 'beam_size', 'vad_filter', 'log_prob_threshold', 'no_speech_threshold', 'initial_prompt')
+MAX_JOB_SECONDS = 120.0     # Najdłuższy fragment przyjmowany w jednym żądaniu
+REQUEST_TIMEOUT = 600.0     # [s] Klient: fragment może czekać na koniec dłuższego dyktowania
+
+
+class JobServerError(Exception):
+    """Demon odrzucił fragment lub jest nieosiągalny."""
+
+
+class _JobHandler(BaseHTTPRequestHandler):
+    scheduler = None
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/jobs/status':
+            self.send_error(404)
+            return
+        if not self.scheduler.is_ready():
+            self._reply(503, {'ready': False})
+            return
+        model = self.scheduler.model(BATCH)
+        tokenizer = getattr(model, 'hf_tokenizer', None)
+        self._reply(200, {
+            'ready': True,
+            'preprocesses_audio': bool(getattr(model, 'preprocesses_audio', False)),
+            'tokenizer': tokenizer.to_str() if tokenizer is not None else None,
+            'waits': self.scheduler.stats(),
+        })
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/jobs/transcribe':
+            self.send_error(404)
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            options = json.loads(self.headers.get('X-Transcribe-Options', '{}'))
+        except ValueError as e:
+            self._reply(400, {'error': f"niepoprawne żądanie: {e}"})
+            return
+        if length % 4 or length > MAX_JOB_SECONDS * 16000 * 4:
+            self._reply(400, {'error': f"treść musi być próbkami float32 16 kHz, najwyżej {MAX_JOB_SECONDS:g}s"})
+            return
+        audio = np.frombuffer(self.rfile.read(length), dtype=np.float32)
+        kwargs = {key: value for key, value in options.items() if key in JOB_OPTIONS}
+        try:
+            with self.scheduler.slot(BATCH) as slot:
+                segments, info = self.scheduler.model_loader.wait().transcribe(audio, **kwargs)
+                segments = [[segment.start, segment.end, segment.text] for segment in segments]
+        except Exception as e:
+            app_logger.error(f"❌ Błąd zadania wsadowego: {e}")
+            self._reply(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._reply(200, {
+            'segments': segments,
+            'info': [info.language, info.language_probability, info.duration,
+                     getattr(info, 'preprocessing_duration', 0.0)],
+            'wait': slot.waited,
+        })
+
+    def log_message(self, format, *args):
+        # Każdy fragment to jedno żądanie – nie zaśmiecamy logów aplikacji
+        pass
+
+
+def start_job_server(scheduler, port):
+    """Uruchamia serwer zadań wsadowych w wątku w tle i zwraca go (lub None przy błędzie)."""
+    handler = type('JobHandler', (_JobHandler,), {'scheduler': scheduler})
+    try:
+        server = ThreadingHTTPServer((JOBS_HOST, port), handler)
+    except OSError as e:
+        app_logger.error(f"❌ Nie udało się uruchomić serwera zadań wsadowych na {JOBS_HOST}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="job-server", daemon=True).start()
+    app_logger.info(f"📥 Zadania wsadowe (transcribe_file.py --daemon): http://{JOBS_HOST}:{server.server_address[1]}/jobs")
+    return server
+
+
+class DaemonModel:
+    """
+    Klient serwera zadań z interfejsem `WhisperModel.transcribe`. Przy tworzeniu pobiera
+    stan demona: tokenizer modelu (do budżetu promptu) i `preprocesses_audio`
+    (demon z `inference_process = true` sam wykonuje preprocessing fragmentu).
+    """
+
+    def __init__(self, port, host=JOBS_HOST, timeout=REQUEST_TIMEOUT):
+        self.url = f"http://{host}:{port}/jobs"
+        self.timeout = timeout
+        status = self._request(urllib.request.Request(self.url + '/status'), timeout=10.0)
+        if not status.get('ready'):
+            raise JobServerError("model demona nie jest jeszcze gotowy")
+        self.preprocesses_audio = status['preprocesses_audio']
+        self.hf_tokenizer = None
+        if status.get('tokenizer') is not None:
+            from tokenizers import Tokenizer
+            self.hf_tokenizer = Tokenizer.from_str(status['tokenizer'])
+        self.waited = 0.0       # Łączny czas oczekiwania fragmentów na model demona
+
+    def _request(self, request, timeout):
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode('utf-8')).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise JobServerError(f"demon ({self.url}): {message}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise JobServerError(f"demon nieosiągalny ({self.url}): {e}") from e
+
+    def transcribe(self, audio, **kwargs):
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        options = {key: value for key, value in kwargs.items() if key in JOB_OPTIONS}
+        request = urllib.request.Request(
+            self.url + '/transcribe', data=audio.tobytes(), method='POST',
+            headers={'Content-Type': 'application/octet-stream',
+                     'X-Transcribe-Options': json.dumps(options, ensure_ascii=True)},
+        )
+        reply = self._request(request, timeout=self.timeout)
+        self.waited += reply['wait']
+        return iter([WorkerSegment(*segment) for segment in reply['segments']]), WorkerInfo(*reply['info'])
@@ -1,50 +1,106 @@
 # src/logger_setup.py
 """
 Moduł do centralnej, precyzyjnej konfiguracji loggerów aplikacji.
+
+Loggery aplikacji mają jeden `QueueHandler`: wywołanie loggera tylko wkłada
+rekord do kolejki, a zapis na stdout i do pliku (`log_file`, rotowany po
+rozmiarze) odbywa się w wątku `QueueListener`. Wolny terminal lub
+zapchany potok (np. journald) nie zatrzymuje więc wątku transkrybującego
+ani callbacku audio. Kolejka jest opróżniana przy wyjściu z programu (atexit).
 """
+import atexit
 import logging
+import logging.handlers
 import configparser
 import os
+import queue
 import sys
 
+LOG_FORMAT = '%(message)s'
+FILE_LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)-13s %(message)s'
+
+# Definicja loggerów i ich kluczy w pliku konfiguracyjnym
+LOGGER_LEVEL_KEYS = {
+    'app': 'log_level_app',
+    'preprocessing': 'log_level_preprocessing',
+    'transcription': 'log_level_transcription',
+    'performance': 'log_level_performance'
+}
+
+_listener = None
+
+
+def create_queue_logging(handlers):
+    """Zwraca (QueueHandler dla loggerów, uruchomiony QueueListener zapisujący do `handlers`)."""
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return logging.handlers.QueueHandler(log_queue), listener
+
+
+def create_file_handler(path, max_mb, backups):
+    """Plik logu rotowany po przekroczeniu `max_mb` (zachowuje `backups` poprzednich plików)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=int(max_mb * 2**20), backupCount=backups, encoding='utf-8', delay=True
+    )
+    handler.setFormatter(logging.Formatter(FILE_LOG_FORMAT))
+    return handler
+
+
+def stop_logging():
+    """Zapisuje rekordy pozostałe w kolejce i zatrzymuje wątek logowania."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_loggers():
     """
     Wczytuje konfigurację z config.ini i ustawia poziomy oraz handlery
     tylko dla zdefiniowanych loggerów aplikacji, unikając globalnej konfiguracji.
     """
+    global _listener
     config = configparser.ConfigParser()
     # Ścieżka do config.ini jest względna do głównego katalogu projektu
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config.ini')
-    config.read(config_path)
-
-    # Definicja loggerów i ich kluczy w pliku konfiguracyjnym
-    loggers_config = {
-        'app': 'log_level_app',
-        'preprocessing': 'log_level_preprocessing',
-        'transcription': 'log_level_transcription',
-        'performance': 'log_level_performance'
-    }
-
-    # Utwórz jeden handler i formatter, aby ponownie ich używać
-    log_format = '%(message)s'
-    formatter = logging.Formatter(log_format)
-    # Użyj sys.stdout, aby logi zachowywały się jak standardowy print
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    config.read(os.path.join(root_dir, 'config.ini'))
 
-    for name, config_key in loggers_config.items():
-        logger = logging.getLogger(name)
-        
+    for name, config_key in LOGGER_LEVEL_KEYS.items():
         # Pobierz poziom z config.ini, domyślnie INFO
         level_str = config.get('logging', config_key, fallback='INFO').upper()
-        level = getattr(logging, level_str, logging.INFO)
-        logger.setLevel(level)
-        
+        logging.getLogger(name).setLevel(getattr(logging, level_str, logging.INFO))
+
+    if _listener is not None:
+        return
+
+    # Użyj sys.stdout, aby logi zachowywały się jak standardowy print
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [stream_handler]
+
+    log_file = config.get('logging', 'log_file', fallback='').strip()
+    if log_file:
+        try:
+            handlers.append(create_file_handler(
+                log_file if os.path.isabs(log_file) else os.path.join(root_dir, log_file),
+                config.getfloat('logging', 'log_file_max_mb', fallback=5.0),
+                config.getint('logging', 'log_file_backups', fallback=3),
+            ))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Nie można otworzyć pliku logu '{log_file}': {e}", file=sys.stderr)
+
+    queue_handler, _listener = create_queue_logging(handlers)
+    atexit.register(stop_logging)
+
+    for name in LOGGER_LEVEL_KEYS:
+        logger = logging.getLogger(name)
         # Kluczowa zmiana: dodajemy handler tylko do naszych loggerów
         # i tylko wtedy, gdy jeszcze go nie mają.
         if not logger.handlers:
-            logger.addHandler(handler)
-        
+            logger.addHandler(queue_handler)
+
         # Zapobiegaj propagacji do roota, aby uniknąć podwójnych logów
         # i konfliktów z innymi bibliotekami.
-        logger.propagate = False
\ No newline at end of file
+        logger.propagate = False
@@ -0,0 +1,39 @@
+# src/memory_budget.py
+"""
+Tryb budżetu pamięci dla długich dyktowań (`memory_budget_mb` w config.ini).
+
+Budżet dotyczy audio przetrzymywanego w pamięci: kolejki (src/audio_queue.py),
+bieżącego bufora fragmentu i kopii powstających podczas przetwarzania fragmentu.
+W trybie budżetu tekst każdego fragmentu jest od razu oddawany do sinka wyjścia,
+a w pamięci zostaje tylko jego końcówka potrzebna jako prompt.
+"""
+from src.audio_preprocessing import SAMPLE_RATE
+
+AUDIO_BYTES_PER_SECOND = SAMPLE_RATE * 4   # float32, mono
+PROCESSING_COPIES = 4                      # Kopie fragmentu żywe w trakcie preprocessingu i transkrypcji
+
+
+def is_enabled(settings):
+    return settings.memory_budget_mb > 0
+
+
+def audio_budget_seconds(settings):
+    """Ile sekund audio mieści się w budżecie (None, gdy tryb jest wyłączony)."""
+    if not is_enabled(settings):
+        return None
+    return settings.memory_budget_mb * 2**20 / AUDIO_BYTES_PER_SECOND
+
+
+def queue_limit_seconds(settings):
+    """Limit kolejki audio: reszta budżetu po buforze fragmentu i jego kopiach roboczych."""
+    budget = audio_budget_seconds(settings)
+    if budget is None:
+        return settings.audio_queue_max_seconds
+    working_set = settings.vad_max_buffer_seconds * (1 + PROCESSING_COPIES)
+    return min(settings.audio_queue_max_seconds, budget - working_set)
+
+
+def recording_limit_seconds(settings):
+    """Maks. długość nagrania trzymanego w całości (main_simple.py) w trybie budżetu."""
+    budget = audio_budget_seconds(settings)
+    return None if budget is None else budget / (1 + PROCESSING_COPIES)
@@ -0,0 +1,239 @@
+# src/metrics_server.py
+"""
+Metryki demona dostępne na żywo przez HTTP (localhost) w formacie tekstowym
+Prometheus: liczniki, wskaźniki (gauge) i histogramy.
+
+Rejestr jest zawsze aktywny (aktualizacja metryki to kilka operacji pod
+blokadą), natomiast serwer HTTP startuje tylko przy `metrics_enabled = true`.
+Pod `/preview` serwer zwraca (JSON) ostatni podgląd tekstu z modelu szkicu
+(src/draft_preview.py).
+"""
+import json
+import logging
+import os
+import resource
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+app_logger = logging.getLogger('app')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+CALLBACK_STATUS_FLAGS = ('input_overflow', 'input_underflow', 'output_overflow', 'output_underflow', 'priming_output')
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.label_names:
+            items = [((), 0.0)]
+        return [(self.name, _format_labels(self.label_names, labels), value) for labels, value in items]
+
+
+class Gauge:
+    """Wskaźnik ustawiany ręcznie lub odczytywany w chwili pobrania metryk (`set_function`)."""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text):
+        self.name, self.help, self.label_names = name, help_text, ()
+        self._value = 0.0
+        self._function = None
+
+    def set(self, value):
+        self._value = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def samples(self):
+        value = self._value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = float('nan')
+        return [(self.name, "", value)]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, ()
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            self._sum += value
+            self._count += 1
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        samples, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append((f"{self.name}_bucket", _format_labels((), (), [('le', _format_value(bound))]), cumulative))
+        samples.append((f"{self.name}_sum", "", total))
+        samples.append((f"{self.name}_count", "", count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes():
+    """Bieżąca pamięć rezydentna procesu (Linux: /proc/self/statm; inaczej szczytowa z getrusage)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """Szczytowa pamięć rezydentna procesu od jego startu (getrusage, Linux: KiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- Metryki Demona ---
+
+REGISTRY = MetricsRegistry()
+SESSIONS = REGISTRY.register(Counter('dictation_sessions_total', 'Liczba obsłużonych sesji dyktowania.'))
+CHUNKS = REGISTRY.register(Counter('dictation_chunks_total', 'Liczba przetworzonych fragmentów według przyczyny cięcia.', ('split_reason',)))
+PREPROCESSING_SECONDS = REGISTRY.register(Histogram('dictation_preprocessing_seconds', 'Czas preprocessingu fragmentu.'))
+TRANSCRIPTION_SECONDS = REGISTRY.register(Histogram('dictation_transcription_seconds', 'Czas transkrypcji fragmentu.'))
+USER_LATENCY_SECONDS = REGISTRY.register(Histogram('dictation_user_latency_seconds', 'Czas od puszczenia skrótu do końca transkrypcji.'))
+AUDIO_QUEUE_DEPTH = REGISTRY.register(Gauge('dictation_audio_queue_depth', 'Liczba bloków audio oczekujących w kolejce.'))
+AUDIO_QUEUE_SECONDS = REGISTRY.register(Gauge('dictation_audio_queue_seconds', 'Sekundy audio oczekujące w kolejce (pamięć + dysk).'))
+AUDIO_DROPPED_SECONDS = REGISTRY.register(Counter('dictation_audio_dropped_seconds_total', 'Sekundy audio odrzucone przy pełnej kolejce.'))
+AUDIO_CALLBACK_STATUS = REGISTRY.register(Counter('dictation_audio_callback_status_total', 'Flagi statusu zgłoszone przez callback audio.', ('flag',)))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge('dictation_model_load_seconds', 'Czas ostatniego ładowania modelu.'))
+MODEL_WARMUP_SECONDS = REGISTRY.register(Gauge('dictation_model_warmup_seconds', 'Czas rozgrzewki modelu po załadowaniu.'))
+INFERENCE_WORKER_RESTARTS = REGISTRY.register(Counter('dictation_inference_worker_restarts_total', 'Ponowne uruchomienia procesu inferencji po awarii.'))
+DRAFT_LATENCY_SECONDS = REGISTRY.register(Histogram('dictation_draft_latency_seconds', 'Czas od wycięcia fragmentu do podglądu z modelu szkicu.'))
+DRAFT_DROPPED = REGISTRY.register(Counter('dictation_draft_dropped_total', 'Fragmenty pominięte przez model szkicu (nie nadążał).'))
+SCHEDULER_WAIT_SECONDS = {
+    'live': REGISTRY.register(Histogram('dictation_scheduler_live_wait_seconds', 'Oczekiwanie fragmentu dyktowania na model (planista).')),
+    'batch': REGISTRY.register(Histogram('dictation_scheduler_batch_wait_seconds', 'Oczekiwanie fragmentu zadania wsadowego na model (planista).')),
+}
+PROCESS_RSS_BYTES = REGISTRY.register(Gauge('process_resident_memory_bytes', 'Pamięć rezydentna procesu.'))
+PROCESS_RSS_BYTES.set_function(process_rss_bytes)
+
+
+def observe_chunk(split_reason, preprocessing_time, transcription_time):
+    CHUNKS.inc(split_reason)
+    PREPROCESSING_SECONDS.observe(preprocessing_time)
+    TRANSCRIPTION_SECONDS.observe(transcription_time)
+
+
+def count_callback_status(status):
+    """Zlicza flagi `sd.CallbackFlags` zgłoszone w callbacku audio."""
+    for flag in CALLBACK_STATUS_FLAGS:
+        if getattr(status, flag, False):
+            AUDIO_CALLBACK_STATUS.inc(flag)
+
+
+_preview = {'session_id': None, 'chunk': None, 'text': "", 'updated_at': None}
+_preview_lock = threading.Lock()
+
+
+def set_preview(session_id, chunk_index, text, updated_at):
+    """Ostatni podgląd tekstu (model szkicu) dla `/preview`."""
+    with _preview_lock:
+        _preview.update(session_id=session_id, chunk=chunk_index, text=text, updated_at=updated_at)
+
+
+def preview():
+    with _preview_lock:
+        return dict(_preview)
+
+
+# --- Serwer HTTP ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/preview':
+            body, content_type = json.dumps(preview(), ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8'
+        elif path in ('/metrics', '/'):
+            body, content_type = self.registry.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Pobieranie metryk co kilka sekund nie powinno zaśmiecać logów aplikacji
+        pass
+
+
+def start_metrics_server(host, port):
+    """Uruchamia serwer metryk w wątku w tle i zwraca go (lub None przy błędzie)."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        app_logger.error(f"❌ Nie udało się uruchomić serwera metryk na {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    app_logger.info(f"📈 Metryki na żywo: http://{host}:{server.server_address[1]}/metrics")
+    return server
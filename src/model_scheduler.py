@@ -0,0 +1,161 @@
+# src/model_scheduler.py
+"""
+Planista dostępu do jednego załadowanego modelu: dyktowanie na żywo przed zadaniami wsadowymi.
+
+Gdy na tej samej stacji działa demon dyktowania i `transcribe_file.py`, dwa
+modele konkurowały o te same rdzenie lub VRAM i latencja dyktowania rosła.
+Teraz zadania wsadowe (src/job_server.py) używają modelu demona przez
+`ModelScheduler`:
+
+- model wykonuje naraz jeden fragment; wywołanie czeka na swoją kolej,
+- fragmenty `live` (sesje skrótu) mają ścisły priorytet – kolejny fragment
+  `batch` startuje tylko wtedy, gdy nie czeka żaden fragment `live` i nie trwa
+  żadna sesja dyktowania (od naciśnięcia skrótu do wklejenia),
+- zadania wsadowe są cięte na fragmenty (jak w transcribe_file.py), więc
+  wywłaszczenie następuje na granicy fragmentu: sesja czeka najwyżej na
+  dokończenie fragmentu wsadowego rozpoczętego przed naciśnięciem skrótu,
+- czas oczekiwania każdej klasy trafia do histogramów serwera metryk i `stats()`.
+
+`ModelScheduler` ma interfejs loadera modelu (`is_ready`, `wait`, `reload`),
+więc `SessionEngine` używa go zamiast BackgroundModelLoader/InferenceWorker.
+"""
+import collections
+import threading
+import time
+
+from src import metrics_server
+from src.session_metrics import summarize
+
+LIVE = 'live'
+BATCH = 'batch'
+PRIORITY_CLASSES = (LIVE, BATCH)
+WAIT_HISTORY = 1000     # Ostatnie czasy oczekiwania na klasę (do stats())
+
+
+class ScheduledModel:
+    """
+    Model widziany przez jedną klasę priorytetu. `transcribe()` czeka na swoją kolej,
+    dekoduje cały fragment (segmenty faster-whisper są leniwe) i zwalnia model.
+    Z `model` (z `ModelScheduler.wait()`) wywołania idą zawsze do tego modelu, także
+    po przeładowaniu w tle; bez niego – do bieżącego modelu loadera.
+    """
+
+    def __init__(self, scheduler, priority, model=None):
+        self.scheduler = scheduler
+        self.priority = priority
+        self._model = model
+
+    def _target(self):
+        return self._model if self._model is not None else self.scheduler.model_loader.wait()
+
+    def __getattr__(self, name):
+        # Pozostałe atrybuty (hf_tokenizer, preprocesses_audio) pochodzą z modelu
+        return getattr(self._target(), name)
+
+    def transcribe(self, audio, **kwargs):
+        with self.scheduler.slot(self.priority):
+            segments, info = self._target().transcribe(audio, **kwargs)
+            segments = list(segments)
+        return iter(segments), info
+
+    def release(self):
+        """Koniec sesji: zwalnia przypięty model (proces inferencji zastąpiony przeładowaniem)."""
+        release = getattr(self._model, 'release', None)
+        if release is not None:
+            release()
+
+
+class ModelScheduler:
+    """Priorytetowy dostęp do modelu z `model_loader`; zob. opis modułu."""
+
+    def __init__(self, model_loader):
+        self.model_loader = model_loader
+        self._condition = threading.Condition()
+        self._busy = False
+        self._waiting = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._live_sessions = 0
+        self._waits = {priority: collections.deque(maxlen=WAIT_HISTORY) for priority in PRIORITY_CLASSES}
+        self._models = {priority: ScheduledModel(self, priority) for priority in PRIORITY_CLASSES}
+
+    # --- Interfejs loadera modelu (sesje dyktowania = klasa live) ---
+
+    def is_ready(self):
+        return self.model_loader.is_ready()
+
+    def wait(self, timeout=None):
+        """Model klasy live przypięty do modelu loadera z tej chwili (sesja nie zmienia modelu)."""
+        model = self.model_loader.wait(timeout)
+        return ScheduledModel(self, LIVE, model) if model is not None else None
+
+    def reload(self, settings):
+        self.model_loader.reload(settings)
+
+    def model(self, priority):
+        return self._models[priority]
+
+    # --- Sesje dyktowania ---
+
+    def begin_live(self):
+        """Naciśnięcie skrótu: nowe fragmenty wsadowe czekają aż do `end_live()`."""
+        with self._condition:
+            self._live_sessions += 1
+
+    def end_live(self):
+        with self._condition:
+            self._live_sessions -= 1
+            self._condition.notify_all()
+
+    # --- Przydział modelu ---
+
+    def _may_run(self, priority):
+        if self._busy:
+            return False
+        if priority == LIVE:
+            return True
+        return self._waiting[LIVE] == 0 and self._live_sessions == 0
+
+    def slot(self, priority):
+        return _Slot(self, priority)
+
+    def _acquire(self, priority):
+        start = time.perf_counter()
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while not self._may_run(priority):
+                    self._condition.wait()
+            finally:
+                self._waiting[priority] -= 1
+            self._busy = True
+        waited = time.perf_counter() - start
+        self._waits[priority].append(waited)
+        metrics_server.SCHEDULER_WAIT_SECONDS[priority].observe(waited)
+        return waited
+
+    def _release(self):
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
+
+    def queued(self, priority):
+        with self._condition:
+            return self._waiting[priority]
+
+    def stats(self):
+        """Podsumowanie czasów oczekiwania na model (count, mean, p50/p95/p99) dla każdej klasy."""
+        return {priority: summarize(list(self._waits[priority])) for priority in PRIORITY_CLASSES}
+
+
+class _Slot:
+    def __init__(self, scheduler, priority):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.waited = 0.0
+
+    def __enter__(self):
+        self.waited = self.scheduler._acquire(self.priority)
+        return self
+
+    def __exit__(self, *exc):
+        self.scheduler._release()
+        return False
@@ -0,0 +1,76 @@
+# src/output_sink.py
+"""
+Miejsca docelowe gotowego tekstu.
+
+`TypingOutputSink` kopiuje tekst do schowka i wpisuje go w aktywne okno
+(pyperclip + xdotool) – dotychczasowe zachowanie po puszczeniu skrótu.
+W trybie budżetu pamięci tekst jest oddawany do sinka także w trakcie
+sesji, aby transkrypcja godzinnego dyktowania nie rosła w pamięci.
+
+Po post-processingu (src/postprocessing.py) tekst trafia do sinka jako lista
+akcji `write_actions([('text', ...), ('key', 'enter'), ...])`.
+"""
+import logging
+import subprocess
+import time
+
+from src.postprocessing import Action, KEY_ACTIONS, render_text
+
+app_logger = logging.getLogger('app')
+
+
+class TypingOutputSink:
+    """Schowek + wpisanie tekstu w aktywnym oknie."""
+
+    def write(self, text):
+        self.write_actions([Action('text', text)])
+
+    def write_actions(self, actions):
+        import pyperclip
+        # Kopiowanie do schowka (klawisze jako ich odpowiedniki tekstowe)
+        pyperclip.copy(render_text(actions))
+        app_logger.info("✅ Skopiowano do schowka.")
+
+        # Wklejanie do aktywnego okna: tekst przez `xdotool type`, komendy klawiszy przez `xdotool key`
+        try:
+            time.sleep(0.1)
+            for action in actions:
+                if action.kind == 'key':
+                    subprocess.run(["xdotool", "key", "--clearmodifiers", KEY_ACTIONS[action.value][0]], check=True)
+                else:
+                    subprocess.run(["xdotool", "type", "--delay", "1", "--clearmodifiers", action.value], check=True)
+            app_logger.info("✅ Wklejono do aktywnego okna.")
+        except FileNotFoundError:
+            app_logger.error("❌ BŁĄD: Polecenie 'xdotool' nie zostało znalezione.")
+        except Exception as e:
+            app_logger.error(f"❌ Błąd podczas wklejania tekstu: {e}")
+
+
+class CollectingOutputSink:
+    """Zbiera tekst w pamięci (odtwarzanie sesji, testy)."""
+
+    def __init__(self):
+        self.texts = []
+
+    def write(self, text):
+        self.texts.append(text)
+
+    def write_actions(self, actions):
+        self.texts.append(render_text(actions))
+
+    @property
+    def text(self):
+        return "".join(self.texts)
+
+
+class NullOutputSink:
+    """Odrzuca tekst, zliczając jedynie znaki (test obciążeniowy pamięci)."""
+
+    def __init__(self):
+        self.characters = 0
+
+    def write(self, text):
+        self.characters += len(text)
+
+    def write_actions(self, actions):
+        self.characters += len(render_text(actions))
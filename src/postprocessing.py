@@ -0,0 +1,255 @@
+# src/postprocessing.py
+"""
+Post-processing tekstu fragmentu: komendy głosowe i poprawki terminów.
+
+Reguły z pliku słownika (`postprocessing_rules` w config.ini) są kompilowane
+do jednego automatu Aho-Corasick, więc tekst fragmentu jest przechodzony raz,
+niezależnie od liczby reguł. Dopasowania są nieczułe na wielkość liter, muszą
+obejmować całe słowa, a przy nakładaniu wygrywa najwcześniejsze, potem najdłuższe.
+
+Wynik to lista akcji dla sinka wyjścia: `('text', tekst)` i `('key', nazwa)`,
+np. "pierwsza linia nowa linia druga" -> text "pierwsza linia", key "enter",
+text "druga". Format pliku (sekcje dowolne, porządkują tylko reguły):
+
+    [komendy]
+    nowa linia = <enter>
+    kropka = .
+    [terminy]
+    post gres = PostgreSQL
+
+Zamiennik zaczynający się od znaku interpunkcyjnego jest doklejany do
+poprzedniego słowa. Przy klawiszach pomijane są sąsiednie spacje i interpunkcja
+dodana przez model (np. "nowa linia." -> sam enter), a przed wypowiedzianą
+interpunkcją i po niej – interpunkcja modelu ("test, kropka." -> "test.").
+"""
+import collections
+import configparser
+import logging
+import os
+import re
+
+app_logger = logging.getLogger('app')
+
+# Klawisze dostępne w regułach: nazwa -> (klawisz xdotool, odpowiednik tekstowy)
+KEY_ACTIONS = {
+    'enter': ('Return', '\n'),
+    'tab': ('Tab', '\t'),
+    'backspace': ('BackSpace', ''),
+    'escape': ('Escape', ''),
+}
+GLUE_PUNCTUATION = '.,;:!?…)'     # Zamiennik od tych znaków dokleja się do poprzedniego słowa
+MODEL_PUNCTUATION = '.,;:!?'       # Interpunkcja modelu pomijana tuż po komendzie
+_KEY_PATTERN = re.compile(r'<([a-z_]+)>')
+
+Action = collections.namedtuple('Action', ['kind', 'value'])
+
+
+class PostprocessingError(ValueError):
+    """Niepoprawny plik reguł (nieznany klawisz, pusta fraza)."""
+
+
+def parse_replacement(value):
+    """Zamiennik z pliku reguł -> lista akcji (`<enter>` itd. to klawisze, reszta to tekst)."""
+    actions = []
+    position = 0
+    for match in _KEY_PATTERN.finditer(value):
+        if match.group(1) not in KEY_ACTIONS:
+            raise PostprocessingError(f"nieznany klawisz <{match.group(1)}> (dostępne: {', '.join(KEY_ACTIONS)})")
+        if match.start() > position:
+            actions.append(Action('text', value[position:match.start()]))
+        actions.append(Action('key', match.group(1)))
+        position = match.end()
+    if position < len(value):
+        actions.append(Action('text', value[position:]))
+    return tuple(actions)
+
+
+def _is_word_char(character):
+    return character.isalnum() or character == '_'
+
+
+class PostProcessor:
+    """Automat Aho-Corasick nad frazami reguł; `process(text)` zwraca listę akcji."""
+
+    def __init__(self, rules):
+        # Węzły automatu: przejścia, połączenie awaryjne (fail), dopasowania (długość, akcje)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for phrase, replacement in rules.items():
+            self._add(phrase, replacement)
+        self._build_failure_links()
+        self.rule_count = len(rules)
+
+    def _add(self, phrase, replacement):
+        phrase = " ".join(phrase.lower().split())
+        if not phrase:
+            raise PostprocessingError("pusta fraza reguły")
+        node = 0
+        for character in phrase:
+            next_node = self._goto[node].get(character)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][character] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node] = [(len(phrase), parse_replacement(replacement))]
+
+    def _build_failure_links(self):
+        # Przejście wszerz: połączenie awaryjne węzła to najdłuższy właściwy sufiks jego frazy w drzewie
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for character, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and character not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(character, 0) if node else 0
+                # Dopasowania krótszych fraz kończących się w tym samym miejscu
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def _matches(self, text):
+        """Jedno przejście po tekście: (początek, koniec, akcje) dopasowań na granicach słów."""
+        matches = []
+        node = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        length = len(text)
+        for index, character in enumerate(text):
+            lowered = character.lower()
+            if len(lowered) != 1:
+                lowered = character
+            elif lowered.isspace():
+                lowered = ' '
+            while node and lowered not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(lowered, 0)
+            if output[node] and (index + 1 == length or not _is_word_char(text[index + 1])):
+                for phrase_length, actions in output[node]:
+                    start = index + 1 - phrase_length
+                    if start == 0 or not _is_word_char(text[start - 1]):
+                        matches.append((start, index + 1, actions))
+        return matches
+
+    def process(self, text):
+        """Tekst fragmentu -> lista akcji (sąsiednie fragmenty tekstu są łączone)."""
+        result = _ActionBuilder()
+        position = 0
+        # Najwcześniejsze, potem najdłuższe dopasowanie; nakładające się są pomijane
+        for start, end, actions in sorted(self._matches(text), key=lambda m: (m[0], m[0] - m[1])):
+            if start < position:
+                continue
+            result.text(text[position:start])
+            position = end
+            for action in actions:
+                if action.kind == 'key':
+                    result.key(action.value)
+                    # Spacje i interpunkcja modelu po komendzie klawisza są pomijane
+                    while position < len(text) and (text[position].isspace() or text[position] in MODEL_PUNCTUATION):
+                        position += 1
+                else:
+                    glue = action.value[:1] in GLUE_PUNCTUATION
+                    result.text(action.value, glue=glue)
+                    # Interpunkcja modelu tuż po wypowiedzianej ("kropka.") byłaby podwójna
+                    while glue and position < len(text) and text[position] in MODEL_PUNCTUATION:
+                        position += 1
+        result.text(text[position:])
+        return result.actions
+
+
+class _ActionBuilder:
+    def __init__(self):
+        self.actions = []
+        self._command_end = 0   # Długość ostatniej akcji tekstowej do końca ostatniej komendy (jej znaki zostają)
+
+    def text(self, value, glue=False):
+        if glue:
+            # Interpunkcja modelu tuż przed wypowiedzianą ("test, kropka") byłaby podwójna
+            self._strip_trailing(model_punctuation=True)
+        if self.actions and self.actions[-1].kind == 'key':
+            value = value.lstrip()
+        if not value:
+            return
+        if self.actions and self.actions[-1].kind == 'text':
+            self.actions[-1] = Action('text', self.actions[-1].value + value)
+        else:
+            self.actions.append(Action('text', value))
+            self._command_end = 0
+        if glue:
+            self._command_end = len(self.actions[-1].value)
+
+    def key(self, name):
+        self._strip_trailing()
+        self.actions.append(Action('key', name))
+
+    def _strip_trailing(self, model_punctuation=False):
+        if self.actions and self.actions[-1].kind == 'text':
+            value = self.actions[-1].value.rstrip()
+            if model_punctuation and len(value) > self._command_end and value[-1] in MODEL_PUNCTUATION:
+                value = value[:-1].rstrip()
+            if value:
+                self.actions[-1] = Action('text', value)
+            else:
+                self.actions.pop()
+
+
+# --- Akcje ---
+
+def render_text(actions):
+    """Tekstowy odpowiednik akcji (klawisze jako znaki, np. enter -> '\\n')."""
+    return "".join(a.value if a.kind == 'text' else KEY_ACTIONS[a.value][1] for a in actions)
+
+
+def strip_actions(actions):
+    """Usuwa białe znaki z początku i końca listy akcji (jak str.strip dla tekstu)."""
+    actions = list(actions)
+    if actions and actions[0].kind == 'text':
+        actions[0] = Action('text', actions[0].value.lstrip())
+    if actions and actions[-1].kind == 'text':
+        actions[-1] = Action('text', actions[-1].value.rstrip())
+    return [a for a in actions if a.kind == 'key' or a.value]
+
+
+# --- Wczytywanie reguł ---
+
+def load_rules(path):
+    """Słownik fraza -> zamiennik z pliku reguł. Rzuca PostprocessingError lub OSError."""
+    parser = configparser.ConfigParser(interpolation=None, delimiters=('=',), comment_prefixes=('#',), inline_comment_prefixes=None)
+    parser.optionxform = str # Wielkość liter w zamiennikach ma znaczenie; frazy są i tak porównywane bez niej
+    try:
+        with open(path, encoding='utf-8') as f:
+            parser.read_file(f)
+    except configparser.Error as e:
+        raise PostprocessingError(f"nie można sparsować {path}: {e}") from e
+    rules = {}
+    for section in parser.sections():
+        for phrase, replacement in parser.items(section):
+            rules[phrase] = replacement
+    return rules
+
+
+_cache = {}
+
+
+def load_postprocessor(path):
+    """
+    PostProcessor dla pliku reguł albo None (pusta ścieżka lub błąd – błąd jest logowany).
+    Wywoływane przy tworzeniu sesji: automat jest kompilowany ponownie tylko po zmianie pliku,
+    więc edycja reguł działa od następnej sesji dyktowania.
+    """
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        postprocessor = PostProcessor(load_rules(path))
+    except (OSError, PostprocessingError) as e:
+        app_logger.error(f"❌ Post-processing wyłączony – błąd pliku reguł {path}: {e}")
+        return None
+    _cache[path] = (mtime, postprocessor)
+    app_logger.info(f"✏️ Reguły post-processingu: {postprocessor.rule_count} z {path}")
+    return postprocessor
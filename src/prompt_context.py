@@ -0,0 +1,107 @@
+# src/prompt_context.py
+"""
+Kontekst promptu (`initial_prompt`) z budżetem w tokenach.
+
+Wcześniej promptem było ostatnie 50 znaków tekstu: cięcie wypadało w środku
+słowa, a 50 znaków to po polsku zupełnie inna liczba tokenów niż po angielsku.
+`PromptContext` trzyma końcówkę transkrypcji jako identyfikatory tokenów
+tokenizera modelu – każdy nowy fragment jest tokenizowany raz, słowo po słowie,
+z zapamiętaniem początków słów i zdań. Prompt to ostatnie `prompt_max_tokens`
+tokenów, ucięte na początku zdania (lub słowa), poprzedzone opcjonalnym
+słownikiem (`prompt_glossary`), którego tokeny są liczone raz i trzymane w cache.
+
+Model bez tokenizera (atrapa w symulacji) dostaje prompt tekstowy, a budżet
+jest wtedy liczony w słowach.
+"""
+import functools
+import logging
+import re
+
+transcription_logger = logging.getLogger('transcription')
+
+MAX_PROMPT_TOKENS = 223         # Whisper bierze najwyżej max_length // 2 - 1 tokenów poprzedniego tekstu
+STORED_BUDGETS = 4              # Ile budżetów tokenów trzymamy (zapas na szukanie początku zdania)
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?…])\s+')
+
+
+def model_tokenizer(model):
+    """Tokenizer HF (`tokenizers.Tokenizer`) modelu faster-whisper lub None (atrapa modelu)."""
+    return getattr(model, 'hf_tokenizer', None)
+
+
+def _encode_words(tokenizer, words):
+    """Tokeny kolejnych słów, każde ze spacją na początku – jak w środku zdania."""
+    if tokenizer is None:
+        return [[word] for word in words]
+    return [encoding.ids for encoding in tokenizer.encode_batch([" " + word for word in words], add_special_tokens=False)]
+
+
+@functools.lru_cache(maxsize=8)
+def encode_glossary(tokenizer, glossary, max_tokens=MAX_PROMPT_TOKENS):
+    """Tokeny słownika (cache na parę tokenizer/tekst), najwyżej `max_tokens`."""
+    tokens = [token for word_tokens in _encode_words(tokenizer, glossary.split()) for token in word_tokens]
+    if len(tokens) > max_tokens:
+        transcription_logger.warning(f"⚠️ prompt_glossary ma {len(tokens)} tokenów – używam pierwszych {max_tokens}.")
+        tokens = tokens[:max_tokens]
+    return tuple(tokens)
+
+
+class PromptContext:
+    """
+    Końcówka transkrypcji sesji jako tokeny. `append(text)` po każdym fragmencie,
+    `prompt()` przed transkrypcją kolejnego.
+    """
+
+    def __init__(self, max_tokens, tokenizer=None, glossary=""):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+        self.glossary = encode_glossary(tokenizer, glossary, MAX_PROMPT_TOKENS - max_tokens) if glossary.strip() else ()
+        self._tokens = []
+        self._word_starts = []      # Indeksy tokenów rozpoczynających słowo (rosnąco)
+        self._sentence_starts = []  # Indeksy tokenów rozpoczynających zdanie (rosnąco)
+
+    def append(self, text):
+        """Dopisuje tekst fragmentu (tokenizowany tylko ten fragment)."""
+        for sentence in _SENTENCE_SPLIT.split(text.strip()):
+            words = sentence.split()
+            if not words:
+                continue
+            self._sentence_starts.append(len(self._tokens))
+            for word_tokens in _encode_words(self.tokenizer, words):
+                self._word_starts.append(len(self._tokens))
+                self._tokens.extend(word_tokens)
+        if len(self._tokens) > STORED_BUDGETS * max(self.max_tokens, 1):
+            self._drop_front(len(self._tokens) - STORED_BUDGETS * max(self.max_tokens, 1))
+
+    def _drop_front(self, count):
+        del self._tokens[:count]
+        self._word_starts = [i - count for i in self._word_starts if i >= count]
+        self._sentence_starts = [i - count for i in self._sentence_starts if i >= count]
+
+    def _cut_index(self):
+        """
+        Początek końcówki mieszczącej się w budżecie: pierwsze zdanie, jeśli zostaje
+        co najmniej połowa budżetu, w przeciwnym razie pierwsze pełne słowo.
+        """
+        lowest = len(self._tokens) - self.max_tokens
+        if lowest <= 0:
+            return 0
+        sentence = next((i for i in self._sentence_starts if i >= lowest), None)
+        if sentence is not None and len(self._tokens) - sentence >= self.max_tokens / 2:
+            return sentence
+        return next((i for i in self._word_starts if i >= lowest), lowest)
+
+    def prompt(self):
+        """Prompt dla `model.transcribe` (lista tokenów lub tekst bez tokenizera) albo None."""
+        tail = self._tokens[self._cut_index():] if self.max_tokens > 0 else []
+        tokens = list(self.glossary) + tail
+        if not tokens:
+            return None
+        return tokens if self.tokenizer is not None else " ".join(tokens)
+
+    @staticmethod
+    def token_count(prompt):
+        """Liczba tokenów promptu (słów dla promptu tekstowego)."""
+        if prompt is None:
+            return 0
+        return len(prompt.split()) if isinstance(prompt, str) else len(prompt)
@@ -0,0 +1,133 @@
+# src/resampler.py
+"""
+Przechwytywanie w natywnej częstotliwości urządzenia i strumieniowe
+przepróbkowanie do 16 kHz.
+
+Strumień otwierany z `samplerate=16000` na wielu urządzeniach USB i w PipeWire
+wymusza kosztowny resampler serwera dźwięku albo w ogóle się nie otwiera.
+Dlatego strumień pracuje w częstotliwości natywnej urządzenia, a bloki są
+przepróbkowywane tutaj: filtr polifazowy (okienkowany sinc, okno Kaisera)
+dla stosunku L/M, np. 48000 -> 16000 to 1/3, a 44100 -> 16000 to 160/441.
+Stan filtra (końcówka poprzedniego bloku i faza) jest przenoszony między
+blokami, więc wynik dla strumienia bloków jest identyczny jak dla całego
+nagrania naraz – bez trzasków na granicach bloków.
+
+Filtr jest projektowany w numpy (bez importu scipy przy starcie).
+"""
+import logging
+import math
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+
+app_logger = logging.getLogger('app')
+
+FILTER_HALF_WIDTH = 24      # Połowa długości filtra w próbkach wyjścia (16 kHz): opóźnienie 1.5 ms
+KAISER_BETA = 8.6           # Tłumienie pasma zaporowego ~85 dB
+CUTOFF_RATIO = 0.9          # Częstotliwość odcięcia jako ułamek nowej częstotliwości Nyquista (7.2 kHz)
+
+
+def taps_per_phase(up, down, half_width=FILTER_HALF_WIDTH):
+    """Długość filtra na fazę (w próbkach wejścia) tak, by filtr obejmował `2 * half_width` próbek wyjścia."""
+    return math.ceil(2 * half_width * max(up, down) / up)
+
+
+def design_filter(up, down, taps_per_phase):
+    """Filtr dolnoprzepustowy (okienkowany sinc) dla przepróbkowania `up`/`down`, długość `up * taps_per_phase`."""
+    length = up * taps_per_phase
+    cutoff = CUTOFF_RATIO / max(up, down)    # Ułamek częstotliwości Nyquista sygnału nadpróbkowanego
+    n = np.arange(length) - (length - 1) / 2
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(length, KAISER_BETA)
+    return taps * (up / taps.sum())     # Wzmocnienie `up` kompensuje zera wstawione przy nadpróbkowaniu
+
+
+class StreamingResampler:
+    """
+    Przepróbkowanie bloków z `input_rate` do `output_rate` z zachowaniem stanu
+    między blokami. `process(block)` przyjmuje blok (N,) lub (N, 1) i zwraca
+    nową tablicę float32 o tym samym układzie wymiarów.
+    """
+
+    def __init__(self, input_rate, output_rate=SAMPLE_RATE):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+        divisor = math.gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // divisor
+        self.down = self.input_rate // divisor
+        self.passthrough = self.up == self.down
+        self.taps_per_phase = 1 if self.passthrough else taps_per_phase(self.up, self.down)
+        if not self.passthrough:
+            taps = design_filter(self.up, self.down, self.taps_per_phase)
+            # Wiersz p: współczynniki fazy p w kolejności próbek wejścia (od najstarszej)
+            self._phases = np.ascontiguousarray(taps.reshape(self.taps_per_phase, self.up).T[:, ::-1], dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Zeruje stan (nowe nagranie)."""
+        self._history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self._position = 0  # Pozycja kolejnej próbki wyjścia (w próbkach nadpróbkowanych) względem początku bloku
+
+    @property
+    def delay_seconds(self):
+        """Opóźnienie grupowe filtra."""
+        return 0.0 if self.passthrough else (self.taps_per_phase * self.up - 1) / 2 / (self.up * self.input_rate)
+
+    def output_length(self, frames):
+        """Liczba próbek wyjścia dla kolejnego bloku `frames` próbek wejścia."""
+        if self.passthrough:
+            return frames
+        return max(0, -(-(frames * self.up - self._position) // self.down))
+
+    def process(self, block):
+        samples = np.asarray(block, dtype=np.float32)
+        shape_2d = samples.ndim == 2
+        samples = samples.reshape(-1)
+        if self.passthrough:
+            out = samples.copy()
+        else:
+            count = self.output_length(len(samples))
+            positions = self._position + self.down * np.arange(count)
+            inputs, phases = np.divmod(positions, self.up)
+            buffer = np.concatenate((self._history, samples))
+            windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps_per_phase)
+            # y[n] = suma h[p + k*up] * x[i - k]; okno `windows[i]` kończy się próbką x[i]
+            out = np.einsum('ij,ij->i', windows[inputs], self._phases[phases])
+            self._position += self.down * count - self.up * len(samples)
+            self._history = buffer[len(buffer) - (self.taps_per_phase - 1):].copy()
+        return out.reshape(-1, 1) if shape_2d else out
+
+
+def native_samplerate(requested=0, device=None):
+    """
+    Częstotliwość otwarcia strumienia wejściowego: `requested` (> 0) albo
+    domyślna częstotliwość urządzenia wejściowego (0 = natywna).
+    """
+    if requested:
+        return int(requested)
+    import sounddevice as sd
+    try:
+        return int(sd.query_devices(device, 'input')['default_samplerate'])
+    except Exception as e:
+        app_logger.warning(f"⚠️ Nie można odczytać natywnej częstotliwości urządzenia ({e}) – używam {SAMPLE_RATE} Hz.")
+        return SAMPLE_RATE
+
+
+def open_input_stream(callback, requested_rate=0, block_seconds=None, device=None):
+    """
+    `sd.InputStream` (mono, float32) w natywnej częstotliwości urządzenia.
+    `callback(block, status)` dostaje bloki już przepróbkowane do 16 kHz, kształt (N, 1).
+    Zwraca (strumień, resampler); strumień nie jest jeszcze uruchomiony.
+    """
+    import sounddevice as sd
+    rate = native_samplerate(requested_rate, device)
+    resampler = StreamingResampler(rate)
+
+    def stream_callback(indata, frames, time, status):
+        callback(resampler.process(indata), status)
+
+    blocksize = int(rate * block_seconds) if block_seconds else 0
+    stream = sd.InputStream(samplerate=rate, channels=1, dtype='float32', blocksize=blocksize,
+                            device=device, callback=stream_callback)
+    if not resampler.passthrough:
+        app_logger.debug(f"🎚️  Przechwytywanie {rate} Hz -> {SAMPLE_RATE} Hz (filtr polifazowy {resampler.up}/{resampler.down}).")
+    return stream, resampler
@@ -0,0 +1,181 @@
+# src/session_archive.py
+"""
+Archiwum sesji dyktowania: surowe audio (FLAC lub Opus), tekst końcowy i metryki.
+
+Gdy `session_archive_dir` w sekcji [logging] nie jest pusty, każda sesja po
+wklejeniu tekstu trafia do kolejki `SessionArchiver`. Kodowanie (PyAV) i zapis
+odbywają się w jednym wątku w tle o obniżonym priorytecie, więc nie konkurują
+z transkrypcją; gdy archiwizacja nie nadąża, kolejne sesje są pomijane (z
+ostrzeżeniem), a finalizacja sesji nigdy nie czeka.
+
+Wpis archiwum to plik audio i plik `.json` o tej samej nazwie: bloki callbacku
+(rozmiary i chwile przechwycenia), chwila puszczenia skrótu, ustawienia sesji,
+tekst końcowy i rekord metryk. `load_archive()` zwraca z nich `SessionRecording`,
+więc wpis można podać wprost do tools/replay_session.py i benchmarków
+(`load_recording` rozpoznaje rozszerzenie `.json`). Po każdym zapisie najstarsze
+wpisy są usuwane, aż archiwum zmieści się w limicie rozmiaru i wieku.
+"""
+import datetime
+import dataclasses
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import numpy as np
+
+from src.audio_io import load_audio, open_audio_writer
+from src.core_utils import lower_thread_priority
+from src.session_metrics import resolve_path
+from src.session_recorder import SessionRecording, settings_from_dict
+
+app_logger = logging.getLogger('app')
+
+ARCHIVE_EXTENSIONS = {'flac': '.flac', 'opus': '.opus'}
+ARCHIVE_QUEUE_SESSIONS = 4      # Sesje czekające na zakodowanie; kolejne są pomijane
+ARCHIVE_NICE = 15               # Obniżenie priorytetu wątku archiwizacji
+ARCHIVE_WRITE_SECONDS = 5.0     # [s] Audio podawane do kodera porcjami tej długości
+
+
+def write_archive(directory, session_id, recording, transcript, record, audio_format='flac'):
+    """Zapisuje wpis archiwum (audio + .json) i zwraca ścieżkę pliku .json."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = os.path.join(directory, f"{stamp}_{session_id}")
+    audio_path = base + ARCHIVE_EXTENSIONS[audio_format]
+    writer = open_audio_writer(audio_path, recording.samplerate)
+    try:
+        step = int(ARCHIVE_WRITE_SECONDS * recording.samplerate)
+        for start in range(0, len(recording.audio), step):
+            writer.write(recording.audio[start:start + step])
+    finally:
+        writer.close()
+
+    entry = {
+        'session_id': session_id,
+        'audio': os.path.basename(audio_path),
+        'format': audio_format,
+        'samplerate': recording.samplerate,
+        'duration': round(recording.duration, 3),
+        'released_at': round(float(recording.released_at), 6),
+        'block_sizes': [int(size) for size in recording.block_sizes],
+        'timestamps': [round(float(t), 6) for t in recording.timestamps],
+        'settings': dataclasses.asdict(recording.settings),
+        'transcript': transcript,
+        'metrics': record,
+    }
+    # Plik .json powstaje jako ostatni – wpis bez niego (przerwany zapis) jest pomijany przy odczycie
+    temporary_path = base + '.json.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(temporary_path, base + '.json')
+    return base + '.json'
+
+
+def load_archive_entry(path):
+    """Słownik wpisu archiwum (.json) z bezwzględną ścieżką pliku audio w kluczu `audio_path`."""
+    with open(path, encoding='utf-8') as f:
+        entry = json.load(f)
+    entry['audio_path'] = os.path.join(os.path.dirname(os.path.abspath(path)), entry['audio'])
+    return entry
+
+
+def load_archive(path):
+    """Wpis archiwum jako SessionRecording (do odtwarzania przez replay_recording)."""
+    entry = load_archive_entry(path)
+    block_sizes = np.array(entry['block_sizes'], dtype=np.int64)
+    audio = load_audio(entry['audio_path'], samplerate=entry['samplerate'])
+    # Koder stratny może zwrócić kilka próbek więcej lub mniej niż zapisano
+    total = int(block_sizes.sum())
+    audio = np.pad(audio[:total], (0, max(0, total - len(audio))))
+    return SessionRecording(
+        audio=audio,
+        block_sizes=block_sizes,
+        timestamps=np.array(entry['timestamps'], dtype=np.float64),
+        released_at=float(entry['released_at']),
+        samplerate=int(entry['samplerate']),
+        settings=settings_from_dict(entry['settings']),
+    )
+
+
+def archive_entries(directory):
+    """Ścieżki plików .json wpisów archiwum, od najstarszego."""
+    return sorted(glob.glob(os.path.join(directory, '*.json')), key=os.path.getmtime)
+
+
+def enforce_retention(directory, max_mb, max_days, now=None):
+    """
+    Usuwa wpisy starsze niż `max_days` (0 = bez limitu wieku), a potem najstarsze,
+    dopóki archiwum przekracza `max_mb`. Zwraca (liczba usuniętych wpisów, zwolnione bajty).
+    """
+    now = now if now is not None else time.time()
+    entries = []
+    for path in archive_entries(directory):
+        base = os.path.splitext(path)[0]
+        files = [path] + [base + extension for extension in ARCHIVE_EXTENSIONS.values() if os.path.exists(base + extension)]
+        entries.append((os.path.getmtime(path), files, sum(os.path.getsize(f) for f in files)))
+    total = sum(size for _, _, size in entries)
+    removed = freed = 0
+    for mtime, files, size in entries:
+        too_old = max_days > 0 and now - mtime > max_days * 86400
+        if not too_old and total <= max_mb * 2**20:
+            break
+        for file_path in files:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+class SessionArchiver:
+    """
+    Kolejka archiwizacji z wątkiem w tle uruchamianym przy pierwszej sesji.
+    Katalog, format i limity pochodzą z ustawień każdej sesji (zmiany config.ini działają od razu).
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=ARCHIVE_QUEUE_SESSIONS)
+        self._thread = None
+        self.archived = 0
+        self.skipped = 0
+
+    def submit(self, settings, session_id, recording, transcript, record):
+        """Nie blokuje. Zwraca False, jeśli kolejka jest pełna (sesja nie zostanie zarchiwizowana)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="session-archiver", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait((settings, session_id, recording, transcript, record))
+            return True
+        except queue.Full:
+            self.skipped += 1
+            app_logger.warning("⚠️ Archiwizacja sesji nie nadąża – sesja %s nie zostanie zarchiwizowana.", session_id)
+            return False
+
+    def wait_idle(self):
+        """Czeka na zapisanie wszystkich sesji z kolejki (testy, benchmarki)."""
+        self._queue.join()
+
+    def _run(self):
+        lower_thread_priority(ARCHIVE_NICE)
+        while True:
+            settings, session_id, recording, transcript, record = self._queue.get()
+            directory = resolve_path(settings.session_archive_dir)
+            try:
+                start_time = time.perf_counter()
+                path = write_archive(directory, session_id, recording, transcript, record, settings.session_archive_format)
+                self.archived += 1
+                app_logger.debug("🗄️ Sesja zarchiwizowana w %.2fs: %s", time.perf_counter() - start_time, path)
+                removed, freed = enforce_retention(directory, settings.session_archive_max_mb, settings.session_archive_max_days)
+                if removed:
+                    app_logger.info("🗄️ Archiwum sesji: usunięto %d najstarszych wpisów (%.1f MB).", removed, freed / 2**20)
+            except Exception as e:
+                app_logger.error(f"❌ Nie udało się zarchiwizować sesji {session_id}: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,577 @@
+# src/session_engine.py
+"""
+Silnik sesji dyktowania w trybie strumieniowym.
+
+Każde naciśnięcie skrótu tworzy niezależny obiekt `DictationSession` z własną
+kolejką audio, buforem fragmentu, tekstem, metrykami i profilerem. Callbacki
+skrótu (wątek listenera pynput) tylko rozpoczynają i kończą nagrywanie –
+nigdy nie czekają na transkrypcję. Dokończenie sesji (ostatni fragment,
+wklejenie, statystyki) odbywa się w wątku finalizującym `SessionEngine`.
+
+Sesje nakładające się w czasie są obsługiwane po kolejności naciśnięć:
+nowa sesja nagrywa od razu, ale transkrybuje dopiero po zakończeniu
+poprzedniej (jej audio czeka w kolejce), więc tekst trafia do okna w tej
+samej kolejności, w jakiej był dyktowany.
+
+Wszystkie wątki sesji czekają na zdarzenia (kolejka audio, Event), a nie
+odpytują w pętli – w bezczynności silnik nie zużywa CPU.
+
+Opcjonalny model szkicu (`draft`, src/draft_preview.py) dostaje każdy fragment
+równolegle z modelem głównym i daje podgląd na żywo; sesja nigdy na niego nie czeka.
+"""
+import functools
+import logging
+import queue
+import threading
+import time
+
+from src.audio_preprocessing import apply_preprocessing_pipeline, SAMPLE_RATE
+from src.audio_queue import BoundedAudioQueue, DEGRADED_BEAM_SIZE
+from src.chunking import ChunkBuffer
+from src.resampler import open_input_stream
+from src.silence_compaction import CompactionStats, chunk_levels, compact_silence, has_speech
+from src.time_stretch import time_compress
+from src.postprocessing import Action, load_postprocessor, render_text, strip_actions
+from src.prompt_context import PromptContext, model_tokenizer
+from src import memory_budget
+from src import metrics_server
+from src.session_metrics import SessionMetrics, resolve_path
+from src.session_profiler import SessionProfiler
+from src.session_recorder import SessionRecorder
+from src.text_metrics import character_error_rate, error_counts
+
+app_logger = logging.getLogger('app')
+transcription_logger = logging.getLogger('transcription')
+performance_logger = logging.getLogger('performance')
+
+
+
+class DictationSession:
+    """
+    Jedna sesja dyktowania: od naciśnięcia do wklejenia tekstu.
+
+    `audio_capture` to PersistentAudioCapture (tryb persistent), `None` w trybie
+    on_demand (sesja otwiera własny strumień) albo `False`, gdy bloki są podawane
+    z zewnątrz przez `enqueue()` (odtwarzanie, testy). Sesja `previous` musi się
+    zakończyć, zanim ta zacznie transkrybować. `draft` to DraftTranscriber podglądu (lub None),
+    `archiver` to SessionArchiver (src/session_archive.py) używany przy `session_archive_dir`.
+    """
+
+    def __init__(self, settings, model_loader, output_sink, audio_capture=None, previous=None,
+                 mode='streaming', audio_queue=None, record_session=True, draft=None, archiver=None):
+        self.settings = settings
+        self.model_loader = model_loader
+        self.output_sink = output_sink
+        self.audio_capture = audio_capture
+        self.previous = previous
+        self.metrics = SessionMetrics(settings, mode=mode)
+        self.session_id = self.metrics.session_id
+        self.profiler = SessionProfiler(settings, self.session_id)
+        self.recorder = None
+        # Bloki audio zbiera ten sam rejestrator dla nagrania .npz i dla archiwum sesji
+        self.archiver = archiver if settings.session_archive_dir else None
+        if record_session and (settings.session_recording_dir or self.archiver is not None):
+            if memory_budget.is_enabled(settings):
+                app_logger.info("💾 Nagrywanie i archiwizacja sesji są pomijane w trybie budżetu pamięci (nagranie trzyma całe audio).")
+                self.archiver = None
+            else:
+                self.recorder = SessionRecorder(settings.session_recording_dir, self.session_id, settings)
+        # Nowa kolejka na każdą sesję: limit i polityka przepełnienia pochodzą z ustawień tej sesji
+        self.audio_queue = audio_queue if audio_queue is not None else BoundedAudioQueue.from_settings(settings)
+
+        self.pending = []               # Akcje wyjścia (tekst, klawisze), które nie trafiły jeszcze do sinka
+        # Komendy głosowe i poprawki terminów; automat jest kompilowany ponownie tylko po zmianie pliku reguł
+        self.postprocessor = load_postprocessor(resolve_path(settings.postprocessing_rules)) if settings.postprocessing_rules else None
+        self.postprocessing_time = 0.0
+        self.compaction = CompactionStats()
+        self.prompt_context = None      # Końcówka tekstu sesji jako tokeny (tworzona z tokenizerem modelu)
+        self.draft = draft
+        self._drafts = {}               # indeks fragmentu -> (tekst szkicu, latencja szkicu)
+        self._finals = {}               # indeks fragmentu -> (tekst modelu głównego, latencja od wycięcia)
+        self._draft_lock = threading.Lock()
+        self._draft_closed = False      # Po finalizacji spóźnione szkice są pomijane
+        self.delivered_characters = 0
+        self.started_at = None
+        self.released_at = None
+        self.transcription_finished_at = None
+        self._overflows_at_start = 0.0
+        self._released = threading.Event()
+        self._transcribed = threading.Event()
+        self.finished = threading.Event()   # Ustawiane po wklejeniu i zapisaniu statystyk
+        self._recording_thread = None
+        self._consumer_thread = None
+        self._model = None
+
+    # --- Nagrywanie ---
+
+    def start(self):
+        """Rozpoczyna nagrywanie i uruchamia wątek transkrybujący. Nie blokuje."""
+        self.started_at = time.time()
+        self._overflows_at_start = metrics_server.AUDIO_CALLBACK_STATUS.value('input_overflow')
+        if self.audio_capture:
+            # Strumień jest już otwarty: sesja zaczyna się od bufora pre-roll, bez wątku nagrywającego
+            preroll_duration = self.audio_capture.begin_session(self.enqueue)
+            app_logger.info(f"🎙️  Nagrywanie (pre-roll: {preroll_duration:.2f}s)...")
+            self.audio_capture.log_stats()
+        elif self.audio_capture is None:
+            self._recording_thread = threading.Thread(target=self._record, name=f"recording-{self.session_id}")
+            self._recording_thread.start()
+        self._consumer_thread = threading.Thread(target=self._consume, name=f"transcription-{self.session_id}")
+        self._consumer_thread.start()
+        return self
+
+    def enqueue(self, block):
+        """Wkłada blok audio do kolejki sesji (chwila przechwycenia jest zapisywana przez kolejkę)."""
+        if self.recorder is not None:
+            self.recorder.record(block)
+        self.audio_queue.put(block)
+
+    def _record(self):
+        """Wątek Producenta (tryb on_demand): strumień otwarty do puszczenia skrótu."""
+        app_logger.info("🎙️  Wątek nagrywający uruchomiony.")
+
+        def audio_callback(block, status):
+            """Callback strumienia (blok już przepróbkowany do 16 kHz)."""
+            if status:
+                metrics_server.count_callback_status(status)
+                app_logger.warning("Status strumienia audio: %s", status)
+            self.enqueue(block)
+
+        try:
+            stream, _ = open_input_stream(audio_callback, self.settings.capture_samplerate)
+            with stream:
+                self._released.wait()
+        except Exception as e:
+            app_logger.error(f"❌ Błąd w wątku nagrywającym: {e}")
+        finally:
+            # Strumień zamknięty – żaden blok już nie przyjdzie
+            self.audio_queue.end_input()
+        app_logger.info("🎙️  Wątek nagrywający zakończony.")
+
+    def release(self):
+        """Kończy nagrywanie (puszczenie skrótu). Nie czeka na transkrypcję."""
+        self.released_at = time.time()
+        if self.recorder is not None:
+            self.recorder.mark_release()
+        if self.audio_capture:
+            self.audio_capture.end_session() # Dostarcza ostatni blok przed zamknięciem kolejki
+            self.audio_queue.end_input()
+        elif self.audio_capture is False:
+            self.audio_queue.end_input()
+        self._released.set()
+
+    # --- Transkrypcja ---
+
+    def _get_model(self):
+        # Model jest ustalany raz na sesję – przeładowanie w tle nie podmieni go w trakcie dyktowania.
+        if self._model is None:
+            if not self.model_loader.is_ready():
+                transcription_logger.info("⏳ Model jeszcze się ładuje – audio jest buforowane do czasu jego gotowości...")
+            self._model = self.model_loader.wait()
+        return self._model
+
+    def _release_model(self):
+        # Uchwyt przypięty na sesję (InferenceWorker, ModelScheduler) zwalnia model zastąpiony przeładowaniem
+        release = getattr(self._model, 'release', None)
+        if release is not None:
+            release()
+
+    def _consume(self):
+        """
+        Wątek Konsumenta: pobiera audio, tnie na fragmenty, przetwarza i transkrybuje.
+        Czeka na kolejkę (bez odpytywania); kończy się po zamknięciu wejścia i opróżnieniu kolejki.
+        """
+        step = self.profiler.step
+        try:
+            if self.previous is not None and not self.previous.finished.is_set():
+                transcription_logger.info("⏳ Poprzednia sesja jeszcze się kończy – audio jest buforowane do czasu jej wklejenia...")
+                self.previous.finished.wait()
+            self.previous = None # Poprzednia sesja nie jest dłużej potrzebna (zwalnia jej pamięć)
+
+            transcription_logger.info("🧠 Wątek transkrybujący uruchomiony.")
+            # Bufor bieżącego fragmentu: RMS liczony przyrostowo, bez sklejania całego bufora przy każdym bloku
+            chunk_buffer = ChunkBuffer(self.settings)
+            last_enqueued_at = None
+            while True:
+                try:
+                    last_enqueued_at, audio_chunk = self.audio_queue.get()
+                except queue.Empty:
+                    break # Nagrywanie zakończone i kolejka pusta
+                chunk_buffer.append(audio_chunk)
+
+                # Cięcie na ciszy (VAD) lub na sztywno po osiągnięciu vad_max_buffer_seconds
+                split_index, split_reason = chunk_buffer.find_split()
+                if split_index is not None:
+                    # Fragment jest wyjmowany z bufora – reszta danych staje się nowym buforem
+                    levels = chunk_buffer.levels(split_index)
+                    chunk_to_process = chunk_buffer.take(split_index)
+                    model_instance = self._get_model()
+                    beam_size = DEGRADED_BEAM_SIZE if self.audio_queue.degraded else None
+                    with step("chunk"):
+                        self.process_chunk(chunk_to_process, model_instance, split_reason=split_reason,
+                                           queue_wait=time.perf_counter() - last_enqueued_at, beam_size=beam_size,
+                                           levels=levels)
+                    # Przetworzone audio jest zwalniane od razu, nie dopiero przy następnym cięciu
+                    del chunk_to_process
+
+            # Wymuś przetworzenie ostatniego, niepełnego bufora
+            if len(chunk_buffer) > 0:
+                transcription_logger.info("🧠 Przetwarzanie ostatniego, niepełnego fragmentu...")
+                levels = chunk_buffer.levels()
+                raw_audio_data = chunk_buffer.take()
+                model_instance = self._get_model()
+                with step("chunk"):
+                    self.process_chunk(raw_audio_data, model_instance, split_reason="END_OF_RECORDING",
+                                       queue_wait=time.perf_counter() - last_enqueued_at, levels=levels)
+        except Exception as e:
+            app_logger.error(f"❌ Błąd w wątku transkrybującym: {e}")
+        finally:
+            self.transcription_finished_at = time.time()
+            self._transcribed.set()
+            transcription_logger.info("🧠 Wątek transkrybujący zakończony.")
+
+    def process_chunk(self, raw_audio_data, model_instance, split_reason="END_OF_RECORDING", queue_wait=0.0, beam_size=None,
+                      levels=None):
+        """
+        Przetwarza i transkrybuje pojedynczy fragment audio.
+        `queue_wait` to czas od przechwycenia ostatniego bloku fragmentu do rozpoczęcia jego przetwarzania.
+        `beam_size` nadpisuje ustawienie (polityka `degrade` kolejki audio przy dużej zaległości).
+        `levels` to RMS okien fragmentu z `ChunkBuffer` (bez nich są liczone od nowa).
+        """
+        settings = self.settings
+        chunk_duration = len(raw_audio_data) / SAMPLE_RATE
+        transcription_logger.info("🧠 Przetwarzanie fragmentu: %.2fs (Powód: %s)", chunk_duration, split_reason)
+
+        # --- Krok 0: Pominięcie fragmentu bez mowy i skrócenie długich cisz (RMS okien z cięcia) ---
+        if levels is None:
+            levels = chunk_levels(raw_audio_data)
+        if not has_speech(levels, settings):
+            transcription_logger.info("   -> Brak mowy (energia poniżej progu) – fragment pominięty bez transkrypcji.")
+            self.compaction.add_skipped(chunk_duration)
+            self.metrics.add_skipped_chunk(split_reason, chunk_duration, queue_wait)
+            return
+        raw_audio_data, timestamps = compact_silence(raw_audio_data, levels, settings)
+        if timestamps.removed_seconds > 0:
+            transcription_logger.debug("   -> Skrócono ciszę o %.2fs (do transkrypcji: %.2fs)", timestamps.removed_seconds, len(raw_audio_data) / SAMPLE_RATE)
+
+        # Podgląd: ten sam fragment trafia do modelu szkicu (nie blokuje, bez preprocessingu)
+        chunk_index = len(self.metrics.chunks)
+        cut_at = time.perf_counter()
+        if self.draft is not None:
+            self.draft.submit(raw_audio_data, settings.model_language, functools.partial(self._on_draft, chunk_index))
+
+        # --- Krok 1: Preprocessing ---
+        # Proces inferencji (src/inference_worker.py) wykonuje preprocessing u siebie
+        remote_preprocessing = getattr(model_instance, 'preprocesses_audio', False)
+        # Eksperymentalnie: model dekoduje fragment przyspieszony bez zmiany wysokości głosu (src/time_stretch.py).
+        # Przyspieszenie jest przed preprocessingiem – ta sama kolejność lokalnie i w procesie inferencji.
+        compression_start_time = time.perf_counter()
+        processed_audio = time_compress(raw_audio_data, settings.time_compression)
+        compression_duration = time.perf_counter() - compression_start_time
+        preprocessing_start_time = time.perf_counter()
+        if not remote_preprocessing:
+            processed_audio = apply_preprocessing_pipeline(processed_audio)
+        preprocessing_duration = time.perf_counter() - preprocessing_start_time
+
+        # --- Krok 2: Konfiguracja Transkrypcji ---
+        # Kontekst z poprzednich fragmentów (także tekstu już oddanego do sinka), ucięty do budżetu tokenów
+        if self.prompt_context is None:
+            self.prompt_context = PromptContext(settings.prompt_max_tokens, model_tokenizer(model_instance), settings.prompt_glossary)
+        prompt = self.prompt_context.prompt()
+        prompt_tokens = PromptContext.token_count(prompt)
+
+        if beam_size is None:
+            beam_size = settings.beam_size
+        else:
+            transcription_logger.info("   -> Transkrypcja nie nadąża – zmniejszona wiązka (beam_size=%d).", beam_size)
+            self.metrics.extra['degraded_chunks'] = self.metrics.extra.get('degraded_chunks', 0) + 1
+
+        transcription_start_time = time.time()
+
+        # --- Krok 3: Transkrypcja ---
+        # VAD jest kontrolowany przez logikę cięcia, ale vad_filter w faster-whisper jest nadal użyteczny
+        segments_generator, info = model_instance.transcribe(
+            processed_audio,
+            language=settings.model_language,
+            beam_size=beam_size,
+            vad_filter=settings.vad_filter,
+            log_prob_threshold=settings.log_prob_threshold,
+            no_speech_threshold=settings.no_speech_threshold,
+            initial_prompt=prompt,
+            compression_ratio_threshold=2.4 # ZMIANA: Wymuszamy 2.4 (bardziej agresywny)
+        )
+
+        chunk_text = "".join(segment.text for segment in segments_generator).strip()
+        transcription_duration = time.time() - transcription_start_time
+        if remote_preprocessing:
+            preprocessing_duration = info.preprocessing_duration
+            transcription_duration -= preprocessing_duration
+        # Koszt WSOLA liczy się jako część preprocessingu na obu ścieżkach
+        preprocessing_duration += compression_duration
+
+        self.compaction.add_decoded(len(raw_audio_data) / SAMPLE_RATE, timestamps.removed_seconds, transcription_duration)
+        self.metrics.add_chunk(split_reason, chunk_duration, queue_wait, preprocessing_duration, transcription_duration, prompt_tokens)
+        metrics_server.observe_chunk(split_reason, preprocessing_duration, transcription_duration)
+        if self.draft is not None:
+            with self._draft_lock:
+                self._finals[chunk_index] = (chunk_text, time.perf_counter() - cut_at)
+
+        # --- Krok 4: Aktualizacja Kontekstu i Logowanie ---
+        if chunk_text:
+            transcription_logger.info("   -> Transkrybowany fragment: '%s'", chunk_text)
+            self.prompt_context.append(chunk_text)
+            # Dodajemy spację, aby oddzielić fragmenty
+            actions = self.postprocess(chunk_text) + [Action('text', " ")]
+            if memory_budget.is_enabled(settings):
+                # Tryb budżetu pamięci: tekst trafia do sinka od razu, w pamięci zostaje tylko kontekst promptu
+                self.output_sink.write_actions(actions)
+                self.delivered_characters += len(render_text(actions))
+            else:
+                self.pending.extend(actions)
+
+            # Logowanie wydajności fragmentu
+            rtf = float('inf')
+            if chunk_duration > 0:
+                rtf = transcription_duration / chunk_duration
+            performance_logger.debug("   -> RTF fragmentu: %.3f (Czas transkrypcji: %.2fs, prompt: %d tokenów)", rtf, transcription_duration, prompt_tokens)
+
+    def _on_draft(self, chunk_index, text, latency):
+        """Wynik modelu szkicu (wątek szkicu): podgląd w logu i pod /preview serwera metryk."""
+        with self._draft_lock:
+            if self._draft_closed:
+                return
+            self._drafts[chunk_index] = (text, latency)
+            preview = " ".join(self._drafts[index][0] for index in sorted(self._drafts) if self._drafts[index][0])
+        metrics_server.DRAFT_LATENCY_SECONDS.observe(latency)
+        metrics_server.set_preview(self.session_id, chunk_index, preview, time.time())
+        if text:
+            transcription_logger.info("   👁️ Podgląd (%.2fs): '%s'", latency, text)
+
+    def draft_record(self):
+        """Dopisuje do fragmentów latencje szkicu i modelu głównego oraz WER/CER szkicu względem tekstu końcowego."""
+        with self._draft_lock:
+            self._draft_closed = True
+            drafts, finals = dict(self._drafts), dict(self._finals)
+        word_errors = words = 0
+        for chunk in self.metrics.chunks:
+            if chunk['index'] not in finals:
+                continue
+            final_text, final_latency = finals[chunk['index']]
+            chunk['final_latency'] = round(final_latency, 4)
+            if chunk['index'] not in drafts:
+                continue
+            draft_text, draft_latency = drafts[chunk['index']]
+            errors, length = error_counts(final_text, draft_text, 'word')
+            word_errors, words = word_errors + errors, words + length
+            chunk['draft_latency'] = round(draft_latency, 4)
+            chunk['draft_wer'] = round(errors / length if length else float(errors > 0), 4)
+            chunk['draft_cer'] = round(character_error_rate(final_text, draft_text), 4)
+            chunk['final_words'] = length
+        return {
+            'draft_chunks': len(drafts),
+            'draft_missing': len(finals) - len(drafts.keys() & finals.keys()),
+            'draft_wer': round(word_errors / words, 4) if words else None,
+        }
+
+    def postprocess(self, chunk_text):
+        """Tekst fragmentu -> akcje wyjścia (jedno przejście automatu reguł, jeśli są skonfigurowane)."""
+        if self.postprocessor is None:
+            return [Action('text', chunk_text)]
+        start_time = time.perf_counter()
+        actions = self.postprocessor.process(chunk_text)
+        self.postprocessing_time += time.perf_counter() - start_time
+        return actions
+
+    @property
+    def transcript(self):
+        """Tekst sesji, który nie trafił jeszcze do sinka wyjścia (klawisze jako znaki)."""
+        return render_text(self.pending)
+
+    def wait_transcribed(self, timeout=None):
+        """Czeka na przetworzenie całego audio sesji (bez wklejania)."""
+        return self._transcribed.wait(timeout)
+
+    # --- Finalizacja (wątek finalizujący SessionEngine) ---
+
+    def finalize(self, metrics_writer=None):
+        """Czeka na transkrypcję, wkleja tekst i zapisuje statystyki sesji."""
+        try:
+            self._finalize(metrics_writer)
+        finally:
+            self.audio_queue.close()
+            self._release_model()
+            self.finished.set()
+
+    def _finalize(self, metrics_writer):
+        # Czekaj na zakończenie wątku Konsumenta (opróżnienie kolejki i przetworzenie ostatniego bufora)
+        self._consumer_thread.join()
+        if self._recording_thread is not None:
+            self._recording_thread.join()
+
+        # --- Finalizacja i Wklejanie ---
+        final_actions = strip_actions(self.pending)
+        final_text = render_text(final_actions)
+        app_logger.info("\n--- Wynik Końcowy ---")
+        app_logger.info(f"Tekst: {final_text}")
+        if self.delivered_characters:
+            app_logger.info(f"(W trakcie sesji wpisano już na bieżąco {self.delivered_characters} znaków – tryb budżetu pamięci.)")
+
+        paste_duration = None
+        if final_actions:
+            paste_start_time = time.perf_counter()
+            with self.profiler.step("paste"):
+                self.output_sink.write_actions(final_actions)
+            paste_duration = time.perf_counter() - paste_start_time
+
+        # Logowanie statystyk całkowitych
+        total_duration = self.released_at - self.started_at
+        user_latency = self.transcription_finished_at - self.released_at
+
+        performance_logger.info("\n--- Statystyki Czasowe (Całkowite) ---")
+        performance_logger.info(f"⏱️ Czas nagrywania: {total_duration:.2f}s")
+        performance_logger.info(f"⏱️ Latencja Użytkownika (od puszczenia klawisza do końca transkrypcji): {user_latency:.2f}s")
+        performance_logger.info(f"📝 Finalny tekst: {self.delivered_characters + len(final_text)} znaków")
+
+        draft_record = self.draft_record() if self.draft is not None else None
+        if draft_record is not None:
+            draft_latencies = [c['draft_latency'] for c in self.metrics.chunks if 'draft_latency' in c]
+            final_latencies = [c['final_latency'] for c in self.metrics.chunks if 'final_latency' in c]
+            performance_logger.info(
+                f"👁️ Podgląd: {draft_record['draft_chunks']}/{len(final_latencies)} fragm., "
+                f"latencja szkicu maks. {max(draft_latencies, default=0.0):.2f}s vs modelu głównego maks. {max(final_latencies, default=0.0):.2f}s"
+                + (f", WER szkicu względem tekstu końcowego: {draft_record['draft_wer']:.1%}" if draft_record['draft_wer'] is not None else "")
+            )
+
+        if self.compaction.saved_seconds > 0:
+            performance_logger.info(
+                f"✂️ Cisza: usunięto {self.compaction.removed_seconds:.2f}s audio, pominięto {self.compaction.skipped_chunks} "
+                f"fragm. bez mowy ({self.compaction.skipped_seconds:.2f}s); oszczędność inferencji ~{self.compaction.inference_saved_seconds:.2f}s"
+            )
+
+        queue_stats = self.audio_queue.stats()
+        queue_stats['input_overflows'] = int(metrics_server.AUDIO_CALLBACK_STATUS.value('input_overflow') - self._overflows_at_start)
+        performance_logger.info(
+            f"📦 Kolejka audio: maks. {queue_stats['queue_max_depth_seconds']:.2f}s, "
+            f"za czasem rzeczywistym: {queue_stats['behind_realtime_seconds']:.2f}s, "
+            f"na dysku: {queue_stats['spilled_seconds']:.2f}s, utracone: {queue_stats['dropped_seconds']:.2f}s, "
+            f"przepełnienia wejścia: {queue_stats['input_overflows']}"
+        )
+        if queue_stats['dropped_seconds'] > 0 or queue_stats['input_overflows'] > 0:
+            app_logger.warning("⚠️ Część audio została utracona – transkrypcja nie nadążała (zob. audio_queue_policy w config.ini).")
+
+        metrics_server.SESSIONS.inc()
+        metrics_server.USER_LATENCY_SECONDS.observe(user_latency)
+
+        chunk_rtfs = [c['rtf'] for c in self.metrics.chunks if c['rtf'] is not None]
+        self.profiler.finish(user_latency, max(chunk_rtfs) if chunk_rtfs else None)
+
+        self.metrics.recording_duration = total_duration
+        self.metrics.paste_time = paste_duration
+        self.metrics.user_latency = user_latency
+        self.metrics.text_length = self.delivered_characters + len(final_text)
+        self.metrics.extra.update(queue_stats)
+        self.metrics.extra.update(self.compaction.to_record())
+        if self.postprocessor is not None:
+            self.metrics.extra['postprocessing_time'] = round(self.postprocessing_time, 6)
+        if draft_record is not None:
+            self.metrics.extra.update(draft_record)
+        if metrics_writer is not None:
+            metrics_writer.submit(self.metrics)
+
+        if self.recorder is not None:
+            recording = self.recorder.to_recording()
+            if recording is not None and self.archiver is not None:
+                # Kodowanie i zapis w wątku archiwizacji; tu tylko włożenie do kolejki
+                self.archiver.submit(self.settings, self.session_id, recording, final_text, self.metrics.to_record())
+            if recording is not None and self.settings.session_recording_dir:
+                try:
+                    self.recorder.save(recording)
+                except Exception as e:
+                    app_logger.error(f"❌ Nie udało się zapisać nagrania sesji: {e}")
+
+
+class SessionEngine:
+    """
+    Tworzy sesje na naciśnięcie skrótu i finalizuje je w osobnym wątku, po kolei.
+    `press()` i `release()` są bezpieczne do wywołania z wątku listenera – nie blokują.
+    """
+
+    def __init__(self, model_loader, output_sink, audio_capture=None, metrics_writer=None, draft=None, archiver=None,
+                 scheduler=None):
+        self.model_loader = model_loader
+        self.output_sink = output_sink
+        self.audio_capture = audio_capture
+        self.metrics_writer = metrics_writer
+        self.draft = draft               # DraftTranscriber podglądu na żywo (opcjonalny)
+        self.archiver = archiver         # SessionArchiver (sesje są archiwizowane przy session_archive_dir)
+        self.scheduler = scheduler       # ModelScheduler: zadania wsadowe czekają od naciśnięcia do finalizacji sesji
+        self.current = None              # Sesja, która właśnie nagrywa
+        self._last = None                # Ostatnio rozpoczęta sesja (kolejność transkrypcji)
+        self._active = []                # Sesje rozpoczęte, jeszcze niesfinalizowane
+        self._lock = threading.Lock()
+        self._finalize_queue = queue.Queue()
+        self._finalizer = threading.Thread(target=self._finalize_loop, name="session-finalizer", daemon=True)
+        self._finalizer.start()
+
+    def press(self, settings):
+        """Naciśnięcie skrótu: nowa sesja z ustawieniami z tej chwili."""
+        with self._lock:
+            if self.current is not None:
+                return None
+            app_logger.info("\n--- Skrót Aktywowany: Rozpoczynanie Nagrywania (Tryb Strumieniowy) ---")
+            session = DictationSession(settings, self.model_loader, self.output_sink, self.audio_capture, previous=self._last,
+                                       draft=self.draft, archiver=self.archiver)
+            # Dopiero po udanym utworzeniu sesji: end_live() wywołuje finalizacja tej sesji
+            if self.scheduler is not None:
+                self.scheduler.begin_live()
+            self.current = self._last = session
+            self._active.append(session)
+        return session.start()
+
+    def release(self):
+        """Puszczenie skrótu: koniec nagrywania; transkrypcja i wklejenie kończą się w tle."""
+        with self._lock:
+            session, self.current = self.current, None
+        if session is None:
+            return None
+        app_logger.info("\n--- Skrót Zwolniony: Zatrzymywanie Nagrywania ---")
+        session.release()
+        self._finalize_queue.put(session)
+        return session
+
+    def _finalize_loop(self):
+        while True:
+            session = self._finalize_queue.get()
+            if session is None:
+                break
+            try:
+                session.finalize(self.metrics_writer)
+            except Exception as e:
+                app_logger.error(f"❌ Błąd podczas finalizacji sesji: {e}")
+            if self.scheduler is not None:
+                self.scheduler.end_live()
+            with self._lock:
+                self._active.remove(session)
+                if self._last is session:
+                    self._last = None
+            self._finalize_queue.task_done()
+            if self._finalize_queue.unfinished_tasks == 0 and self.current is None:
+                app_logger.info("\n✅ Gotowy. Naciśnij i przytrzymaj skrót, aby nagrywać.")
+
+    def wait_idle(self):
+        """Czeka na sfinalizowanie wszystkich puszczonych sesji."""
+        self._finalize_queue.join()
+
+    def queue_depth(self):
+        with self._lock:
+            return sum(session.audio_queue.qsize() for session in self._active)
+
+    def queue_seconds(self):
+        with self._lock:
+            return sum(session.audio_queue.depth_seconds() for session in self._active)
+
+    def close(self):
+        self.release()
+        self.wait_idle()
+        self._finalize_queue.put(None)
+        self._finalizer.join()
@@ -0,0 +1,170 @@
+# src/session_metrics.py
+"""
+Ustrukturyzowane metryki sesji dyktowania.
+
+Każda sesja zapisuje jeden rekord JSONL (czas nagrania, fragmenty z przyczyną
+cięcia i czasami poszczególnych etapów, czas wklejania, latencja użytkownika).
+Zapis odbywa się w wątku w tle – wątek sesji tylko wkłada słownik do kolejki,
+więc nie dodaje mierzalnej latencji. Raporty: tools/metrics_report.py.
+"""
+import atexit
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+
+app_logger = logging.getLogger('app')
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def config_revision(settings):
+    """Krótki skrót ustawień – pozwala porównywać metryki między wersjami konfiguracji."""
+    payload = json.dumps(dataclasses.asdict(settings), sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:10]
+
+
+def resolve_path(path):
+    """Ścieżki względne w config.ini są liczone od katalogu głównego projektu."""
+    return path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+
+
+class SessionMetrics:
+    """Zbiera pomiary jednej sesji; `to_record()` zwraca słownik gotowy do zapisu."""
+
+    def __init__(self, settings, mode):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.datetime.now().astimezone()
+        self.mode = mode
+        self.config_revision = config_revision(settings)
+        self.model = settings.model_path
+        self.recording_duration = 0.0
+        self.chunks = []
+        self.paste_time = None
+        self.user_latency = None
+        self.text_length = 0
+        self.extra = {}
+
+    def add_chunk(self, split_reason, duration, queue_wait, preprocessing_time, transcription_time, prompt_tokens=None):
+        rtf = transcription_time / duration if duration > 0 else None
+        chunk = {
+            'index': len(self.chunks),
+            'split_reason': split_reason,
+            'duration': round(duration, 4),
+            'queue_wait': round(queue_wait, 4),
+            'preprocessing_time': round(preprocessing_time, 4),
+            'transcription_time': round(transcription_time, 4),
+            'rtf': round(rtf, 4) if rtf is not None else None,
+        }
+        if prompt_tokens is not None:
+            chunk['prompt_tokens'] = prompt_tokens
+        self.chunks.append(chunk)
+
+    def add_skipped_chunk(self, split_reason, duration, queue_wait):
+        """Fragment pominięty bez transkrypcji (brak mowy) – bez czasów przetwarzania i RTF."""
+        self.chunks.append({
+            'index': len(self.chunks),
+            'split_reason': split_reason,
+            'duration': round(duration, 4),
+            'queue_wait': round(queue_wait, 4),
+            'preprocessing_time': None,
+            'transcription_time': None,
+            'rtf': None,
+            'skipped': True,
+        })
+
+    def to_record(self):
+        split_reasons = {}
+        for chunk in self.chunks:
+            split_reasons[chunk['split_reason']] = split_reasons.get(chunk['split_reason'], 0) + 1
+        record = {
+            'session_id': self.session_id,
+            'timestamp': self.started_at.isoformat(timespec='seconds'),
+            'mode': self.mode,
+            'config_revision': self.config_revision,
+            'model': self.model,
+            'recording_duration': round(self.recording_duration, 4),
+            'chunk_count': len(self.chunks),
+            'split_reasons': split_reasons,
+            'chunks': self.chunks,
+            'paste_time': round(self.paste_time, 4) if self.paste_time is not None else None,
+            'user_latency': round(self.user_latency, 4) if self.user_latency is not None else None,
+            'text_length': self.text_length,
+        }
+        record.update(self.extra)
+        return record
+
+
+class MetricsWriter:
+    """Dopisuje rekordy do pliku JSONL w wątku w tle."""
+
+    def __init__(self, path):
+        self.path = resolve_path(path)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._thread.start()
+        atexit.register(self.close)
+        return self
+
+    def submit(self, metrics):
+        """Nieblokujące: serializacja i zapis odbywają się w wątku zapisującym."""
+        self._queue.put(metrics)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        while True:
+            metrics = self._queue.get()
+            if metrics is None:
+                break
+            try:
+                record = metrics.to_record() if isinstance(metrics, SessionMetrics) else metrics
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            except Exception as e:
+                app_logger.error(f"❌ Nie udało się zapisać metryk sesji do {self.path}: {e}")
+
+
+def create_metrics_writer(settings):
+    """Zwraca uruchomiony MetricsWriter albo None, jeśli metryki są wyłączone (pusta ścieżka)."""
+    if not settings.metrics_log_path:
+        return None
+    return MetricsWriter(settings.metrics_log_path).start()
+
+
+# --- Statystyki ---
+
+def percentile(values, p):
+    """Percentyl z interpolacją liniową (jak numpy.percentile), p w zakresie [0, 100]."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = (len(ordered) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values):
+    """Zwraca słownik z liczbą próbek, średnią oraz p50/p95/p99."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None}
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+    }
@@ -0,0 +1,128 @@
+# src/session_profiler.py
+"""
+Opcjonalne profilowanie pojedynczych sesji dyktowania.
+
+Gdy `profiling_enabled = true`, kroki sesji (przetwarzanie fragmentu, wklejanie)
+są wykonywane pod cProfile oraz z próbkowaniem alokacji tracemalloc. Profil
+jest zapisywany na dysk tylko wtedy, gdy sesja przekroczy próg latencji lub RTF;
+katalog z profilami jest rotowany (zachowywane jest N najnowszych sesji).
+Wyłączony profiler kosztuje jedno sprawdzenie flagi na krok.
+"""
+import contextlib
+import cProfile
+import datetime
+import io
+import logging
+import os
+import pstats
+import shutil
+import time
+import tracemalloc
+
+from src.session_metrics import resolve_path
+
+performance_logger = logging.getLogger('performance')
+
+TRACEMALLOC_FRAMES = 1       # Głębokość stosu dla alokacji; każda dodatkowa ramka wyraźnie zwiększa narzut
+TOP_ALLOCATIONS = 25         # Liczba największych alokacji w raporcie
+TOP_FUNCTIONS = 40           # Liczba funkcji w tekstowym raporcie cProfile
+
+
+class SessionProfiler:
+    """Profiluje kroki jednej sesji i zapisuje wynik, jeśli sesja była wolna."""
+
+    def __init__(self, settings, session_id):
+        self.enabled = settings.profiling_enabled
+        self.session_id = session_id
+        self.latency_threshold = settings.profiling_latency_threshold
+        self.rtf_threshold = settings.profiling_rtf_threshold
+        self.directory = resolve_path(settings.profiling_dir)
+        self.keep = settings.profiling_keep
+        self.trace_allocations = settings.profiling_tracemalloc
+        self.steps = []           # (nazwa, czas ścienny, czas CPU wątku, szczyt pamięci)
+        self._profiles = []
+        self._snapshots = []
+
+    def step(self, name):
+        """Menedżer kontekstu obejmujący profilowany krok sesji."""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._profiled_step(name)
+
+    @contextlib.contextmanager
+    def _profiled_step(self, name):
+        started_tracing = self.trace_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            cpu_time = time.thread_time() - cpu_start
+            wall_time = time.perf_counter() - wall_start
+            peak = 0
+            if self.trace_allocations:
+                _, peak = tracemalloc.get_traced_memory()
+                self._snapshots.append((name, tracemalloc.take_snapshot()))
+            if started_tracing:
+                tracemalloc.stop()
+            self._profiles.append(profile)
+            self.steps.append((name, wall_time, cpu_time, peak))
+
+    def finish(self, user_latency, max_rtf):
+        """Zapisuje profil, jeśli sesja przekroczyła próg latencji lub RTF. Zwraca ścieżkę lub None."""
+        if not self.enabled or not self._profiles:
+            return None
+        too_slow = user_latency is not None and user_latency > self.latency_threshold
+        too_slow = too_slow or (max_rtf is not None and max_rtf > self.rtf_threshold)
+        if not too_slow:
+            return None
+
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        session_dir = os.path.join(self.directory, f"{stamp}_{self.session_id}")
+        os.makedirs(session_dir, exist_ok=True)
+
+        report = io.StringIO()
+        stats = pstats.Stats(self._profiles[0], stream=report)
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(os.path.join(session_dir, "session.prof"))
+
+        with open(os.path.join(session_dir, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"Sesja: {self.session_id}\n")
+            f.write(f"Latencja użytkownika: {user_latency:.3f}s (próg {self.latency_threshold}s)\n" if user_latency is not None else "")
+            f.write(f"Maks. RTF fragmentu: {max_rtf:.3f} (próg {self.rtf_threshold})\n" if max_rtf is not None else "")
+            f.write("\nKroki (czas ścienny / CPU wątku / szczyt pamięci). Czas ścienny znacznie większy\n")
+            f.write("od CPU oznacza oczekiwanie: na GIL, I/O, GPU lub proces zewnętrzny (xdotool).\n")
+            for name, wall_time, cpu_time, peak in self.steps:
+                f.write(f"  {name:<10} {wall_time:8.3f}s  {cpu_time:8.3f}s  {peak / 1024 / 1024:8.1f} MiB\n")
+            f.write(f"\n--- cProfile: top {TOP_FUNCTIONS} (czas skumulowany) ---\n")
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            f.write(report.getvalue())
+
+        if self._snapshots:
+            with open(os.path.join(session_dir, "allocations.txt"), 'w', encoding='utf-8') as f:
+                for name, snapshot in self._snapshots:
+                    f.write(f"--- {name}: top {TOP_ALLOCATIONS} alokacji wciąż żywych na końcu kroku ---\n")
+                    for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                        f.write(f"{stat}\n")
+                    f.write("\n")
+
+        self._rotate()
+        performance_logger.info(f"🔬 Sesja przekroczyła próg – profil zapisano w: {session_dir}")
+        return session_dir
+
+    def _rotate(self):
+        """Usuwa najstarsze katalogi profili ponad limit `profiling_keep`."""
+        entries = sorted(
+            (e for e in os.scandir(self.directory) if e.is_dir()),
+            key=lambda e: e.name
+        )
+        for entry in entries[:max(0, len(entries) - self.keep)]:
+            shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,121 @@
+# src/session_recorder.py
+"""
+Zapis i odczyt surowych sesji nagrania (do odtwarzania przez tools/replay_session.py).
+
+Gdy `session_recording_dir` w sekcji [logging] nie jest pusty, każda sesja
+strumieniowa zapisuje bloki z callbacku audio dokładnie w takiej postaci, w
+jakiej trafiły do kolejki, wraz z chwilą ich przechwycenia (względem naciśnięcia
+skrótu), chwilą puszczenia skrótu i ustawieniami sesji. Plik `.npz` pozwala
+deterministycznie odtworzyć cięcie na fragmenty bez mikrofonu. `load_recording`
+czyta też wpisy archiwum sesji (`.json` + FLAC/Opus, src/session_archive.py).
+"""
+import dataclasses
+import datetime
+import json
+import logging
+import os
+import time
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+from src.session_metrics import resolve_path
+from src.settings import Settings
+
+app_logger = logging.getLogger('app')
+
+
+class SessionRecorder:
+    """Zbiera bloki audio jednej sesji; `save()` zapisuje je do pliku .npz."""
+
+    def __init__(self, directory, session_id, settings):
+        self.directory = resolve_path(directory)
+        self.session_id = session_id
+        self.settings = settings
+        self.started_at = time.perf_counter()
+        self.released_at = None
+        self._timestamps = []
+        self._blocks = []
+
+    def record(self, block):
+        """Wywoływane z wątku audio – tylko dopisanie referencji do listy."""
+        self._timestamps.append(time.perf_counter() - self.started_at)
+        self._blocks.append(block)
+
+    def mark_release(self):
+        self.released_at = time.perf_counter() - self.started_at
+
+    def to_recording(self):
+        """Zebrane bloki jako SessionRecording (lub None, jeśli sesja była pusta)."""
+        if not self._blocks:
+            return None
+        return SessionRecording(
+            audio=np.concatenate(self._blocks, axis=0).reshape(-1).astype(np.float32),
+            block_sizes=np.array([len(b) for b in self._blocks], dtype=np.int64),
+            timestamps=np.array(self._timestamps, dtype=np.float64),
+            released_at=self.released_at if self.released_at is not None else self._timestamps[-1],
+            samplerate=SAMPLE_RATE,
+            settings=self.settings,
+        )
+
+    def save(self, recording=None):
+        """Zapisuje nagranie i zwraca ścieżkę pliku (lub None, jeśli sesja była pusta)."""
+        recording = recording or self.to_recording()
+        if recording is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{stamp}_{self.session_id}.npz")
+        np.savez(
+            path,
+            audio=recording.audio,
+            block_sizes=recording.block_sizes,
+            timestamps=recording.timestamps,
+            released_at=np.float64(recording.released_at),
+            samplerate=np.int64(recording.samplerate),
+            settings=np.array(json.dumps(dataclasses.asdict(recording.settings))),
+        )
+        app_logger.info(f"💾 Nagranie sesji zapisano w: {path}")
+        return path
+
+
+@dataclasses.dataclass
+class SessionRecording:
+    """Odczytane nagranie sesji."""
+    audio: np.ndarray
+    block_sizes: np.ndarray
+    timestamps: np.ndarray
+    released_at: float
+    samplerate: int
+    settings: Settings
+
+    @property
+    def duration(self):
+        return len(self.audio) / self.samplerate
+
+    def blocks(self):
+        """Zwraca pary (chwila przechwycenia [s], blok (N, 1)) w kolejności nagrania."""
+        offsets = np.concatenate(([0], np.cumsum(self.block_sizes)))
+        for timestamp, start, end in zip(self.timestamps, offsets[:-1], offsets[1:]):
+            yield float(timestamp), self.audio[start:end].reshape(-1, 1)
+
+
+def settings_from_dict(stored):
+    """Ustawienia zapisane razem z nagraniem; pola dodane później przyjmują wartości domyślne."""
+    known = {f.name for f in dataclasses.fields(Settings)}
+    return Settings(**{k: v for k, v in stored.items() if k in known})
+
+
+def load_recording(path):
+    """Nagranie .npz (SessionRecorder) lub wpis archiwum sesji .json (SessionArchiver)."""
+    if path.lower().endswith('.json'):
+        from src.session_archive import load_archive
+        return load_archive(path)
+    with np.load(path) as data:
+        return SessionRecording(
+            audio=data['audio'],
+            block_sizes=data['block_sizes'],
+            timestamps=data['timestamps'],
+            released_at=float(data['released_at']),
+            samplerate=int(data['samplerate']),
+            settings=settings_from_dict(json.loads(str(data['settings']))),
+        )
@@ -0,0 +1,310 @@
+# src/settings.py
+"""
+Jedno, typowane i niemutowalne źródło konfiguracji dla wszystkich punktów
+wejścia (demon, main_simple, transcribe_file, skrypty testowe) oraz
+obserwator pliku config.ini umożliwiający zmiany ustawień bez restartu.
+"""
+import configparser
+import dataclasses
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+
+from src import memory_budget
+
+app_logger = logging.getLogger('app')
+
+CONFIG_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'config.ini'))
+
+# Zmiana tych pól wymaga ponownego załadowania modelu; pozostałe można stosować na żywo.
+MODEL_RELOAD_FIELDS = ('model_path', 'device', 'compute_type')
+# Zmiana tych pól wymaga ponownego uruchomienia aplikacji (listener/strumień tworzone przy starcie).
+RESTART_FIELDS = (
+    'hotkey', 'capture_mode', 'capture_samplerate', 'preroll_seconds', 'inference_process', 'metrics_log_path',
+    'metrics_enabled', 'metrics_host', 'metrics_port', 'draft_model_path', 'draft_device', 'draft_compute_type',
+    'batch_jobs_port',
+)
+
+VALID_DEVICES = ('cuda', 'cpu', 'auto')
+VALID_CAPTURE_MODES = ('on_demand', 'persistent')
+VALID_QUEUE_POLICIES = ('block', 'spill', 'degrade')
+VALID_ARCHIVE_FORMATS = ('flac', 'opus')
+VALID_COMPUTE_TYPES = (
+    'default', 'auto', 'int8', 'int8_float16', 'int8_float32', 'int8_bfloat16',
+    'int16', 'float16', 'bfloat16', 'float32',
+)
+
+
+class SettingsError(ValueError):
+    """Błąd walidacji konfiguracji (niepoprawna wartość lub typ w config.ini)."""
+
+
+def _option(default, section):
+    return field(default=default, metadata={'section': section})
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Ustawienia aplikacji. Instancje są niemutowalne – zmiana = nowy obiekt."""
+
+    # --- [settings] ---
+    model_path: str = _option('medium', 'settings')
+    device: str = _option('cuda', 'settings')
+    hotkey: str = _option('<ctrl>+f8', 'settings')
+    language: str = _option('auto', 'settings')
+
+    # --- [advanced] ---
+    compute_type: str = _option('int8', 'advanced')
+    vad_filter: bool = _option(True, 'advanced')
+    log_prob_threshold: float = _option(-1.0, 'advanced')
+    no_speech_threshold: float = _option(0.6, 'advanced')
+    local_files_only: bool = _option(True, 'advanced')
+    beam_size: int = _option(5, 'advanced')
+    compression_ratio_threshold: float = _option(3.0, 'advanced')
+    vad_max_buffer_seconds: float = _option(20.0, 'advanced')
+    vad_min_chunk_seconds: float = _option(10.0, 'advanced')
+    vad_silence_threshold_seconds: float = _option(1.5, 'advanced')
+    vad_rms_threshold: float = _option(0.005, 'advanced')
+    silence_compaction_max_seconds: float = _option(0.5, 'advanced')
+    time_compression: float = _option(1.0, 'advanced')
+    speech_energy_floor: float = _option(0.0, 'advanced')
+    capture_mode: str = _option('on_demand', 'advanced')
+    capture_samplerate: int = _option(0, 'advanced')
+    preroll_seconds: float = _option(0.3, 'advanced')
+    model_warmup: bool = _option(True, 'advanced')
+    audio_queue_max_seconds: float = _option(120.0, 'advanced')
+    audio_queue_policy: str = _option('block', 'advanced')
+    memory_budget_mb: float = _option(0.0, 'advanced')
+    inference_process: bool = _option(False, 'advanced')
+    prompt_max_tokens: int = _option(24, 'advanced')
+    prompt_glossary: str = _option('', 'advanced')
+    postprocessing_rules: str = _option('', 'advanced')
+    draft_model_path: str = _option('', 'advanced')
+    draft_device: str = _option('cpu', 'advanced')
+    draft_compute_type: str = _option('int8', 'advanced')
+    batch_jobs_port: int = _option(0, 'advanced')
+
+    # --- [logging] ---
+    metrics_log_path: str = _option('logs/sessions.jsonl', 'logging')
+    session_recording_dir: str = _option('', 'logging')
+    session_archive_dir: str = _option('', 'logging')
+    session_archive_format: str = _option('flac', 'logging')
+    session_archive_max_mb: float = _option(2048.0, 'logging')
+    session_archive_max_days: float = _option(30.0, 'logging')
+
+    # --- [profiling] ---
+    profiling_enabled: bool = _option(False, 'profiling')
+    profiling_tracemalloc: bool = _option(False, 'profiling')
+    profiling_latency_threshold: float = _option(3.0, 'profiling')
+    profiling_rtf_threshold: float = _option(1.0, 'profiling')
+    profiling_dir: str = _option('logs/profiles', 'profiling')
+    profiling_keep: int = _option(20, 'profiling')
+
+    # --- [monitoring] ---
+    metrics_enabled: bool = _option(False, 'monitoring')
+    metrics_host: str = _option('127.0.0.1', 'monitoring')
+    metrics_port: int = _option(9477, 'monitoring')
+
+    @property
+    def model_language(self):
+        """Język w formacie oczekiwanym przez model ('auto' -> None, czyli autodetekcja)."""
+        return None if self.language.lower() == 'auto' else self.language
+
+    def replace(self, **changes):
+        """Zwraca nową, zwalidowaną kopię ustawień z podmienionymi polami."""
+        new_settings = dataclasses.replace(self, **changes)
+        validate_settings(new_settings)
+        return new_settings
+
+    def changed_fields(self, other):
+        """Zwraca krotkę nazw pól, które różnią się między dwoma obiektami ustawień."""
+        return tuple(
+            f.name for f in dataclasses.fields(self)
+            if getattr(self, f.name) != getattr(other, f.name)
+        )
+
+    def requires_model_reload(self, other):
+        return any(name in MODEL_RELOAD_FIELDS for name in self.changed_fields(other))
+
+    def requires_restart(self, other):
+        return any(name in RESTART_FIELDS for name in self.changed_fields(other))
+
+
+def _read_value(config, section, name, field_type, default):
+    if not config.has_option(section, name):
+        return default
+    if field_type is bool:
+        return config.getboolean(section, name)
+    if field_type is int:
+        return config.getint(section, name)
+    if field_type is float:
+        return config.getfloat(section, name)
+    return config.get(section, name).strip()
+
+
+def validate_settings(settings):
+    """Sprawdza zakresy i spójność wartości. Rzuca SettingsError z listą wszystkich problemów."""
+    problems = []
+    if not settings.model_path:
+        problems.append("model_path nie może być pusty")
+    if settings.device not in VALID_DEVICES:
+        problems.append(f"device musi być jednym z {VALID_DEVICES}, otrzymano '{settings.device}'")
+    if settings.compute_type not in VALID_COMPUTE_TYPES:
+        problems.append(f"compute_type musi być jednym z {VALID_COMPUTE_TYPES}, otrzymano '{settings.compute_type}'")
+    if not settings.hotkey:
+        problems.append("hotkey nie może być pusty")
+    if not settings.language:
+        problems.append("language nie może być pusty (użyj 'auto' dla autodetekcji)")
+    if settings.beam_size < 1:
+        problems.append(f"beam_size musi być >= 1, otrzymano {settings.beam_size}")
+    if not 0.0 <= settings.no_speech_threshold <= 1.0:
+        problems.append(f"no_speech_threshold musi być w zakresie [0, 1], otrzymano {settings.no_speech_threshold}")
+    if settings.log_prob_threshold > 0.0:
+        problems.append(f"log_prob_threshold musi być <= 0, otrzymano {settings.log_prob_threshold}")
+    if settings.compression_ratio_threshold <= 0.0:
+        problems.append(f"compression_ratio_threshold musi być > 0, otrzymano {settings.compression_ratio_threshold}")
+    if settings.vad_min_chunk_seconds <= 0.0:
+        problems.append(f"vad_min_chunk_seconds musi być > 0, otrzymano {settings.vad_min_chunk_seconds}")
+    if settings.vad_max_buffer_seconds < settings.vad_min_chunk_seconds:
+        problems.append(
+            f"vad_max_buffer_seconds ({settings.vad_max_buffer_seconds}) nie może być mniejsze "
+            f"niż vad_min_chunk_seconds ({settings.vad_min_chunk_seconds})"
+        )
+    if settings.vad_silence_threshold_seconds < 0.1:
+        problems.append(f"vad_silence_threshold_seconds musi być >= 0.1 (rozdzielczość okna RMS), otrzymano {settings.vad_silence_threshold_seconds}")
+    if not 0.0 < settings.vad_rms_threshold < 1.0:
+        problems.append(f"vad_rms_threshold musi być w zakresie (0, 1), otrzymano {settings.vad_rms_threshold}")
+    if settings.silence_compaction_max_seconds != 0.0 and settings.silence_compaction_max_seconds < 0.2:
+        problems.append(f"silence_compaction_max_seconds musi być 0 (wyłączone) lub >= 0.2, otrzymano {settings.silence_compaction_max_seconds}")
+    if not 1.0 <= settings.time_compression <= 2.0:
+        problems.append(f"time_compression musi być w zakresie [1.0, 2.0] (1.0 = wyłączone), otrzymano {settings.time_compression}")
+    if not 0.0 <= settings.speech_energy_floor < 1.0:
+        problems.append(f"speech_energy_floor musi być w zakresie [0, 1) (0 = vad_rms_threshold), otrzymano {settings.speech_energy_floor}")
+    if settings.capture_mode not in VALID_CAPTURE_MODES:
+        problems.append(f"capture_mode musi być jednym z {VALID_CAPTURE_MODES}, otrzymano '{settings.capture_mode}'")
+    if settings.capture_samplerate != 0 and not 8000 <= settings.capture_samplerate <= 384000:
+        problems.append(f"capture_samplerate musi być 0 (natywna urządzenia) lub w zakresie [8000, 384000], otrzymano {settings.capture_samplerate}")
+    if not 0.0 <= settings.preroll_seconds <= 5.0:
+        problems.append(f"preroll_seconds musi być w zakresie [0, 5], otrzymano {settings.preroll_seconds}")
+    if settings.audio_queue_max_seconds < 1.0:
+        problems.append(f"audio_queue_max_seconds musi być >= 1, otrzymano {settings.audio_queue_max_seconds}")
+    if settings.audio_queue_policy not in VALID_QUEUE_POLICIES:
+        problems.append(f"audio_queue_policy musi być jednym z {VALID_QUEUE_POLICIES}, otrzymano '{settings.audio_queue_policy}'")
+    if settings.memory_budget_mb < 0.0:
+        problems.append(f"memory_budget_mb musi być >= 0 (0 = wyłączony), otrzymano {settings.memory_budget_mb}")
+    elif memory_budget.is_enabled(settings) and memory_budget.queue_limit_seconds(settings) < 1.0:
+        problems.append(
+            f"memory_budget_mb ({settings.memory_budget_mb}) jest za mały dla vad_max_buffer_seconds "
+            f"({settings.vad_max_buffer_seconds}) – potrzeba co najmniej "
+            f"{(settings.vad_max_buffer_seconds * (1 + memory_budget.PROCESSING_COPIES) + 1) * memory_budget.AUDIO_BYTES_PER_SECOND / 2**20:.1f} MB"
+        )
+    if settings.draft_model_path:
+        if settings.draft_device not in VALID_DEVICES:
+            problems.append(f"draft_device musi być jednym z {VALID_DEVICES}, otrzymano '{settings.draft_device}'")
+        if settings.draft_compute_type not in VALID_COMPUTE_TYPES:
+            problems.append(f"draft_compute_type musi być jednym z {VALID_COMPUTE_TYPES}, otrzymano '{settings.draft_compute_type}'")
+    if not 0 <= settings.prompt_max_tokens <= 223:
+        problems.append(f"prompt_max_tokens musi być w zakresie [0, 223] (limit promptu Whispera), otrzymano {settings.prompt_max_tokens}")
+    if settings.session_archive_format not in VALID_ARCHIVE_FORMATS:
+        problems.append(f"session_archive_format musi być jednym z {VALID_ARCHIVE_FORMATS}, otrzymano '{settings.session_archive_format}'")
+    if settings.session_archive_max_mb <= 0.0:
+        problems.append(f"session_archive_max_mb musi być > 0, otrzymano {settings.session_archive_max_mb}")
+    if settings.session_archive_max_days < 0.0:
+        problems.append(f"session_archive_max_days musi być >= 0 (0 = bez limitu wieku), otrzymano {settings.session_archive_max_days}")
+    if settings.profiling_latency_threshold <= 0.0 or settings.profiling_rtf_threshold <= 0.0:
+        problems.append("progi profilowania (profiling_latency_threshold, profiling_rtf_threshold) muszą być > 0")
+    if settings.profiling_enabled and not settings.profiling_dir:
+        problems.append("profiling_dir nie może być pusty, gdy profiling_enabled = true")
+    if settings.profiling_keep < 1:
+        problems.append(f"profiling_keep musi być >= 1, otrzymano {settings.profiling_keep}")
+    if not 1 <= settings.metrics_port <= 65535:
+        problems.append(f"metrics_port musi być w zakresie [1, 65535], otrzymano {settings.metrics_port}")
+    if not 0 <= settings.batch_jobs_port <= 65535:
+        problems.append(f"batch_jobs_port musi być w zakresie [0, 65535] (0 = wyłączone), otrzymano {settings.batch_jobs_port}")
+    elif settings.metrics_enabled and settings.batch_jobs_port == settings.metrics_port:
+        problems.append(f"batch_jobs_port nie może być równy metrics_port ({settings.metrics_port})")
+    if problems:
+        raise SettingsError("Niepoprawna konfiguracja: " + "; ".join(problems))
+
+
+def load_settings(config_path=CONFIG_PATH, **overrides):
+    """
+    Wczytuje i waliduje config.ini, zwracając obiekt Settings.
+    `overrides` pozwala nadpisać pojedyncze pola (np. model_path w testach porównawczych).
+    Rzuca SettingsError przy niepoprawnych wartościach lub nieczytelnym pliku.
+    """
+    config = configparser.ConfigParser()
+    try:
+        read_files = config.read(config_path, encoding='utf-8')
+    except configparser.Error as e:
+        raise SettingsError(f"Nie można sparsować {config_path}: {e}") from e
+    if not read_files:
+        raise SettingsError(f"Nie znaleziono pliku konfiguracyjnego: {config_path}")
+
+    values = {}
+    for f in dataclasses.fields(Settings):
+        try:
+            values[f.name] = _read_value(config, f.metadata['section'], f.name, f.type, f.default)
+        except ValueError as e:
+            raise SettingsError(f"[{f.metadata['section']}] {f.name}: {e}") from e
+    values.update(overrides)
+
+    settings = Settings(**values)
+    validate_settings(settings)
+    return settings
+
+
+class ConfigWatcher:
+    """
+    Obserwuje plik config.ini (odpytując jego mtime) i po każdej poprawnej
+    zmianie wywołuje `on_change(old_settings, new_settings, changed_fields)`.
+    Niepoprawna konfiguracja jest logowana i ignorowana – aktywne pozostają
+    poprzednie ustawienia.
+    """
+
+    def __init__(self, settings, on_change, config_path=CONFIG_PATH, interval=1.0):
+        self.settings = settings
+        self.on_change = on_change
+        self.config_path = config_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._mtime = self._current_mtime()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            mtime = self._current_mtime()
+            if mtime is None or mtime == self._mtime:
+                continue
+            self._mtime = mtime
+            self.check()
+
+    def check(self):
+        """Wczytuje plik ponownie i powiadamia o zmianach (wywoływane też ręcznie)."""
+        try:
+            new_settings = load_settings(self.config_path)
+        except SettingsError as e:
+            app_logger.warning(f"⚠️ Zmiana config.ini odrzucona, nadal obowiązują poprzednie ustawienia. {e}")
+            return
+        changed = self.settings.changed_fields(new_settings)
+        if not changed:
+            return
+        old_settings, self.settings = self.settings, new_settings
+        try:
+            self.on_change(old_settings, new_settings, changed)
+        except Exception as e:
+            app_logger.error(f"❌ Błąd podczas stosowania nowej konfiguracji: {e}")
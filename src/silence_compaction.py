@@ -0,0 +1,151 @@
+# src/silence_compaction.py
+"""
+Kompaktowanie ciszy przed inferencją i pomijanie fragmentów bez mowy.
+
+Fragment wycięty przez `ChunkBuffer` zawiera każde 100-milisekundowe okno
+ciszy, które cięcie i tak już zmierzyło (RMS). Te same wartości RMS służą tu do:
+
+- **pominięcia fragmentu**, jeśli ma mniej niż `SPEECH_MIN_SECONDS` okien
+  powyżej progu energii mowy (`speech_energy_floor`, domyślnie `vad_rms_threshold`)
+  – sama cisza lub oddech nie trafia do modelu (i nie generuje halucynacji),
+- **skrócenia długich cisz**: ciąg okien ciszy dłuższy niż
+  `silence_compaction_max_seconds` jest skracany do tej długości (po połowie
+  przy sąsiedniej mowie), więc model dekoduje mniej audio, a pauza zostaje.
+
+`TimestampMap` przelicza czasy segmentów ze skompaktowanego (i ewentualnie
+przyspieszonego, src/time_stretch.py) audio na czasy w oryginalnym nagraniu.
+"""
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+from src.chunking import RMS_WINDOW_SECONDS, window_rms
+
+SPEECH_MIN_SECONDS = 0.2    # [s] Minimalna ilość okien powyżej progu energii mowy, by fragment trafił do modelu
+
+
+class TimestampMap:
+    """
+    Czas w skompaktowanym audio -> czas w oryginalnym nagraniu (z przesunięciem `offset`).
+    Zachowane odcinki są opisane parami (początek w audio skompaktowanym, początek w oryginale).
+    `time_scale` to przyspieszenie audio po kompaktowaniu (`time_compression`, 1 = bez zmian).
+    """
+
+    def __init__(self, offset=0.0, spans=((0.0, 0.0),), removed_seconds=0.0, time_scale=1.0):
+        self.offset = offset
+        self._compact = np.array([span[0] for span in spans], dtype=np.float64)
+        self._original = np.array([span[1] for span in spans], dtype=np.float64)
+        self.removed_seconds = removed_seconds
+        self.time_scale = time_scale
+
+    def compressed(self, factor):
+        """Ta sama mapa dla audio przyspieszonego dodatkowo `factor` razy."""
+        spans = list(zip(self._compact, self._original))
+        return TimestampMap(self.offset, spans, self.removed_seconds, self.time_scale * factor)
+
+    def to_original(self, seconds, end=False):
+        """Czas oryginalny; `end=True` dla końca segmentu (granica odcinków należy do odcinka wcześniejszego)."""
+        seconds = seconds * self.time_scale
+        index = max(0, int(np.searchsorted(self._compact, seconds, side='left' if end else 'right')) - 1)
+        return self.offset + self._original[index] + (seconds - self._compact[index])
+
+
+def speech_floor(settings):
+    return settings.speech_energy_floor or settings.vad_rms_threshold
+
+
+def has_speech(levels, settings):
+    """Czy fragment ma co najmniej `SPEECH_MIN_SECONDS` okien powyżej progu energii mowy."""
+    required = max(1, round(SPEECH_MIN_SECONDS / RMS_WINDOW_SECONDS))
+    return int(np.count_nonzero(levels >= speech_floor(settings))) >= required
+
+
+def chunk_levels(audio):
+    """RMS okien fragmentu, gdy nie ma ich z `ChunkBuffer` (np. fragment spoza sesji strumieniowej)."""
+    return window_rms(np.asarray(audio, dtype=np.float32).reshape(-1), int(SAMPLE_RATE * RMS_WINDOW_SECONDS))
+
+
+def compact_silence(audio, levels, settings, offset=0.0):
+    """
+    Skraca ciągi okien ciszy dłuższe niż `silence_compaction_max_seconds`.
+    Zwraca (audio, TimestampMap); bez zmian (ten sam obiekt audio), jeśli nie ma czego skracać.
+    """
+    window_size = int(SAMPLE_RATE * RMS_WINDOW_SECONDS)
+    keep_windows = int(round(settings.silence_compaction_max_seconds / RMS_WINDOW_SECONDS))
+    silent = levels < settings.vad_rms_threshold
+    if settings.silence_compaction_max_seconds <= 0 or np.count_nonzero(silent) <= keep_windows:
+        return audio, TimestampMap(offset)
+
+    # Granice ciągów ciszy: [początek, koniec) w oknach
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    cuts = []
+    for start, end in zip(starts, ends):
+        if end - start <= keep_windows:
+            continue
+        # Cisza na początku/końcu fragmentu przylega do mowy tylko z jednej strony
+        if start == 0:
+            head, tail = 0, keep_windows // 2
+        elif end == len(levels):
+            head, tail = keep_windows // 2, 0
+        else:
+            head, tail = keep_windows // 2, keep_windows - keep_windows // 2
+        if end - start - head - tail > 0:
+            cuts.append(((start + head) * window_size, (end - tail) * window_size))
+    if not cuts:
+        return audio, TimestampMap(offset)
+
+    pieces, spans = [], []
+    position = compact_position = 0
+    for cut_start, cut_end in cuts:
+        if cut_start > position:
+            pieces.append(audio[position:cut_start])
+            spans.append((compact_position / SAMPLE_RATE, position / SAMPLE_RATE))
+            compact_position += cut_start - position
+        position = cut_end
+    if position < len(audio):
+        pieces.append(audio[position:])
+        spans.append((compact_position / SAMPLE_RATE, position / SAMPLE_RATE))
+    removed = sum(cut_end - cut_start for cut_start, cut_end in cuts) / SAMPLE_RATE
+    return np.concatenate(pieces) if pieces else audio[:0], TimestampMap(offset, spans or ((0.0, 0.0),), removed)
+
+
+class CompactionStats:
+    """Oszczędności sesji: usunięte audio, pominięte fragmenty i szacowany zaoszczędzony czas inferencji."""
+
+    def __init__(self):
+        self.removed_seconds = 0.0
+        self.skipped_chunks = 0
+        self.skipped_seconds = 0.0
+        self._decoded_seconds = 0.0
+        self._decode_time = 0.0
+        self._compaction_saved = 0.0
+
+    def add_decoded(self, decoded_seconds, removed_seconds, decode_time):
+        """Fragment po kompaktowaniu: oszczędność = usunięte sekundy * RTF tego fragmentu."""
+        self.removed_seconds += removed_seconds
+        self._decoded_seconds += decoded_seconds
+        self._decode_time += decode_time
+        if decoded_seconds > 0:
+            self._compaction_saved += removed_seconds * decode_time / decoded_seconds
+
+    def add_skipped(self, seconds):
+        self.skipped_chunks += 1
+        self.skipped_seconds += seconds
+
+    @property
+    def saved_seconds(self):
+        return self.removed_seconds + self.skipped_seconds
+
+    @property
+    def inference_saved_seconds(self):
+        """Szacunek: pominięte fragmenty liczone średnim RTF sesji."""
+        mean_rtf = self._decode_time / self._decoded_seconds if self._decoded_seconds > 0 else 0.0
+        return self._compaction_saved + self.skipped_seconds * mean_rtf
+
+    def to_record(self):
+        return {
+            'silence_removed_seconds': round(self.removed_seconds, 4),
+            'skipped_chunks': self.skipped_chunks,
+            'skipped_seconds': round(self.skipped_seconds, 4),
+            'inference_saved_seconds': round(self.inference_saved_seconds, 4),
+        }
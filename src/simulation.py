@@ -0,0 +1,252 @@
+# src/simulation.py
+"""
+Uruchamianie potoku strumieniowego bez mikrofonu, GPU i serwera X.
+
+- `StubWhisperModel` – atrapa `WhisperModel` o zadanym RTF i rozrzucie czasu;
+  tekst zależy wyłącznie od audio, więc wyniki można porównywać diffem,
+- `synthetic_dictation()` – syntetyczne „dyktowanie” (mowa przeplatana pauzami),
+- `replay_recording()` – podaje bloki nagrania (src/session_recorder.py) do
+  prawdziwej sesji dyktowania (`DictationSession` z src/session_engine.py),
+  w czasie rzeczywistym lub z maksymalną prędkością.
+"""
+import collections
+import hashlib
+import random
+import time
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+from src.audio_capture import CAPTURE_BLOCK_SECONDS
+from src.audio_queue import BoundedAudioQueue
+from src.output_sink import CollectingOutputSink
+from src.session_recorder import SessionRecording
+from src.settings import Settings
+
+StubSegment = collections.namedtuple('StubSegment', ['start', 'end', 'text'])
+StubInfo = collections.namedtuple('StubInfo', ['language', 'language_probability', 'duration'])
+
+
+class StubWhisperModel:
+    """
+    Model o zadanym RTF: `transcribe()` trwa `długość_audio * rtf` (± `jitter`,
+    odchylenie względne). Przy `time_scale > 1` czas jest odpowiednio skrócony
+    (symulacja przyspieszona, jak w `replay_recording`). Z `busy=True` czas jest spędzany
+    w pętli Pythona z GIL-em (jak dekodowanie i preprocessing), a nie w `sleep`.
+    Wywołania są rejestrowane w `calls`.
+    """
+
+    def __init__(self, rtf=0.2, jitter=0.0, seed=0, language='pl', time_scale=1.0, busy=False):
+        self.rtf = rtf
+        self.busy = busy
+        self.jitter = jitter
+        self.time_scale = time_scale
+        self.language = language
+        self._random = random.Random(seed)
+        self.calls = []
+
+    def compute_time(self, duration):
+        factor = 1.0 + self._random.gauss(0.0, self.jitter) if self.jitter > 0 else 1.0
+        return max(0.0, duration * self.rtf * factor)
+
+    def transcribe(self, audio, language=None, beam_size=5, initial_prompt=None, **kwargs):
+        audio = np.asarray(audio, dtype=np.float32)
+        duration = len(audio) / SAMPLE_RATE
+        delay = self.compute_time(duration)
+        self.calls.append({'duration': duration, 'beam_size': beam_size, 'initial_prompt': initial_prompt, 'compute_time': delay})
+        digest = hashlib.sha1(np.round(audio, 4).tobytes()).hexdigest()[:8]
+        text = f" [{duration:.2f}s {digest}]"
+        info = StubInfo(language or self.language, 1.0, duration)
+
+        def segments():
+            # Jak w faster-whisper: dekodowanie odbywa się podczas iteracji po segmentach
+            if self.busy:
+                deadline = time.perf_counter() + delay / self.time_scale
+                while time.perf_counter() < deadline:
+                    pass
+            else:
+                time.sleep(delay / self.time_scale)
+            yield StubSegment(0.0, duration, text)
+        return segments(), info
+
+
+class StubModelFactory:
+    """Tworzy `StubWhisperModel(**kwargs)` z ustawień – do procesu inferencji (musi dać się zapiklować)."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def __call__(self, settings):
+        return StubWhisperModel(**self.kwargs)
+
+
+class ReadyModelLoader:
+    """Odpowiednik BackgroundModelLoader dla już gotowego modelu."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def is_ready(self):
+        return True
+
+    def wait(self, timeout=None):
+        return self.model
+
+
+class TranscriptCapture:
+    """Przezroczysta nakładka na model, zapamiętująca tekst każdego wywołania `transcribe()`."""
+
+    def __init__(self, model):
+        self.model = model
+        self.texts = []
+
+    def __getattr__(self, name):
+        # Pozostałe atrybuty (np. hf_tokenizer) pochodzą z opakowanego modelu
+        return getattr(self.model, name)
+
+    def transcribe(self, audio, **kwargs):
+        segments, info = self.model.transcribe(audio, **kwargs)
+
+        def collect():
+            parts = []
+            for segment in segments:
+                parts.append(segment.text)
+                yield segment
+            self.texts.append("".join(parts).strip())
+        return collect(), info
+
+
+# --- Syntetyczne Nagrania ---
+
+def synthetic_dictation(seconds, seed=0, speech_range=(2.0, 8.0), pause_range=(0.2, 1.5)):
+    """
+    Szum modulowany obwiednią sylab (~4 Hz), przeplatany pauzami z cichym tłem.
+    Zwraca sygnał float32 o długości `seconds`.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    parts, length = [], 0
+    speaking = True
+    while length < total:
+        low, high = speech_range if speaking else pause_range
+        n = int(rng.uniform(low, high) * SAMPLE_RATE)
+        if speaking:
+            t = np.arange(n) / SAMPLE_RATE
+            envelope = 0.3 + 0.7 * np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+            parts.append(0.2 * envelope * rng.standard_normal(n))
+        else:
+            parts.append(0.0002 * rng.standard_normal(n))
+        length += n
+        speaking = not speaking
+    return np.concatenate(parts)[:total].astype(np.float32)
+
+
+def recording_from_audio(audio, settings=None, block_seconds=CAPTURE_BLOCK_SECONDS, samplerate=SAMPLE_RATE):
+    """Dzieli sygnał na bloki callbacku z chwilami przechwycenia, jak podczas nagrania na żywo."""
+    block = int(block_seconds * samplerate)
+    sizes = np.full(len(audio) // block, block, dtype=np.int64)
+    if len(audio) % block:
+        sizes = np.append(sizes, len(audio) % block)
+    timestamps = np.cumsum(sizes) / samplerate
+    return SessionRecording(
+        audio=np.asarray(audio, dtype=np.float32), block_sizes=sizes, timestamps=timestamps,
+        released_at=len(audio) / samplerate, samplerate=samplerate, settings=settings or Settings(),
+    )
+
+
+# --- Odtwarzanie ---
+
+def replay_recording(recording, settings=None, model=None, realtime=True, time_scale=1.0, draft=None):
+    """
+    Odtwarza nagranie przez sesję dyktowania (DictationSession) i zwraca słownik wyników:
+    fragmenty (granice, przyczyna cięcia, tekst, czasy), latencję od puszczenia
+    skrótu do końca transkrypcji, łączny czas obliczeń i tekst końcowy.
+
+    `realtime=True` zachowuje odstępy między blokami (i limit kolejki z ustawień);
+    `realtime=False` podaje bloki tak szybko, jak konsument je przyjmuje – cięcie
+    jest identyczne, a latencja oznacza wtedy czas przetworzenia całego nagrania.
+
+    `time_scale > 1` przyspiesza czas rzeczywisty (bloki przychodzą `time_scale`
+    razy częściej), a zmierzone czasy są przeliczane z powrotem na czas nagrania.
+    Ma sens tylko wtedy, gdy cały kosztowny krok jest symulowany w tej samej skali
+    (atrapa modelu z tym samym `time_scale`, symulowany preprocessing).
+
+    `draft` (DraftTranscriber) włącza podgląd z modelu szkicu; wynik ma wtedy klucz
+    `draft`, a fragmenty – latencje szkicu i modelu głównego (src/draft_preview.py).
+    """
+    from src.session_engine import DictationSession
+
+    settings = settings or recording.settings
+    model = TranscriptCapture(model if model is not None else StubWhisperModel())
+    if realtime:
+        audio_queue = BoundedAudioQueue.from_settings(settings)
+    else:
+        # Bez utraty audio: limit obejmuje całe nagranie, więc producent nigdy nie czeka
+        audio_queue = BoundedAudioQueue(recording.duration + 1.0, 'block', recording.samplerate)
+    sink = CollectingOutputSink()
+    # audio_capture=False: bloki podaje pętla poniżej, bez strumienia audio
+    session = DictationSession(settings, ReadyModelLoader(model), sink, audio_capture=False, mode='replay',
+                               audio_queue=audio_queue, record_session=False, draft=draft)
+    metrics = session.metrics
+
+    start = time.perf_counter()
+    session.start()
+    released = None
+    for timestamp, block in recording.blocks():
+        if realtime:
+            if released is None and timestamp > recording.released_at:
+                released = _sleep_until(start + recording.released_at / time_scale)
+            _sleep_until(start + timestamp / time_scale)
+        session.enqueue(block)
+    if released is None:
+        released = _sleep_until(start + recording.released_at / time_scale) if realtime else time.perf_counter()
+    session.release()
+    session.wait_transcribed()
+    finished = time.perf_counter()
+    draft_record = session.draft_record() if draft is not None else None
+
+    chunks, position = [], 0.0
+    texts = iter(model.texts)
+    for chunk in metrics.chunks:
+        # Fragment bez mowy nie trafił do modelu (src/silence_compaction.py)
+        skipped = chunk.get('skipped', False)
+        chunks.append({
+            'index': chunk['index'],
+            'start': round(position, 3),
+            'end': round(position + chunk['duration'], 3),
+            'split_reason': chunk['split_reason'],
+            'text': None if skipped else next(texts),
+            'queue_wait': round(chunk['queue_wait'] * time_scale, 4),
+            'transcription_time': 0.0 if skipped else round(chunk['transcription_time'] * time_scale, 4),
+            'preprocessing_time': 0.0 if skipped else round(chunk['preprocessing_time'] * time_scale, 4),
+        })
+        for key in ('final_latency', 'draft_latency'):
+            if key in chunk:
+                chunks[-1][key] = round(chunk[key] * time_scale, 4)
+        if 'draft_wer' in chunk:
+            chunks[-1]['draft_wer'] = chunk['draft_wer']
+        position += chunk['duration']
+    result = {
+        'duration': round(recording.duration, 3),
+        'chunks': chunks,
+        'forced_cuts': sum(1 for c in chunks if c['split_reason'] == 'MAX_BUFFER_LIMIT'),
+        'user_latency': round((finished - released) * time_scale, 4),
+        'compute_time': round(sum(c['transcription_time'] + c['preprocessing_time'] for c in chunks), 4),
+        'queue': audio_queue.stats(),
+        'silence': {
+            'removed_seconds': round(session.compaction.removed_seconds, 3),
+            'skipped_chunks': session.compaction.skipped_chunks,
+            'skipped_seconds': round(session.compaction.skipped_seconds, 3),
+        },
+        'inference_saved_seconds': round(session.compaction.inference_saved_seconds * time_scale, 4),
+        'final_text': (sink.text + session.transcript).strip(),
+    }
+    if draft_record is not None:
+        result['draft'] = draft_record
+    return result
+
+
+def _sleep_until(deadline):
+    remaining = deadline - time.perf_counter()
+    if remaining > 0:
+        time.sleep(remaining)
+    return time.perf_counter()
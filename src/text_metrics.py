@@ -0,0 +1,47 @@
+# src/text_metrics.py
+"""
+Miary jakości transkrypcji: WER (błędy na poziomie słów) i CER (na poziomie znaków).
+
+Przed porównaniem tekst jest normalizowany (małe litery, bez interpunkcji,
+pojedyncze spacje), aby różnice w formatowaniu nie liczyły się jako błędy.
+Dla wyników zbiorczych należy sumować liczniki z `error_counts`, a nie
+uśredniać WER poszczególnych nagrań.
+"""
+import unicodedata
+
+
+def normalize_text(text):
+    """Małe litery, interpunkcja zamieniona na spacje, pojedyncze spacje."""
+    characters = [' ' if unicodedata.category(c).startswith('P') else c for c in text.lower()]
+    return " ".join("".join(characters).split())
+
+
+def edit_distance(reference, hypothesis):
+    """Odległość Levenshteina między sekwencjami (podstawienia, wstawienia, usunięcia)."""
+    if len(reference) < len(hypothesis):
+        reference, hypothesis = hypothesis, reference
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_item in enumerate(reference, start=1):
+        current = [i]
+        for j, hyp_item in enumerate(hypothesis, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_item != hyp_item)))
+        previous = current
+    return previous[-1]
+
+
+def error_counts(reference, hypothesis, unit='word'):
+    """(liczba błędów, długość referencji) w słowach (`word`) lub znakach (`char`)."""
+    reference, hypothesis = normalize_text(reference), normalize_text(hypothesis)
+    if unit == 'word':
+        reference, hypothesis = reference.split(), hypothesis.split()
+    return edit_distance(reference, hypothesis), len(reference)
+
+
+def word_error_rate(reference, hypothesis):
+    errors, length = error_counts(reference, hypothesis, 'word')
+    return errors / length if length else float(errors > 0)
+
+
+def character_error_rate(reference, hypothesis):
+    errors, length = error_counts(reference, hypothesis, 'char')
+    return errors / length if length else float(errors > 0)
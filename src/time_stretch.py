@@ -0,0 +1,61 @@
+# src/time_stretch.py
+"""
+Eksperymentalne skracanie fragmentu w czasie (WSOLA) przed inferencją.
+
+Koszt dekodowania rośnie z długością audio, a dyktowana mowa jest zwykle
+wolniejsza niż mowa, na której trenowano Whispera. Przy `time_compression > 1`
+fragment jest przyspieszany o ten współczynnik z zachowaniem wysokości głosu:
+WSOLA (Waveform Similarity Overlap-Add) składa okna Hanna co `hop` próbek
+wyjścia, a każde kolejne okno jest pobierane z wejścia co `hop * factor`
+próbek, przesunięte (w granicach tolerancji) tam, gdzie najlepiej pasuje do
+naturalnej kontynuacji poprzedniego okna (maksimum korelacji). Dzięki temu
+nie powstają nieciągłości fazy, jak przy zwykłym wycinaniu próbek.
+
+Czasy segmentów wracają na oś oryginału przez `TimestampMap.compressed()`
+(src/silence_compaction.py) – mapowanie jest liniowe, z błędem najwyżej
+rzędu tolerancji (kilka ms). Zysk RTF i koszt WER dla kolejnych współczynników
+mierzy `tests/run_benchmark_matrix.py --time-compression 1.0,1.15,1.25,1.4`.
+"""
+import numpy as np
+
+from src.audio_preprocessing import SAMPLE_RATE
+
+WSOLA_FRAME_SECONDS = 0.032         # Okno analizy/syntezy (512 próbek przy 16 kHz)
+WSOLA_TOLERANCE_SECONDS = 0.008     # Maksymalne przesunięcie okna względem pozycji nominalnej
+
+
+def time_compress(audio, factor, samplerate=SAMPLE_RATE):
+    """
+    Skraca `audio` `factor` razy (factor > 1 = szybciej) bez zmiany wysokości dźwięku.
+    Zwraca float32 o długości round(len(audio) / factor); przy factor == 1 zwraca wejście.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    frame = int(WSOLA_FRAME_SECONDS * samplerate)
+    if factor == 1.0 or len(audio) < frame:
+        return audio
+    hop = frame // 2
+    tolerance = int(WSOLA_TOLERANCE_SECONDS * samplerate)
+    window = np.hanning(frame + 1)[:frame].astype(np.float32)  # Okresowe okno Hanna: suma nakładek = 1
+    first_window = window.copy()
+    first_window[:hop] = 1.0                                   # Pierwsze okno bez wygaszenia początku
+
+    output_length = int(round(len(audio) / factor))
+    frames = output_length // hop + 1
+    # Zera z obu stron: okna przy brzegach i przesunięcia o tolerancję nie wychodzą poza bufor
+    padded = np.pad(audio, (tolerance, 2 * frame + 2 * tolerance))
+    output = np.zeros(frames * hop + frame, dtype=np.float32)
+
+    previous = 0
+    for index in range(frames):
+        nominal = int(round(index * hop * factor))
+        if index == 0:
+            position = 0
+        else:
+            # Naturalna kontynuacja poprzedniego okna vs. kandydaci wokół pozycji nominalnej
+            template = padded[tolerance + previous + hop:tolerance + previous + hop + frame]
+            region = padded[nominal:nominal + frame + 2 * tolerance]
+            position = nominal + int(np.argmax(np.correlate(region, template, 'valid'))) - tolerance
+        segment = padded[tolerance + position:tolerance + position + frame]
+        output[index * hop:index * hop + frame] += segment * (first_window if index == 0 else window)
+        previous = position
+    return output[:output_length]
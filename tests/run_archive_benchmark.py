@@ -0,0 +1,70 @@
+# FILE: tests/run_archive_benchmark.py
+# Benchmark archiwum sesji (src/session_archive.py): koszt kodowania (CPU wątku archiwizacji
+# na sekundę audio), rozmiar wpisu względem WAV oraz zgodność odtworzenia. Wpis archiwum jest
+# odtwarzany przez replay_recording jak nagranie .npz i granice fragmentów są porównywane z oryginałem.
+# SNR odtworzonego audio: FLAC zapisuje próbki int16 bez strat (pozostaje tylko kwantyzacja
+# float32 -> int16), Opus jest stratny – granice cięcia (RMS okien) mogą się wtedy przesunąć.
+# Użycie: python tests/run_archive_benchmark.py [--seconds 90] [--sessions 3]
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.session_archive import ARCHIVE_EXTENSIONS, enforce_retention, load_archive, write_archive
+from src.settings import Settings
+from src.simulation import StubWhisperModel, recording_from_audio, replay_recording, synthetic_dictation
+
+
+def boundaries(result):
+    return [(c['start'], c['end'], c['split_reason']) for c in result['chunks']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Koszt i zgodność archiwum sesji (FLAC/Opus).")
+    parser.add_argument("--seconds", type=float, default=90.0, help="Długość syntetycznej sesji.")
+    parser.add_argument("--sessions", type=int, default=3, help="Liczba sesji (różne ziarna).")
+    args = parser.parse_args()
+
+    settings = Settings(session_recording_dir='')
+    directory = tempfile.mkdtemp(prefix="archive_bench_")
+    try:
+        print(f"\n--- Archiwum sesji: {args.sessions} x {args.seconds:.0f}s ---")
+        print(f"   {'format':<8} {'CPU/s audio':>12} {'rozmiar':>10} {'% WAV':>7} {'odczyt':>9} {'SNR min.':>9} {'granice fragmentów':>19}")
+        for audio_format in ARCHIVE_EXTENSIONS:
+            cpu = size = load_time = 0.0
+            identical = 0
+            snr = []
+            for seed in range(args.sessions):
+                recording = recording_from_audio(synthetic_dictation(args.seconds, seed=seed), settings)
+                start = time.thread_time()
+                path = write_archive(directory, f"{audio_format}{seed}", recording, "", {}, audio_format)
+                cpu += time.thread_time() - start
+                size += os.path.getsize(path[:-5] + ARCHIVE_EXTENSIONS[audio_format]) + os.path.getsize(path)
+                start = time.perf_counter()
+                restored = load_archive(path)
+                load_time += time.perf_counter() - start
+                noise = np.sum((restored.audio - recording.audio).astype(np.float64) ** 2)
+                snr.append(10 * np.log10(np.sum(recording.audio.astype(np.float64) ** 2) / noise))
+                original = replay_recording(recording, settings, StubWhisperModel(rtf=0.0), realtime=False)
+                replayed = replay_recording(restored, settings, StubWhisperModel(rtf=0.0), realtime=False)
+                identical += boundaries(original) == boundaries(replayed)
+            wav_bytes = args.sessions * args.seconds * 16000 * 2
+            print(f"   {audio_format:<8} {1000 * cpu / (args.sessions * args.seconds):9.2f} ms {size / args.sessions / 2**20:7.2f} MB "
+                  f"{100 * size / wav_bytes:6.1f}% {load_time / args.sessions:8.2f}s {min(snr):6.1f} dB {identical:>11}/{args.sessions} zgodne")
+        total = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        removed, freed = enforce_retention(directory, max_mb=total / 2 / 2**20, max_days=0)
+        print(f"   Retencja (limit = połowa archiwum): usunięto {removed} najstarszych wpisów, zwolniono {freed / 2**20:.2f} MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+# FILE: tests/run_benchmark_matrix.py
+# Macierz benchmarku jakości i szybkości transkrypcji (zastępuje run_comparison_test.py).
+# Dla manifestu klipów z transkrypcjami referencyjnymi przechodzi przez kombinacje
+# model x compute_type x beam_size x preprocessing (x time_compression) i liczy WER, CER oraz RTF każdej komórki.
+# Audio po preprocessingu jest liczone raz na klip (cache w pamięci i na dysku) i używane
+# we wszystkich komórkach. Wyniki można zapisać jako JSON/CSV i porównać z zapisanym baseline.
+#
+# Użycie (CPU, małe modele):
+#   python tests/run_benchmark_matrix.py --models tiny,base --beams 1,5 --json wyniki.json
+#   python tests/run_benchmark_matrix.py --models small --compute-types int8,float32 --baseline wyniki.json
+#   python tests/run_benchmark_matrix.py --models stub      # sprawdzenie samego runnera, bez modelu
+#   python tests/run_benchmark_matrix.py --models small --beams 5 --preprocessing on --time-compression 1.0,1.15,1.25,1.4
+#       # zysk RTF vs strata WER przyspieszenia fragmentów (src/time_stretch.py); RTF liczony względem
+#       # oryginalnej długości audio i łącznie z kosztem WSOLA
+#
+# Manifest (JSON): lista obiektów {"audio": ścieżka, "reference": tekst lub "reference_file": ścieżka,
+# "language": opcjonalnie}. Ścieżki są względne do pliku manifestu. Dla klipów bez referencji
+# WER/CER są liczone względem tekstu komórki odniesienia (--reference-cell, domyślnie ostatni model,
+# największa wiązka, z preprocessingiem, tempo 1x) – mierzą wtedy rozbieżność z najdokładniejszą
+# konfiguracją przebiegu, a nie błąd względem prawdziwej transkrypcji.
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src import audio_preprocessing
+from src.audio_io import load_audio
+from src.audio_preprocessing import apply_preprocessing_pipeline, SAMPLE_RATE
+from src.core_utils import create_model
+from src.settings import CONFIG_PATH, SettingsError, load_settings
+from src.simulation import StubWhisperModel
+from src.text_metrics import error_counts
+from src.time_stretch import time_compress
+
+DEFAULT_MANIFEST = os.path.join(PARENT_DIR, 'benchmark_clips.json')
+DEFAULT_CACHE_DIR = os.path.join(PARENT_DIR, '.benchmark_cache')
+WER_REGRESSION = 0.01       # Wzrost WER (bezwzględny) uznawany za regresję względem baseline
+RTF_REGRESSION = 0.10       # Względny wzrost RTF uznawany za regresję...
+RTF_REGRESSION_MIN = 0.01   # ...o ile jest też większy niż ta wartość bezwzględna (szum pomiaru)
+STUB_RTF = 0.3              # Atrapa ('stub'): czas proporcjonalny do długości audio, jak dekodowanie modelu
+
+
+def parse_list(text):
+    return [v.strip() for v in text.split(',') if v.strip()]
+
+
+def load_manifest(path):
+    """Klipy z manifestu: słowniki z kluczami name, audio (ścieżka), reference (None = brak), language."""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    clips = []
+    for entry in entries:
+        reference = entry.get('reference') or None
+        if entry.get('reference_file'):
+            with open(os.path.join(base, entry['reference_file']), encoding='utf-8') as f:
+                reference = f.read().strip() or None
+        audio_path = os.path.join(base, entry['audio'])
+        clips.append({'name': entry.get('name', os.path.basename(audio_path)), 'audio': audio_path,
+                      'reference': reference, 'language': entry.get('language')})
+    return clips
+
+
+def preprocessing_fingerprint():
+    """Skrót kodu preprocessingu – zmiana potoku unieważnia cache."""
+    with open(audio_preprocessing.__file__, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+class AudioCache:
+    """Surowe i przetworzone audio klipów; przetworzone jest też zapisywane na dysku (.npy)."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.fingerprint = preprocessing_fingerprint()
+        self._memory = {}
+
+    def _disk_path(self, audio_path):
+        with open(audio_path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}_{self.fingerprint}.npy")
+
+    def get(self, audio_path, preprocessed):
+        key = (audio_path, preprocessed)
+        if key not in self._memory:
+            if not preprocessed:
+                self._memory[key] = load_audio(audio_path)
+            else:
+                disk_path = self._disk_path(audio_path) if self.cache_dir else None
+                if disk_path and os.path.exists(disk_path):
+                    self._memory[key] = np.load(disk_path)
+                else:
+                    self._memory[key] = apply_preprocessing_pipeline(self.get(audio_path, False))
+                    if disk_path:
+                        os.makedirs(self.cache_dir, exist_ok=True)
+                        np.save(disk_path, self._memory[key])
+        return self._memory[key]
+
+
+def transcribe(model, audio, settings, beam_size, language):
+    segments, _ = model.transcribe(
+        audio,
+        language=language,
+        beam_size=beam_size,
+        vad_filter=settings.vad_filter,
+        log_prob_threshold=settings.log_prob_threshold,
+        no_speech_threshold=settings.no_speech_threshold
+    )
+    return "".join(segment.text for segment in segments).strip()
+
+
+def run_cell(model, clips, cache, settings, beam_size, preprocessed, time_compression=1.0):
+    """Teksty i RTF komórki; WER/CER uzupełnia `score_results` po przebiegu wszystkich komórek."""
+    totals = {'audio': 0.0, 'time': 0.0}
+    texts = {}
+    for clip in clips:
+        language = clip['language'] or settings.model_language
+        raw_audio = cache.get(clip['audio'], False)
+        compression_time = 0.0
+        if time_compression == 1.0:
+            audio = cache.get(clip['audio'], preprocessed)
+        else:
+            # Jak w sesji: przyspieszenie przed preprocessingiem; koszt WSOLA wliczony w RTF, preprocessingu – nie
+            start_time = time.perf_counter()
+            audio = time_compress(raw_audio, time_compression)
+            compression_time = time.perf_counter() - start_time
+            if preprocessed:
+                audio = apply_preprocessing_pipeline(audio)
+        start_time = time.perf_counter()
+        text = transcribe(model, audio, settings, beam_size, language)
+        totals['time'] += time.perf_counter() - start_time + compression_time
+        totals['audio'] += len(raw_audio) / SAMPLE_RATE
+        texts[clip['name']] = text
+    return {
+        'wer': None,
+        'cer': None,
+        'rtf': totals['time'] / totals['audio'] if totals['audio'] else None,
+        'audio_seconds': round(totals['audio'], 2),
+        'transcription_seconds': round(totals['time'], 3),
+        'texts': texts,
+    }
+
+
+def default_reference_cell(models, compute_types, beams, variants):
+    """Etykieta komórki odniesienia: ostatni model, pierwszy compute_type, największa wiązka, preprocessing jeśli jest."""
+    return f"{models[-1]}/{compute_types[0]}/beam={max(beams)}/{'preproc' if True in variants else 'raw'}"
+
+
+def score_results(results, clips, reference_label):
+    """
+    Uzupełnia WER/CER komórek: referencja z manifestu, a dla klipów bez niej – tekst komórki
+    `reference_label`. Zwraca liczbę klipów ocenianych względem komórki odniesienia.
+    """
+    reference_cell = next((r for r in results if r['label'] == reference_label), None)
+    references, from_cell = {}, 0
+    for clip in clips:
+        if clip['reference'] is not None:
+            references[clip['name']] = clip['reference']
+        elif reference_cell is not None and reference_cell['texts'].get(clip['name']):
+            references[clip['name']] = reference_cell['texts'][clip['name']]
+            from_cell += 1
+    for result in results:
+        totals = {'word_errors': 0, 'words': 0, 'char_errors': 0, 'chars': 0}
+        for name, reference in references.items():
+            errors, words = error_counts(reference, result['texts'][name], 'word')
+            totals['word_errors'] += errors
+            totals['words'] += words
+            errors, chars = error_counts(reference, result['texts'][name], 'char')
+            totals['char_errors'] += errors
+            totals['chars'] += chars
+        result['wer'] = totals['word_errors'] / totals['words'] if totals['words'] else None
+        result['cer'] = totals['char_errors'] / totals['chars'] if totals['chars'] else None
+        result['reference_cell'] = reference_label if from_cell else None
+    return from_cell
+
+
+def cell_key(result):
+    return (result['model'], result['compute_type'], result['beam_size'], result['preprocessing'],
+            result.get('time_compression', 1.0))
+
+
+def compare_with_baseline(results, baseline_path):
+    """Dodaje do wyników pola *_delta i listę regresji względem baseline."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {cell_key(r): r for r in json.load(f)}
+    regressions = []
+    for result in results:
+        previous = baseline.get(cell_key(result))
+        if previous is None:
+            continue
+        for metric in ('wer', 'cer', 'rtf'):
+            if result[metric] is not None and previous.get(metric) is not None:
+                result[f'{metric}_delta'] = result[metric] - previous[metric]
+        if result.get('wer_delta', 0.0) > WER_REGRESSION:
+            regressions.append(f"{result['label']}: WER {previous['wer']:.3f} -> {result['wer']:.3f}")
+        if (previous.get('rtf') is not None and result['rtf'] is not None
+                and result['rtf'] > previous['rtf'] * (1 + RTF_REGRESSION)
+                and result['rtf'] - previous['rtf'] > RTF_REGRESSION_MIN):
+            regressions.append(f"{result['label']}: RTF {previous['rtf']:.3f} -> {result['rtf']:.3f}")
+    return regressions
+
+
+def print_time_compression(results):
+    """
+    Zysk RTF i zmiana WER każdego przyspieszenia względem tej samej komórki bez przyspieszenia.
+    Tekst atrapy ('stub') to skrót audio – zmienia się przy każdym przyspieszeniu, więc jej WER jest pomijany.
+    """
+    reference = {cell_key(r)[:4]: r for r in results if r['time_compression'] == 1.0}
+    print("--- Przyspieszenie fragmentów: zysk RTF vs strata WER (względem tempa 1x) ---")
+    for result in results:
+        base = reference.get(cell_key(result)[:4])
+        if result['time_compression'] == 1.0 or base is None or result['rtf'] is None or not base['rtf']:
+            continue
+        if result['model'] == 'stub':
+            wer = "WER — (atrapa)"
+        elif result['wer'] is not None and base['wer'] is not None:
+            wer = f"WER {base['wer']:.3f} -> {result['wer']:.3f} ({result['wer'] - base['wer']:+.3f})"
+        else:
+            wer = "WER —"
+        print(f"   {result['label']:<44} RTF {base['rtf']:.3f} -> {result['rtf']:.3f} "
+              f"({100 * (result['rtf'] / base['rtf'] - 1):+.0f}% czasu)  {wer}")
+
+
+def format_metric(value, delta=None):
+    if value is None:
+        return f"{'—':>8}"
+    text = f"{value:8.3f}"
+    return text + (f" ({delta:+.3f})" if delta is not None else "")
+
+
+def write_csv(path, results):
+    fields = ['model', 'compute_type', 'beam_size', 'preprocessing', 'time_compression', 'wer', 'cer', 'rtf', 'reference_cell', 'load_seconds',
+              'audio_seconds', 'transcription_seconds', 'wer_delta', 'cer_delta', 'rtf_delta']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Macierz benchmarku: model x compute_type x beam_size x preprocessing.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Plik JSON z klipami i transkrypcjami referencyjnymi.")
+    parser.add_argument("--models", default="tiny,base", help="Modele (np. tiny,base,small; 'stub' = atrapa bez modelu).")
+    parser.add_argument("--compute-types", default="int8", help="Wartości compute_type.")
+    parser.add_argument("--beams", default="1,5", help="Wartości beam_size.")
+    parser.add_argument("--preprocessing", default="on,off", help="Warianty preprocessingu (on,off).")
+    parser.add_argument("--time-compression", default="1.0",
+                        help="Współczynniki przyspieszenia fragmentów (np. 1.0,1.15,1.25,1.4; 1.0 = bez zmian).")
+    parser.add_argument("--reference-cell",
+                        help="Etykieta komórki, której tekst jest referencją klipów bez transkrypcji (np. base/int8/beam=5/preproc).")
+    parser.add_argument("--device", default="cpu", help="Urządzenie modelu (cpu/cuda).")
+    parser.add_argument("--download", action="store_true", help="Pozwól pobrać brakujące modele (local_files_only=False).")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Katalog cache przetworzonego audio ('' = tylko pamięć).")
+    parser.add_argument("--json", help="Zapisz wyniki (z tekstami) do pliku JSON – może posłużyć jako baseline.")
+    parser.add_argument("--csv", help="Zapisz tabelę wyników do pliku CSV.")
+    parser.add_argument("--baseline", help="Plik JSON z poprzedniego przebiegu do porównania.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Kod wyjścia 1 przy regresji względem baseline.")
+    args = parser.parse_args()
+
+    logging.getLogger('preprocessing').setLevel(logging.WARNING)
+
+    try:
+        base_settings = load_settings(CONFIG_PATH, device=args.device, local_files_only=not args.download)
+    except SettingsError as e:
+        print(f"❌ Błąd wczytywania {CONFIG_PATH}: {e}")
+        sys.exit(1)
+    clips = load_manifest(args.manifest)
+    missing = [c['audio'] for c in clips if not os.path.exists(c['audio'])]
+    if missing:
+        print(f"❌ BŁĄD KRYTYCZNY: Brak plików z manifestu: {', '.join(missing)}")
+        sys.exit(1)
+    models, compute_types = parse_list(args.models), parse_list(args.compute_types)
+    beams = [int(b) for b in parse_list(args.beams)]
+    variants = [v == 'on' for v in parse_list(args.preprocessing)]
+    factors = [float(f) for f in parse_list(args.time_compression)]
+    reference_label = args.reference_cell or default_reference_cell(models, compute_types, beams, variants)
+    without_reference = [c['name'] for c in clips if c['reference'] is None]
+    if without_reference:
+        print(f"⚠️ Klipy bez transkrypcji referencyjnej: {', '.join(without_reference)} – "
+              f"WER/CER względem tekstu komórki {reference_label}")
+    cache = AudioCache(args.cache_dir or None)
+    cells = len(models) * len(compute_types) * len(beams) * len(variants) * len(factors)
+    print(f"\n--- Macierz benchmarku: {len(clips)} klipów, {cells} komórek ({args.device}) ---")
+
+    results = []
+    for model_name, compute_type in itertools.product(models, compute_types):
+        settings = base_settings.replace(model_path=model_name, compute_type=compute_type)
+        print(f"\n[{model_name} / {compute_type}] Ładowanie modelu...")
+        start_time = time.perf_counter()
+        try:
+            model = StubWhisperModel(rtf=STUB_RTF) if model_name == 'stub' else create_model(settings)
+        except Exception as e:
+            print(f"   -> ❌ Nie udało się załadować modelu: {e}")
+            continue
+        load_seconds = time.perf_counter() - start_time
+        print(f"   -> Załadowano w {load_seconds:.2f}s.")
+        print(f"   {'beam':>4} {'preproc.':>8} {'tempo':>6} {'RTF':>8}")
+        for beam_size, preprocessed, factor in itertools.product(beams, variants, factors):
+            cell = run_cell(model, clips, cache, settings, beam_size, preprocessed, factor)
+            label = f"{model_name}/{compute_type}/beam={beam_size}/{'preproc' if preprocessed else 'raw'}"
+            result = {'label': label if factor == 1.0 else f"{label}/x{factor:g}",
+                      'model': model_name, 'compute_type': compute_type, 'beam_size': beam_size,
+                      'preprocessing': preprocessed, 'time_compression': factor, 'load_seconds': round(load_seconds, 2), **cell}
+            results.append(result)
+            print(f"   {beam_size:>4} {'tak' if preprocessed else 'nie':>8} {factor:>5g}x {format_metric(cell['rtf'])}")
+        del model
+
+    if not results:
+        print("❌ Brak wyników – żaden model nie został załadowany.")
+        sys.exit(1)
+
+    regressions = []
+    from_cell = score_results(results, clips, reference_label)
+    print("\n" + "=" * 80)
+    if without_reference and not any(r['label'] == reference_label for r in results):
+        print(f"⚠️ Komórka odniesienia {reference_label} nie należy do macierzy – klipy bez referencji nie są oceniane.")
+    elif from_cell:
+        print(f"--- Jakość (klipy bez referencji: {from_cell}, oceniane względem {reference_label}) ---")
+    else:
+        print("--- Jakość (referencje z manifestu) ---")
+    print(f"   {'komórka':<44} {'WER':>8} {'CER':>8} {'RTF':>8}")
+    for result in results:
+        print(f"   {result['label']:<44} {format_metric(result['wer'])} {format_metric(result['cer'])} {format_metric(result['rtf'])}")
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline)
+        print(f"--- Porównanie z baseline: {args.baseline} ---")
+        for result in results:
+            print(f"   {result['label']:<40} WER {format_metric(result['wer'], result.get('wer_delta'))}  "
+                  f"RTF {format_metric(result['rtf'], result.get('rtf_delta'))}")
+        for regression in regressions:
+            print(f"   ❌ Regresja: {regression}")
+        if not regressions:
+            print("   ✅ Brak regresji.")
+    if len(factors) > 1:
+        print_time_compression(results)
+    # Komórka odniesienia ma z definicji zerowy WER na klipach bez referencji
+    scored = [r for r in results if r['wer'] is not None and r['model'] != 'stub'
+              and not (from_cell and r['label'] == reference_label)]
+    if scored:
+        best = min(scored, key=lambda r: (r['wer'], r['rtf']))
+        print(f"Najniższy WER: {best['label']} (WER {best['wer']:.3f}, CER {best['cer']:.3f}, RTF {best['rtf']:.3f})")
+    print("=" * 80)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Wyniki zapisano w: {args.json}")
+    if args.csv:
+        write_csv(args.csv, results)
+        print(f"Tabelę zapisano w: {args.csv}")
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# FILE: tests/run_callback_jitter_benchmark.py
+# Benchmark opóźnień callbacku audio: transkrypcja w tym samym procesie (wspólny GIL)
+# kontra proces inferencji (src/inference_worker.py, audio przez pamięć współdzieloną).
+# Wątek co CAPTURE_BLOCK_SECONDS wykonuje pracę callbacku (kopia bloku, kolejka sesji)
+# i mierzy swoje spóźnienie; równolegle sesja dyktowania przetwarza te bloki prawdziwym
+# preprocessingiem i atrapą modelu, która spala czas w Pythonie (busy=True, trzyma GIL).
+# Spóźnienie większe niż bufor hosta (--host-buffer-ms) liczone jest jako input_overflow.
+# Użycie: python tests/run_callback_jitter_benchmark.py [--seconds 60] [--rtf 0.3] [--host-buffer-ms 100]
+
+import argparse
+import logging
+import os
+import sys
+import time
+import numpy as np
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.audio_capture import CAPTURE_BLOCK_SECONDS
+from src.audio_preprocessing import SAMPLE_RATE
+from src.inference_worker import InferenceWorker
+from src.output_sink import NullOutputSink
+from src.session_engine import DictationSession
+from src.settings import load_settings
+from src.simulation import StubWhisperModel, StubModelFactory, ReadyModelLoader, synthetic_dictation
+
+
+def run_variant(model_loader, settings, audio, host_buffer):
+    """Podaje audio w rytmie callbacku i zwraca spóźnienia wybudzeń [s]."""
+    session = DictationSession(settings, model_loader, NullOutputSink(), audio_capture=False, mode='benchmark',
+                               record_session=False).start()
+    block = int(CAPTURE_BLOCK_SECONDS * SAMPLE_RATE)
+    lateness = []
+    start = time.perf_counter()
+    for index, position in enumerate(range(0, len(audio), block)):
+        scheduled = start + index * CAPTURE_BLOCK_SECONDS
+        remaining = scheduled - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        lateness.append(time.perf_counter() - scheduled)
+        # Praca prawdziwego callbacku: kopia bloku i włożenie do kolejki sesji
+        session.enqueue(audio[position:position + block].reshape(-1, 1).copy())
+    session.release()
+    session.wait_transcribed()
+    lateness = np.array(lateness)
+    # Każdy przestój dłuższy niż bufor hosta = jedno zgłoszenie input_overflow (utracone próbki)
+    late = lateness > host_buffer
+    return {
+        'p50': np.percentile(lateness, 50) * 1000,
+        'p99': np.percentile(lateness, 99) * 1000,
+        'max': lateness.max() * 1000,
+        'overflows': int(np.sum(late[1:] & ~late[:-1]) + late[0]),
+        'chunks': len(session.metrics.chunks),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jitter callbacku audio: inferencja w procesie vs w osobnym procesie.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Długość syntetycznego dyktowania.")
+    parser.add_argument("--rtf", type=float, default=0.3, help="RTF atrapy modelu (czas spalany w Pythonie).")
+    parser.add_argument("--host-buffer-ms", type=float, default=100.0, help="Bufor hosta audio; większe spóźnienie = overflow.")
+    args = parser.parse_args()
+
+    for name in ('app', 'transcription', 'performance', 'preprocessing'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    settings = load_settings().replace(model_warmup=False, vad_min_chunk_seconds=3.0, vad_max_buffer_seconds=10.0)
+    audio = synthetic_dictation(args.seconds, seed=0)
+    host_buffer = args.host_buffer_ms / 1000
+
+    print(f"\n--- Jitter callbacku: {args.seconds:.0f}s audio, bloki {CAPTURE_BLOCK_SECONDS * 1000:.0f} ms, "
+          f"atrapa modelu RTF {args.rtf} (busy), bufor hosta {args.host_buffer_ms:.0f} ms ---")
+    results = {}
+    results['w procesie'] = run_variant(ReadyModelLoader(StubWhisperModel(rtf=args.rtf, busy=True)), settings, audio, host_buffer)
+
+    worker = InferenceWorker(settings, model_factory=StubModelFactory(rtf=args.rtf, busy=True)).start()
+    worker.wait()
+    try:
+        results['proces inferencji'] = run_variant(worker, settings, audio, host_buffer)
+    finally:
+        worker.close()
+
+    print(f"   {'wariant':<20} {'p50':>8} {'p99':>8} {'maks.':>8} {'overflow':>9} {'fragm.':>7}")
+    for name, r in results.items():
+        print(f"   {name:<20} {r['p50']:6.2f}ms {r['p99']:6.2f}ms {r['max']:6.1f}ms {r['overflows']:>9} {r['chunks']:>7}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# FILE: tests/run_cascade_benchmark.py
+# Benchmark kaskady modeli (src/draft_preview.py): czy model szkicu opóźnia tekst końcowy
+# i jak szybko pojawia się podgląd. Każde nagranie jest odtwarzane w czasie rzeczywistym przez
+# DictationSession dwa razy: bez szkicu i ze szkicem. Mierzone są latencja modelu głównego
+# (od wycięcia fragmentu do jego tekstu), latencja szkicu i latencja użytkownika.
+#
+# Tryb atrap (domyślny): syntetyczne dyktowanie, atrapy modeli o zadanym RTF. Atrapy liczą
+# w pętli Pythona z GIL-em (busy), więc to pesymistyczny przypadek rywalizacji o CPU
+# (CTranslate2 zwalnia GIL). WER szkicu w tym trybie nie ma znaczenia (teksty atrap to skróty audio).
+# Tryb modeli (--model/--draft-model): klipy z manifestu (jak run_benchmark_matrix.py);
+# WER szkicu liczony względem tekstu modelu głównego i, jeśli jest, referencji.
+#
+# Użycie:
+#   python tests/run_cascade_benchmark.py [--seconds 60] [--runs 3] [--rtf 0.4] [--draft-rtf 0.03]
+#   python tests/run_cascade_benchmark.py --model medium --draft-model tiny [--manifest tests/benchmark_clips.json]
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.audio_io import load_audio
+from src.core_utils import create_model
+from src.draft_preview import DraftTranscriber
+from src.session_metrics import summarize
+from src.settings import CONFIG_PATH, load_settings
+from src.simulation import StubModelFactory, StubWhisperModel, recording_from_audio, replay_recording, synthetic_dictation
+from src.text_metrics import word_error_rate
+
+DEFAULT_MANIFEST = os.path.join(PARENT_DIR, 'benchmark_clips.json')
+TIME_SCALE = 4.0            # Przyspieszenie odtwarzania w trybie atrap (atrapy liczą w tej samej skali)
+
+
+def run_pair(recording, settings, make_model, make_draft, time_scale):
+    """Odtworzenie bez szkicu i ze szkicem; zwraca (wynik bez szkicu, wynik ze szkicem)."""
+    baseline = replay_recording(recording, settings, make_model(), time_scale=time_scale)
+    draft = make_draft().start()
+    draft.ready.wait()
+    try:
+        cascade = replay_recording(recording, settings, make_model(), time_scale=time_scale, draft=draft)
+    finally:
+        draft.close()
+    return baseline, cascade
+
+
+def final_latencies(result):
+    # Bez szkicu latencja od wycięcia nie jest zapisywana – tu wystarcza czas transkrypcji + preprocessingu
+    return [c.get('final_latency', c['transcription_time'] + c['preprocessing_time']) for c in result['chunks'] if c['text'] is not None]
+
+
+def print_summary(pairs):
+    rows = [
+        ("modelu głównego – bez szkicu", [v for baseline, _ in pairs for v in final_latencies(baseline)]),
+        ("modelu głównego – ze szkicem", [v for _, cascade in pairs for v in final_latencies(cascade)]),
+        ("szkicu (podgląd)", [c['draft_latency'] for _, cascade in pairs for c in cascade['chunks'] if 'draft_latency' in c]),
+        ("użytkownika – bez szkicu", [baseline['user_latency'] for baseline, _ in pairs]),
+        ("użytkownika – ze szkicem", [cascade['user_latency'] for _, cascade in pairs]),
+    ]
+    print(f"   {'latencja':<30} {'n':>4} {'p50':>8} {'p95':>8} {'maks.':>8}")
+    for name, values in rows:
+        stats = summarize(values)
+        if not stats['count']:
+            continue
+        print(f"   {name:<30} {stats['count']:>4} {stats['p50']:7.2f}s {stats['p95']:7.2f}s {max(values):7.2f}s")
+    submitted = sum(len(final_latencies(cascade)) for _, cascade in pairs)
+    covered = sum(cascade['draft']['draft_chunks'] for _, cascade in pairs)
+    print(f"   Fragmenty z podglądem: {covered}/{submitted} (pozostałe pominięte lub spóźnione po finalizacji)")
+
+
+def run_stub(args, settings):
+    make_model = lambda: StubWhisperModel(rtf=args.rtf, jitter=0.1, time_scale=TIME_SCALE, busy=True)
+    make_draft = lambda: DraftTranscriber(settings, StubModelFactory(rtf=args.draft_rtf, jitter=0.1, time_scale=TIME_SCALE, busy=True))
+    print(f"\n--- Kaskada (atrapy): {args.runs} x {args.seconds:.0f}s, RTF główny {args.rtf}, RTF szkicu {args.draft_rtf}, x{TIME_SCALE:.0f} ---")
+    pairs = []
+    for seed in range(args.runs):
+        recording = recording_from_audio(synthetic_dictation(args.seconds, seed=seed), settings)
+        pairs.append(run_pair(recording, settings, make_model, make_draft, TIME_SCALE))
+    print_summary(pairs)
+
+
+def run_models(args, settings):
+    with open(args.manifest, encoding='utf-8') as f:
+        entries = json.load(f)
+    base = os.path.dirname(os.path.abspath(args.manifest))
+    main_settings = settings.replace(model_path=args.model)
+    draft_settings = settings.replace(draft_model_path=args.draft_model)
+    print(f"\n--- Kaskada: model główny '{args.model}', szkic '{args.draft_model}' ({draft_settings.draft_device}, {draft_settings.draft_compute_type}) ---")
+    model = create_model(main_settings)
+    pairs, draft_wers, reference_wers = [], [], []
+    for entry in entries:
+        audio = load_audio(os.path.join(base, entry['audio']))
+        clip_settings = main_settings.replace(language=entry.get('language', main_settings.language))
+        recording = recording_from_audio(audio, clip_settings)
+        baseline, cascade = run_pair(recording, clip_settings, lambda: model, lambda: DraftTranscriber(draft_settings), 1.0)
+        pairs.append((baseline, cascade))
+        draft_wers.extend(c['draft_wer'] for c in cascade['chunks'] if 'draft_wer' in c)
+        if entry.get('reference'):
+            reference_wers.append((word_error_rate(entry['reference'], cascade['final_text']), entry['audio']))
+        print(f"   {entry['audio']}: {cascade['final_text'][:70]!r}")
+    print_summary(pairs)
+    if draft_wers:
+        print(f"   WER szkicu względem tekstu końcowego (średnia fragmentów): {sum(draft_wers) / len(draft_wers):.1%}")
+    for wer, name in reference_wers:
+        print(f"   WER tekstu końcowego względem referencji ({name}): {wer:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencja kaskady model szkicu / model główny.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Długość syntetycznego dyktowania (tryb atrap).")
+    parser.add_argument("--runs", type=int, default=3, help="Liczba nagrań (tryb atrap).")
+    parser.add_argument("--rtf", type=float, default=0.4, help="RTF atrapy modelu głównego.")
+    parser.add_argument("--draft-rtf", type=float, default=0.03, help="RTF atrapy modelu szkicu.")
+    parser.add_argument("--model", help="Model główny (np. medium); włącza tryb modeli.")
+    parser.add_argument("--draft-model", default="tiny", help="Model szkicu w trybie modeli.")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Manifest klipów (tryb modeli).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    settings = load_settings(CONFIG_PATH)
+    if args.model:
+        run_models(args, settings)
+    else:
+        run_stub(args, settings.replace(session_recording_dir=''))
+
+
+if __name__ == "__main__":
+    main()
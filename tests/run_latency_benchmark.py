@@ -0,0 +1,150 @@
+# FILE: tests/run_latency_benchmark.py
+# Benchmark latencji end-to-end (od puszczenia skrótu do gotowego tekstu) dla różnych
+# parametrów cięcia (vad_*). Prawdziwa sesja z src/session_engine.py przetwarza korpus
+# dyktowań (syntetycznych lub nagranych przez SessionRecorder), a model i preprocessing
+# są symulowane profilami sprzętu (RTF + rozrzut), więc wynik nie wymaga GPU ani modelu.
+#
+# Użycie:
+#   python tests/run_latency_benchmark.py
+#   python tests/run_latency_benchmark.py --profiles cpu --max-buffer 10,20,30 --min-chunk 3,7 --silence 0.4,0.8,1.5
+#   python tests/run_latency_benchmark.py --recordings logs/recordings --json wyniki.json
+
+import argparse
+import glob
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src import session_engine as pipeline
+from src.audio_preprocessing import SAMPLE_RATE
+from src.session_metrics import summarize
+from src.session_recorder import load_recording
+from src.settings import load_settings
+from src.simulation import StubWhisperModel, synthetic_dictation, recording_from_audio, replay_recording
+
+# Profile sprzętu: RTF dekodowania (model 'medium'), względny rozrzut i RTF preprocessingu.
+# Preprocessing (noisereduce + de-esser) ma na tym samym CPU RTF ~0.04.
+HARDWARE_PROFILES = {
+    'cpu':  {'rtf': 0.90, 'jitter': 0.25, 'preprocessing_rtf': 0.06},
+    'mid':  {'rtf': 0.15, 'jitter': 0.15, 'preprocessing_rtf': 0.04},
+    'high': {'rtf': 0.06, 'jitter': 0.10, 'preprocessing_rtf': 0.03},
+}
+
+
+class SimulatedPreprocessing:
+    """Zastępuje potok preprocessingu opóźnieniem `długość * rtf` (w skali czasu benchmarku)."""
+
+    def __init__(self, rtf, time_scale):
+        self.rtf = rtf
+        self.time_scale = time_scale
+
+    def __call__(self, audio):
+        time.sleep(len(audio) / SAMPLE_RATE * self.rtf / self.time_scale)
+        return audio
+
+
+def parse_floats(text):
+    return [float(v) for v in text.split(',') if v.strip()]
+
+
+def build_corpus(args, settings):
+    if args.recordings:
+        # Nagrania .npz (session_recording_dir) i wpisy archiwum .json (session_archive_dir)
+        paths = sorted(glob.glob(os.path.join(args.recordings, '*.npz')) + glob.glob(os.path.join(args.recordings, '*.json')))
+        if not paths:
+            print(f"❌ Brak nagrań .npz ani wpisów archiwum .json w {args.recordings}")
+            sys.exit(1)
+        return [(os.path.basename(p), load_recording(p)) for p in paths]
+    return [
+        (f"synth_{seconds:.0f}s", recording_from_audio(synthetic_dictation(seconds, seed=i), settings))
+        for i, seconds in enumerate(parse_floats(args.durations))
+    ]
+
+
+def run_config(corpus, settings, profile, args):
+    latencies, forced_cuts, chunks, compute_time = [], 0, 0, 0.0
+    for index, (name, recording) in enumerate(corpus):
+        model = StubWhisperModel(rtf=profile['rtf'], jitter=profile['jitter'], seed=index, time_scale=args.time_scale)
+        result = replay_recording(recording, settings, model, realtime=True, time_scale=args.time_scale)
+        latencies.append(result['user_latency'])
+        forced_cuts += result['forced_cuts']
+        chunks += len(result['chunks'])
+        compute_time += result['compute_time']
+    return {'latency': summarize(latencies), 'max_latency': max(latencies), 'forced_cuts': forced_cuts,
+            'chunks': chunks, 'compute_time': compute_time}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Porównuje parametry cięcia pod kątem latencji użytkownika.")
+    parser.add_argument("--profiles", default=",".join(HARDWARE_PROFILES), help="Profile sprzętu (cpu,mid,high).")
+    parser.add_argument("--max-buffer", default="10,20", help="Wartości vad_max_buffer_seconds.")
+    parser.add_argument("--min-chunk", default="3,7", help="Wartości vad_min_chunk_seconds.")
+    parser.add_argument("--silence", default="0.4,1.0", help="Wartości vad_silence_threshold_seconds.")
+    parser.add_argument("--durations", default="10,20,30", help="Długości syntetycznych dyktowań [s].")
+    parser.add_argument("--recordings", help="Katalog z nagraniami .npz lub archiwum sesji (.json) zamiast korpusu syntetycznego.")
+    parser.add_argument("--time-scale", type=float, default=4.0, help="Przyspieszenie symulacji (1 = czas rzeczywisty).")
+    parser.add_argument("--json", help="Zapisz pełne wyniki do pliku JSON.")
+    args = parser.parse_args()
+
+    for name in ('app', 'transcription', 'performance', 'preprocessing'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    base_settings = load_settings()
+    corpus = build_corpus(args, base_settings)
+    corpus_seconds = sum(r.duration for _, r in corpus)
+
+    configs = [('config.ini', base_settings)]
+    for max_buffer, min_chunk, silence in itertools.product(parse_floats(args.max_buffer), parse_floats(args.min_chunk), parse_floats(args.silence)):
+        if min_chunk > max_buffer:
+            continue
+        label = f"max={max_buffer:g} min={min_chunk:g} sil={silence:g}"
+        configs.append((label, base_settings.replace(
+            vad_max_buffer_seconds=max_buffer, vad_min_chunk_seconds=min_chunk, vad_silence_threshold_seconds=silence)))
+
+    profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+    runs = len(configs) * len(profiles)
+    print(f"\n--- Benchmark latencji: {len(corpus)} dyktowań ({corpus_seconds:.0f}s), {len(configs)} konfiguracji, profile: {', '.join(profiles)} ---")
+    print(f"Szacowany czas: ~{runs * corpus_seconds / args.time_scale / 60:.0f} min (skala czasu x{args.time_scale:g})")
+
+    original_preprocessing = pipeline.apply_preprocessing_pipeline
+    results = []
+    try:
+        for profile_name in profiles:
+            profile = HARDWARE_PROFILES[profile_name]
+            pipeline.apply_preprocessing_pipeline = SimulatedPreprocessing(profile['preprocessing_rtf'], args.time_scale)
+            print(f"\n[{profile_name}] RTF {profile['rtf']} ± {profile['jitter'] * 100:.0f}%, preprocessing RTF {profile['preprocessing_rtf']}")
+            print(f"   {'konfiguracja':<28} {'p50':>7} {'p95':>7} {'maks.':>7} {'cięcia wym.':>12} {'fragm.':>7} {'obliczenia':>11}")
+            for label, settings in configs:
+                summary = run_config(corpus, settings, profile, args)
+                latency = summary['latency']
+                print(f"   {label:<28} {latency['p50']:6.2f}s {latency['p95']:6.2f}s {summary['max_latency']:6.2f}s "
+                      f"{summary['forced_cuts']:>12} {summary['chunks']:>7} {summary['compute_time']:10.1f}s")
+                results.append({'profile': profile_name, 'config': label,
+                                'vad_max_buffer_seconds': settings.vad_max_buffer_seconds,
+                                'vad_min_chunk_seconds': settings.vad_min_chunk_seconds,
+                                'vad_silence_threshold_seconds': settings.vad_silence_threshold_seconds,
+                                **summary})
+    finally:
+        pipeline.apply_preprocessing_pipeline = original_preprocessing
+
+    print("\n" + "=" * 60)
+    for profile_name in profiles:
+        best = min((r for r in results if r['profile'] == profile_name), key=lambda r: r['latency']['p95'])
+        print(f"[{profile_name}] najniższe p95: {best['config']} ({best['latency']['p95']:.2f}s, wymuszone cięcia: {best['forced_cuts']})")
+    print("=" * 60)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Wyniki zapisano w: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# FILE: tests/run_logging_benchmark.py
+# Benchmark kosztu logowania na fragment w wątku transkrybującym (src/logger_setup.py).
+# Każdy „fragment” to ten sam zestaw wywołań loggerów, co w DictationSession.process_chunk
+# i apply_preprocessing_pipeline (4 x INFO, 6 x DEBUG). Porównanie:
+#   - dawna konfiguracja: StreamHandler zapisujący synchronicznie, komunikaty jako f-stringi,
+#   - obecna: QueueHandler + QueueListener w tle, formatowanie leniwe (%-args),
+# dla szybkiego wyjścia (/dev/null) i wolnego (każdy zapis trwa --sink-delay-ms, jak zablokowany
+# terminal lub potok), z DEBUG wyłączonym (domyślnie) i włączonym.
+# Użycie: python tests/run_logging_benchmark.py [--chunks 500] [--sink-delay-ms 2]
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.logger_setup import LOG_FORMAT, create_file_handler, create_queue_logging
+from src.session_metrics import summarize
+
+CHUNK_TEXT = "To jest przykładowy tekst fragmentu dyktowania, mniej więcej tej długości co zwykle."
+
+
+class SlowStream:
+    """Strumień, którego każdy zapis trwa `delay` sekund (wolny terminal, zapchany potok)."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def chunk_logs_fstring(logger, i):
+    logger.info(f"🧠 Przetwarzanie fragmentu: {5.0 + i % 7:.2f}s (Powód: {'SILENCE_DETECTED'})")
+    logger.info("🔊 Uruchamianie potoku przetwarzania wstępnego audio...")
+    for step in range(4):
+        logger.debug(f"     (czas: {0.01 * step:.2f}s)")
+    logger.info(f"🔊 Przetwarzanie wstępne zakończone pomyślnie (całkowity czas: {0.12:.2f}s).")
+    logger.debug(f"   -> Skrócono ciszę o {0.4:.2f}s (do transkrypcji: {5.0 + i % 7:.2f}s)")
+    logger.info(f"   -> Transkrybowany fragment: '{CHUNK_TEXT}'")
+    logger.debug(f"   -> RTF fragmentu: {0.213:.3f} (Czas transkrypcji: {1.07:.2f}s, prompt: {24} tokenów)")
+
+
+def chunk_logs_lazy(logger, i):
+    logger.info("🧠 Przetwarzanie fragmentu: %.2fs (Powód: %s)", 5.0 + i % 7, 'SILENCE_DETECTED')
+    logger.info("🔊 Uruchamianie potoku przetwarzania wstępnego audio...")
+    for step in range(4):
+        logger.debug("     (czas: %.2fs)", 0.01 * step)
+    logger.info("🔊 Przetwarzanie wstępne zakończone pomyślnie (całkowity czas: %.2fs).", 0.12)
+    logger.debug("   -> Skrócono ciszę o %.2fs (do transkrypcji: %.2fs)", 0.4, 5.0 + i % 7)
+    logger.info("   -> Transkrybowany fragment: '%s'", CHUNK_TEXT)
+    logger.debug("   -> RTF fragmentu: %.3f (Czas transkrypcji: %.2fs, prompt: %d tokenów)", 0.213, 1.07, 24)
+
+
+def measure(name, handlers, use_queue, emit, chunks, level):
+    """Czas [µs] wywołań loggerów jednego fragmentu w wątku wywołującym (p50, p99) + czas opróżnienia kolejki."""
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(level)
+    listener = None
+    if use_queue:
+        queue_handler, listener = create_queue_logging(handlers)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+    durations = []
+    for i in range(chunks):
+        start = time.perf_counter()
+        emit(logger, i)
+        durations.append((time.perf_counter() - start) * 1e6)
+    drain_start = time.perf_counter()
+    if listener is not None:
+        listener.stop()
+    drain = time.perf_counter() - drain_start
+    for handler in handlers:
+        handler.close()
+    return summarize(durations), drain
+
+
+def stream_handler(stream):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Koszt logowania na fragment: synchroniczny StreamHandler vs kolejka.")
+    parser.add_argument("--chunks", type=int, default=500, help="Liczba symulowanych fragmentów na pomiar.")
+    parser.add_argument("--sink-delay-ms", type=float, default=2.0, help="Czas jednego zapisu wolnego wyjścia [ms].")
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    slow = SlowStream(args.sink_delay_ms / 1000)
+    tmp_dir = tempfile.mkdtemp(prefix="logging_bench_")
+    chunks_slow = max(20, args.chunks // 10)    # Wolne wyjście: mniej fragmentów (każdy trwa dziesiątki ms)
+
+    cases = [
+        ("dawna, /dev/null", lambda: [stream_handler(devnull)], False, chunk_logs_fstring, args.chunks),
+        ("obecna, /dev/null", lambda: [stream_handler(devnull)], True, chunk_logs_lazy, args.chunks),
+        ("obecna, /dev/null + plik", lambda: [stream_handler(devnull), create_file_handler(os.path.join(tmp_dir, "app.log"), 1, 2)],
+         True, chunk_logs_lazy, args.chunks),
+        (f"dawna, wolne ({args.sink_delay_ms:g} ms)", lambda: [stream_handler(slow)], False, chunk_logs_fstring, chunks_slow),
+        (f"obecna, wolne ({args.sink_delay_ms:g} ms)", lambda: [stream_handler(slow)], True, chunk_logs_lazy, chunks_slow),
+    ]
+    for level in (logging.INFO, logging.DEBUG):
+        print(f"\n--- Koszt logowania na fragment (poziom {logging.getLevelName(level)}, 4 x INFO + 6 x DEBUG) ---")
+        print(f"   {'konfiguracja':<32} {'n':>5} {'p50':>10} {'p99':>10} {'opróżnienie kolejki':>20}")
+        for index, (name, make_handlers, use_queue, emit, chunks) in enumerate(cases):
+            stats, drain = measure(f"{level}.{index}", make_handlers(), use_queue, emit, chunks, level)
+            print(f"   {name:<32} {stats['count']:>5} {stats['p50']:8.1f}µs {stats['p99']:8.1f}µs "
+                  f"{(f'{drain * 1000:.1f} ms' if use_queue else '-'):>20}")
+    devnull.close()
+
+
+if __name__ == "__main__":
+    main()
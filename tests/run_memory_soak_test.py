@@ -0,0 +1,96 @@
+# FILE: tests/run_memory_soak_test.py
+# Test obciążeniowy pamięci: godzinna syntetyczna sesja strumieniowa w trybie budżetu
+# pamięci (memory_budget_mb). Audio jest generowane w locie i podawane do prawdziwego
+# sesji dyktowania z src/session_engine.py (prawdziwy preprocessing, atrapa modelu), a tekst trafia
+# do sinka odrzucającego. Co minutę nagrania zapisywany jest RSS procesu – przy działającym
+# budżecie pamięć po rozgrzewce pozostaje płaska.
+# Użycie: python tests/run_memory_soak_test.py [--minutes 60] [--budget-mb 16] [--rtf 0.01]
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.audio_capture import CAPTURE_BLOCK_SECONDS
+from src.audio_preprocessing import SAMPLE_RATE
+from src.audio_queue import BoundedAudioQueue
+from src.metrics_server import process_rss_bytes
+from src.output_sink import NullOutputSink
+from src.session_engine import DictationSession
+from src.settings import load_settings
+from src.simulation import StubWhisperModel, ReadyModelLoader, synthetic_dictation
+
+GROWTH_TOLERANCE = 0.10     # Dopuszczalny wzrost RSS między końcem rozgrzewki a końcem testu
+WARMUP_MINUTES = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Godzinna sesja syntetyczna z pomiarem RSS.")
+    parser.add_argument("--minutes", type=int, default=60,
+                        help=f"Długość sesji w minutach nagrania (więcej niż {WARMUP_MINUTES} min rozgrzewki).")
+    parser.add_argument("--budget-mb", type=float, default=16.0, help="memory_budget_mb dla sesji.")
+    parser.add_argument("--rtf", type=float, default=0.01, help="RTF atrapy modelu.")
+    args = parser.parse_args()
+    if args.minutes <= WARMUP_MINUTES:
+        # Punkt odniesienia to RSS po rozgrzewce – bez dalszych minut nie ma czego porównać
+        parser.error(f"--minutes musi być większe niż rozgrzewka ({WARMUP_MINUTES} min)")
+
+    for name in ('app', 'transcription', 'performance', 'preprocessing'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    settings = load_settings().replace(memory_budget_mb=args.budget_mb)
+    sink = NullOutputSink()
+    audio_queue = BoundedAudioQueue.from_settings(settings)
+    session = DictationSession(settings, ReadyModelLoader(StubWhisperModel(rtf=args.rtf)), sink, audio_capture=False,
+                               mode='soak', audio_queue=audio_queue, record_session=False)
+    metrics = session.metrics
+
+    peak = [process_rss_bytes()]
+    sampling = threading.Event()
+    def sample_peak():
+        while not sampling.wait(0.2):
+            peak[0] = max(peak[0], process_rss_bytes())
+    threading.Thread(target=sample_peak, daemon=True).start()
+
+    print(f"\n--- Test pamięci: {args.minutes} min nagrania, budżet {args.budget_mb:g} MB, RTF atrapy {args.rtf} ---")
+    print(f"   {'minuta':>6} {'RSS':>10} {'szczyt':>10} {'kolejka':>9} {'tekst (pamięć)':>15} {'wysłano':>10} {'czas':>7}")
+    block = int(CAPTURE_BLOCK_SECONDS * SAMPLE_RATE)
+    # Producent nie wyprzedza konsumenta o więcej niż połowę limitu kolejki (bez odrzucania audio)
+    max_ahead = audio_queue.max_samples / SAMPLE_RATE / 2
+    samples = []
+    start = time.perf_counter()
+    session.start()
+    for minute in range(1, args.minutes + 1):
+        audio = synthetic_dictation(60, seed=minute)
+        for i in range(0, len(audio), block):
+            while audio_queue.depth_seconds() > max_ahead:
+                time.sleep(0.01)
+            session.enqueue(audio[i:i + block].reshape(-1, 1))
+        del audio
+        rss = process_rss_bytes()
+        samples.append(rss)
+        print(f"   {minute:>6} {rss / 2**20:8.1f}MB {peak[0] / 2**20:8.1f}MB {audio_queue.depth_seconds():8.1f}s "
+              f"{len(session.transcript):>13} zn {sink.characters:>8} zn {time.perf_counter() - start:6.0f}s")
+    session.release()
+    session.wait_transcribed()
+    sampling.set()
+
+    reference = samples[WARMUP_MINUTES - 1]
+    growth = (samples[-1] - reference) / reference
+    print("\n" + "=" * 60)
+    print(f"RSS po rozgrzewce ({WARMUP_MINUTES} min): {reference / 2**20:.1f} MB, na końcu: {samples[-1] / 2**20:.1f} MB ({growth * 100:+.1f}%)")
+    print(f"Szczytowy RSS: {peak[0] / 2**20:.1f} MB, fragmentów: {len(metrics.chunks)}, wysłany tekst: {sink.characters} znaków, "
+          f"utracone audio: {audio_queue.dropped_seconds:.1f}s")
+    print("✅ Pamięć płaska." if growth <= GROWTH_TOLERANCE else f"❌ RSS wzrósł o więcej niż {GROWTH_TOLERANCE * 100:.0f}%.")
+    print("=" * 60)
+    sys.exit(0 if growth <= GROWTH_TOLERANCE else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# FILE: tests/run_postprocessing_benchmark.py
+# Benchmark post-processingu (src/postprocessing.py): czas kompilacji automatu i czas
+# przetworzenia tekstu jednego fragmentu przy tysiącach reguł. Reguły to komendy z
+# postprocessing.ini oraz losowe „terminy” (frazy 1-3 słów); tekst fragmentu ma długość
+# typowego 20-sekundowego fragmentu dyktowania i zawiera trafienia reguł.
+# Przed pomiarem sprawdzane są przypadki z CHECK_CASES (komendy z postprocessing.ini, interpunkcja modelu).
+# Cel: poniżej 1 ms na fragment (p99). Kod wyjścia 1, jeśli cel nie jest spełniony lub przypadek zwraca zły tekst.
+# Użycie: python tests/run_postprocessing_benchmark.py [--rules 1000,5000,20000] [--chunks 500]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.postprocessing import PostProcessor, load_rules, render_text
+from src.session_metrics import summarize
+
+TARGET_SECONDS = 0.001
+CHUNK_WORDS = 45            # ~20 s mowy
+# Tekst modelu -> oczekiwany tekst po regułach z postprocessing.ini
+CHECK_CASES = (
+    ("To jest test, kropka", "To jest test."),      # Interpunkcja modelu przed komendą
+    ("Tak, przecinek nie", "Tak, nie"),
+    ("Test. Kropka.", "Test."),                     # ... i przed, i po komendzie
+    ("Zdanie kropka. Dalej", "Zdanie. Dalej"),
+    ("kropka kropka kropka", "..."),                # Interpunkcja z komend zostaje
+    ("pierwsza linia nowa linia. druga", "pierwsza linia\ndruga"),
+)
+SYLLABLES = ('ka', 'to', 'mi', 'le', 'pra', 'wo', 'sz', 'cze', 'ni', 'dą', 'gór', 'ły', 'ste', 'ró', 'bu', 'ja')
+
+
+def random_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def check_cases():
+    """Sprawdza CHECK_CASES; zwraca True, gdy wszystkie dają oczekiwany tekst."""
+    postprocessor = PostProcessor(load_rules(os.path.join(ROOT_DIR, 'postprocessing.ini')))
+    passed = True
+    for text, expected in CHECK_CASES:
+        result = render_text(postprocessor.process(text))
+        if result != expected:
+            print(f"   ❌ {text!r} -> {result!r} (oczekiwano {expected!r})")
+            passed = False
+    print(f"   Przypadki reguł: {'✅ wszystkie poprawne' if passed else '❌ błędy powyżej'} ({len(CHECK_CASES)})")
+    return passed
+
+
+def build_rules(count, rng):
+    rules = load_rules(os.path.join(ROOT_DIR, 'postprocessing.ini'))
+    while len(rules) < count:
+        phrase = " ".join(random_word(rng) for _ in range(rng.randint(1, 3)))
+        rules[phrase] = phrase.title().replace(" ", "")
+    return rules
+
+
+def build_chunks(rules, count, rng):
+    phrases = list(rules)
+    chunks = []
+    for _ in range(count):
+        words = [random_word(rng) for _ in range(CHUNK_WORDS)]
+        for _ in range(5):  # Kilka trafień reguł na fragment
+            words.insert(rng.randrange(len(words)), rng.choice(phrases))
+        chunks.append(" ".join(words).capitalize() + ".")
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Czas post-processingu fragmentu przy tysiącach reguł.")
+    parser.add_argument("--rules", default="1000,5000,20000", help="Liczby reguł (po przecinku).")
+    parser.add_argument("--chunks", type=int, default=500, help="Liczba fragmentów na pomiar.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"\n--- Post-processing: {args.chunks} fragmentów po ~{CHUNK_WORDS} słów, cel p99 < {TARGET_SECONDS * 1000:.0f} ms ---")
+    cases_passed = check_cases()
+    print(f"   {'reguły':>7} {'kompilacja':>11} {'znaki':>6} {'średnia':>9} {'p99':>9} {'maks.':>9}")
+    passed = True
+    for count in (int(v) for v in args.rules.split(',') if v.strip()):
+        rules = build_rules(count, rng)
+        start = time.perf_counter()
+        postprocessor = PostProcessor(rules)
+        build_time = time.perf_counter() - start
+        chunks = build_chunks(rules, args.chunks, rng)
+        timings = []
+        for text in chunks:
+            start = time.perf_counter()
+            postprocessor.process(text)
+            timings.append(time.perf_counter() - start)
+        stats = summarize(timings)
+        passed = passed and stats['p99'] < TARGET_SECONDS
+        print(f"   {len(rules):>7} {build_time * 1000:9.0f}ms {sum(map(len, chunks)) // len(chunks):>6} "
+              f"{stats['mean'] * 1000:7.3f}ms {stats['p99'] * 1000:7.3f}ms {max(timings) * 1000:7.3f}ms")
+    print("=" * 60)
+    print("✅ Poniżej 1 ms na fragment." if passed else "❌ Przekroczono 1 ms na fragment (p99).")
+    sys.exit(0 if passed and cases_passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# FILE: tests/run_profiling_overhead_benchmark.py
+# Benchmark narzutu profilera sesji (src/session_profiler.py): bez profilera,
+# z profilerem wyłączonym oraz włączonym (cProfile + tracemalloc).
+# Obciążeniem jest rzeczywisty potok preprocessingu na syntetycznym audio
+# oraz krok numpy imitujący dekodowanie – wynik nie zależy od modelu ani GPU.
+# Użycie: python tests/run_profiling_overhead_benchmark.py [--seconds 10] [--repeats 5]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.audio_preprocessing import apply_preprocessing_pipeline, SAMPLE_RATE
+from src.session_profiler import SessionProfiler
+from src.settings import Settings
+
+
+def synthetic_speech(seconds, seed=0):
+    """Szum modulowany obwiednią sylab (~4 Hz) – przybliżenie mowy dla potoku audio."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    return (0.2 * envelope * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def workload(audio):
+    processed = apply_preprocessing_pipeline(audio)
+    # Imitacja dekodowania: kilka FFT po oknach, jak w ekstrakcji cech log-mel
+    frames = processed[: len(processed) // 400 * 400].reshape(-1, 400)
+    for _ in range(20):
+        np.abs(np.fft.rfft(frames, axis=1))
+
+
+def run(label, audio, repeats, profiler_factory):
+    times = []
+    for i in range(repeats):
+        profiler = profiler_factory(i)
+        start = time.perf_counter()
+        if profiler is None:
+            workload(audio)
+        else:
+            with profiler.step("chunk"):
+                workload(audio)
+        times.append(time.perf_counter() - start)
+    mean = sum(times) / len(times)
+    print(f"   {label:<32} średnio {mean * 1000:8.1f} ms  (min {min(times) * 1000:8.1f} ms)")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mierzy narzut profilowania sesji.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Długość syntetycznego fragmentu audio.")
+    parser.add_argument("--repeats", type=int, default=5, help="Liczba powtórzeń każdego wariantu.")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger('preprocessing').setLevel(logging.WARNING)
+    logging.getLogger('performance').setLevel(logging.WARNING)
+
+    audio = synthetic_speech(args.seconds)
+    workload(audio)  # Rozgrzewka (leniwe importy, cache)
+
+    profile_dir = tempfile.mkdtemp(prefix="profiling_bench_")
+    disabled = Settings(profiling_enabled=False)
+    enabled = Settings(profiling_enabled=True, profiling_dir=profile_dir)
+    cprofile_only = Settings(profiling_enabled=True, profiling_tracemalloc=False, profiling_dir=profile_dir)
+
+    print(f"\n--- Narzut profilera: fragment {args.seconds:.0f}s, {args.repeats} powtórzeń ---")
+    base = run("bez profilera", audio, args.repeats, lambda i: None)
+    off = run("profiler wyłączony", audio, args.repeats, lambda i: SessionProfiler(disabled, f"off{i}"))
+    cprof = run("włączony, tylko cProfile", audio, args.repeats, lambda i: SessionProfiler(cprofile_only, f"cp{i}"))
+    on = run("włączony, cProfile+tracemalloc", audio, args.repeats, lambda i: SessionProfiler(enabled, f"on{i}"))
+
+    profiler = SessionProfiler(enabled, "finish")
+    with profiler.step("chunk"):
+        workload(audio)
+    start = time.perf_counter()
+    profiler.finish(user_latency=float('inf'), max_rtf=None)
+    finish_time = time.perf_counter() - start
+
+    print("\n" + "=" * 60)
+    print(f"Narzut profilera wyłączonego: {100 * (off - base) / base:+.2f}%")
+    print(f"Narzut samego cProfile:       {100 * (cprof - base) / base:+.2f}%")
+    print(f"Narzut cProfile+tracemalloc:  {100 * (on - base) / base:+.2f}%")
+    print(f"Zapis profilu wolnej sesji:   {finish_time * 1000:.1f} ms (po wklejeniu tekstu)")
+    print(f"Profile testowe: {profile_dir}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
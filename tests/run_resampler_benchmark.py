@@ -0,0 +1,92 @@
+# FILE: tests/run_resampler_benchmark.py
+# Benchmark przepróbkowania w aplikacji (src/resampler.py): koszt CPU na sekundę audio
+# przy przechwytywaniu w natywnej częstotliwości urządzenia, w porównaniu z obecną ścieżką
+# (strumień 16 kHz – callback robi tylko kopię bloku, przepróbkowanie w serwerze dźwięku).
+# Bloki mają długość bloku stałego strumienia (50 ms). Dla każdej częstotliwości sprawdzane
+# jest też, że wynik blokowy jest identyczny z przepróbkowaniem całego nagrania naraz
+# oraz ile tłumione są składowe powyżej 8 kHz (aliasing).
+# Użycie: python tests/run_resampler_benchmark.py [--seconds 60] [--rates 44100,48000,96000]
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.audio_capture import CAPTURE_BLOCK_SECONDS
+from src.audio_preprocessing import SAMPLE_RATE
+from src.resampler import StreamingResampler
+from src.simulation import synthetic_dictation
+
+ALIAS_TEST_FREQUENCIES = (9000, 12000, 15000)   # [Hz] Tony, które po przepróbkowaniu do 16 kHz byłyby aliasami
+
+
+def upsample_dictation(seconds, rate):
+    """Syntetyczne dyktowanie w częstotliwości `rate` (interpolacja liniowa + szum w pełnym paśmie)."""
+    audio = synthetic_dictation(seconds, seed=0)
+    positions = np.arange(int(len(audio) * rate / SAMPLE_RATE)) * SAMPLE_RATE / rate
+    native = np.interp(positions, np.arange(len(audio)), audio)
+    return (native + np.random.default_rng(0).normal(0, 0.002, len(native))).astype(np.float32)
+
+
+def cpu_per_audio_second(process, audio, rate):
+    """CPU [ms] na sekundę audio przy podawaniu bloków (N, 1) jak w callbacku."""
+    block = int(rate * CAPTURE_BLOCK_SECONDS)
+    blocks = [audio[i:i + block].reshape(-1, 1) for i in range(0, len(audio), block)]
+    start = time.thread_time()
+    for data in blocks:
+        process(data)
+    return (time.thread_time() - start) * 1000 / (len(audio) / rate)
+
+
+def alias_attenuation_db(rate):
+    """Najsłabsze tłumienie tonów powyżej 8 kHz (w dB, im mniej tym lepiej)."""
+    worst = -np.inf
+    t = np.arange(rate) / rate
+    for frequency in ALIAS_TEST_FREQUENCIES:
+        if frequency >= rate / 2:
+            continue
+        out = StreamingResampler(rate).process(np.sin(2 * np.pi * frequency * t).astype(np.float32))[400:-400]
+        worst = max(worst, 20 * np.log10(np.sqrt(np.mean(out ** 2)) / np.sqrt(0.5) + 1e-12))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Koszt CPU przepróbkowania strumienia do 16 kHz.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Długość audio na pomiar.")
+    parser.add_argument("--rates", default="44100,48000,96000", help="Natywne częstotliwości urządzeń (po przecinku).")
+    args = parser.parse_args()
+
+    print(f"\n--- Przepróbkowanie do {SAMPLE_RATE} Hz: {args.seconds:.0f}s audio, bloki {CAPTURE_BLOCK_SECONDS * 1000:.0f} ms ---")
+    print(f"   {'ścieżka':<28} {'CPU/s audio':>12} {'% rdzenia':>10} {'= całość':>9} {'alias >8k':>10}")
+    audio = synthetic_dictation(args.seconds, seed=0)
+    baseline = cpu_per_audio_second(np.copy, audio, SAMPLE_RATE)
+    print(f"   {'obecna (16 kHz, kopia)':<28} {baseline:9.3f} ms {baseline / 10:9.3f}% {'-':>9} {'-':>10}")
+
+    for rate in (int(v) for v in args.rates.split(',') if v.strip()):
+        native = upsample_dictation(args.seconds, rate)
+        resampler = StreamingResampler(rate)
+        cost = cpu_per_audio_second(resampler.process, native, rate)
+        # Ciągłość stanu: bloki o losowej długości dają to samo co całe nagranie
+        resampler.reset()
+        rng = np.random.default_rng(1)
+        pieces, position = [], 0
+        while position < len(native):
+            size = int(rng.integers(1, 4 * rate * CAPTURE_BLOCK_SECONDS))
+            pieces.append(resampler.process(native[position:position + size]))
+            position += size
+        identical = np.array_equal(np.concatenate(pieces), StreamingResampler(rate).process(native))
+        name = f"{rate} Hz, filtr {resampler.up}/{resampler.down}"
+        print(f"   {name:<28} {cost:9.3f} ms {cost / 10:9.3f}% {'tak' if identical else 'NIE':>9} "
+              f"{alias_attenuation_db(rate):7.1f} dB")
+    print("=" * 60)
+    print("Uwaga: obecna ścieżka nie obejmuje kosztu przepróbkowania w serwerze dźwięku (PipeWire/PulseAudio);")
+    print("porównaj go np. 'top -p $(pidof pipewire)' przy tools/capture_cpu_monitor.py --samplerate 16000.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# FILE: tests/run_scheduler_benchmark.py
+# Benchmark planisty priorytetów (src/model_scheduler.py): czy zadania wsadowe korzystające z modelu
+# demona (transcribe_file.py --daemon) opóźniają dyktowanie. Sesje dyktowania (syntetyczne, odtwarzane
+# w czasie rzeczywistym przez DictationSession) z przerwami między nimi, w trzech wariantach:
+#   - samo dyktowanie (model tylko dla sesji),
+#   - wspólny model bez planisty: --batch-threads wątków transkrybuje bez przerwy fragmenty
+#     po --batch-chunk s, a model wykonuje wywołania po kolei (blokada, kolejność przypadkowa),
+#   - wspólny model z planistą: sesje mają ścisły priorytet, fragmenty wsadowe tylko w przerwach.
+# Atrapa modelu czeka w `sleep` (jak CTranslate2 bez GIL-a), więc różnice wynikają tylko z dostępu
+# do modelu. Raport: latencja użytkownika, czas transkrypcji fragmentu (łącznie z czekaniem na model),
+# oczekiwanie każdej klasy i przepustowość zadań wsadowych.
+# Użycie: python tests/run_scheduler_benchmark.py [--seconds 60] [--runs 2] [--rtf 0.4] [--batch-threads 2]
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+# --- Konfiguracja Ścieżek i Importów ---
+PARENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(PARENT_DIR)
+sys.path.append(ROOT_DIR)
+from src.model_scheduler import BATCH, LIVE, ModelScheduler
+from src.session_metrics import summarize
+from src.settings import CONFIG_PATH, load_settings
+from src.simulation import ReadyModelLoader, StubWhisperModel, recording_from_audio, replay_recording, synthetic_dictation
+
+TIME_SCALE = 4.0            # Przyspieszenie odtwarzania (atrapa liczy w tej samej skali)
+SAMPLE_RATE = 16000
+
+
+class SerializedModel:
+    """Jeden model, jedno wywołanie naraz (jak jedna instancja CTranslate2); bez priorytetów."""
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio, **kwargs):
+        with self._lock:
+            segments, info = self.model.transcribe(audio, **kwargs)
+            return iter(list(segments)), info
+
+
+class BatchLoad:
+    """Wątki transkrybujące bez przerwy fragmenty zadania wsadowego; liczą przetworzone sekundy audio."""
+
+    def __init__(self, model, threads, chunk_seconds):
+        self.model = model
+        self.chunk = synthetic_dictation(chunk_seconds, seed=99)
+        self.processed = 0.0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+
+    def _run(self):
+        while not self._stop.is_set():
+            segments, _ = self.model.transcribe(self.chunk, language='pl')
+            list(segments)
+            with self._lock:
+                self.processed += len(self.chunk) / SAMPLE_RATE
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self.wall = time.perf_counter() - self.started
+        for thread in self._threads:
+            thread.join()
+        return False
+
+
+def run_sessions(recordings, settings, model, gap, scheduler=None):
+    """Kolejne sesje z przerwą `gap` s (czas nagrania) między nimi; zwraca wyniki replay_recording."""
+    results = []
+    for recording in recordings:
+        if scheduler is not None:
+            scheduler.begin_live()
+        try:
+            results.append(replay_recording(recording, settings, model, time_scale=TIME_SCALE))
+        finally:
+            if scheduler is not None:
+                scheduler.end_live()
+        time.sleep(gap / TIME_SCALE)
+    return results
+
+
+def print_row(name, results, batch=None, waits=None):
+    user = summarize([r['user_latency'] for r in results])
+    chunk = summarize([c['transcription_time'] for r in results for c in r['chunks'] if c['text'] is not None])
+    throughput = f"{batch.processed / (batch.wall * TIME_SCALE):7.2f}x" if batch is not None else f"{'-':>8}"
+    print(f"   {name:<28} {user['p50']:7.2f}s {max(r['user_latency'] for r in results):6.2f}s "
+          f"{chunk['p50']:9.2f}s {chunk['p95']:6.2f}s {throughput}")
+    if waits is not None:
+        for priority in (LIVE, BATCH):
+            stats = waits[priority]
+            if stats['count']:
+                print(f"      oczekiwanie na model ({priority:<5}) n={stats['count']:<4} p50 {stats['p50'] * TIME_SCALE:6.2f}s "
+                      f"p95 {stats['p95'] * TIME_SCALE:6.2f}s p99 {stats['p99'] * TIME_SCALE:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencja dyktowania przy zadaniach wsadowych na wspólnym modelu.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Długość sesji dyktowania.")
+    parser.add_argument("--runs", type=int, default=2, help="Liczba sesji w każdym wariancie.")
+    parser.add_argument("--gap", type=float, default=20.0, help="Przerwa między sesjami [s] (zadania wsadowe pracują).")
+    parser.add_argument("--rtf", type=float, default=0.4, help="RTF atrapy modelu.")
+    parser.add_argument("--batch-threads", type=int, default=2, help="Wątki obciążenia wsadowego (klienci --daemon).")
+    parser.add_argument("--batch-chunk", type=float, default=20.0, help="Długość fragmentu zadania wsadowego [s].")
+    args = parser.parse_args()
+
+    logging.getLogger('app').setLevel(logging.WARNING)
+    settings = load_settings(CONFIG_PATH, session_recording_dir='', session_archive_dir='')
+    recordings = [recording_from_audio(synthetic_dictation(args.seconds, seed=seed), settings) for seed in range(args.runs)]
+    make_model = lambda: SerializedModel(StubWhisperModel(rtf=args.rtf, jitter=0.1, time_scale=TIME_SCALE))
+
+    print(f"\n--- Planista modelu: {args.runs} x {args.seconds:.0f}s dyktowania, przerwy {args.gap:.0f}s, RTF {args.rtf}, "
+          f"obciążenie: {args.batch_threads} x fragmenty {args.batch_chunk:.0f}s, x{TIME_SCALE:.0f} ---")
+    print(f"   {'wariant':<28} {'lat. p50':>8} {'maks.':>7} {'fragm. p50':>10} {'p95':>7} {'wsad':>8}")
+    print_row("samo dyktowanie", run_sessions(recordings, settings, make_model(), args.gap))
+
+    model = make_model()
+    with BatchLoad(model, args.batch_threads, args.batch_chunk) as batch:
+        results = run_sessions(recordings, settings, model, args.gap)
+    print_row("wspólny model, bez planisty", results, batch)
+
+    scheduler = ModelScheduler(ReadyModelLoader(make_model()))
+    with BatchLoad(scheduler.model(BATCH), args.batch_threads, args.batch_chunk) as batch:
+        results = run_sessions(recordings, settings, scheduler.model(LIVE), args.gap, scheduler)
+    print_row("planista priorytetów", results, batch, scheduler.stats())
+    print("   (wsad = sekundy audio zadań wsadowych na sekundę czasu rzeczywistego; fragm. = czas transkrypcji"
+          " fragmentu dyktowania łącznie z czekaniem na model)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# FILE: tools/capture_cpu_monitor.py
+# Narzędzie do pomiaru kosztu CPU stale otwartego strumienia audio (capture_mode = persistent).
+# Z --synthetic zamiast urządzenia wątek podaje bloki szumu w tempie rzeczywistym przez tę samą ścieżkę
+# (przepróbkowanie + callback + zapis do pre-rollu) – pomiar bez mikrofonu i serwera dźwięku.
+# Użycie: python tools/capture_cpu_monitor.py [--seconds 30] [--preroll 0.3] [--samplerate 0] [--synthetic]
+
+import argparse
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# Dodaj katalog główny do ścieżki, aby umożliwić import
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from src.audio_capture import PersistentAudioCapture, CAPTURE_BLOCK_SECONDS
+from src.resampler import StreamingResampler
+
+SYNTHETIC_NATIVE_RATE = 48000   # Natywna częstotliwość strumienia syntetycznego przy --samplerate 0
+
+
+class SyntheticInputStream:
+    """Zamiast `sd.InputStream`: wątek podaje bloki szumu co `block_seconds` (jak wątek PortAudio)."""
+
+    def __init__(self, callback, samplerate, block_seconds):
+        frames = int(samplerate * block_seconds)
+        self.block = (0.01 * np.random.default_rng(0).standard_normal((frames, 1))).astype(np.float32)
+        self.block_seconds = block_seconds
+        self.callback = callback
+        self.path_cpu_time = 0.0    # CPU całej ścieżki bloku: przepróbkowanie + callback z pre-rollem
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="synthetic-stream", daemon=True)
+
+    def _run(self):
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            next_at += self.block_seconds
+            cpu_start = time.thread_time()
+            self.callback(self.block)
+            self.path_cpu_time += time.thread_time() - cpu_start
+            self._stop.wait(max(0.0, next_at - time.perf_counter()))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def close(self):
+        pass
+
+
+def open_synthetic_stream(callback, requested_rate=0, block_seconds=CAPTURE_BLOCK_SECONDS):
+    """Odpowiednik `open_input_stream` dla strumienia syntetycznego: (strumień, resampler)."""
+    resampler = StreamingResampler(requested_rate or SYNTHETIC_NATIVE_RATE)
+    stream = SyntheticInputStream(lambda indata: callback(resampler.process(indata), None),
+                                  resampler.input_rate, block_seconds)
+    return stream, resampler
+
+
+def measure_process_cpu(seconds):
+    """Zwraca średnie zużycie CPU procesu (w % jednego rdzenia) w zadanym oknie czasu."""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    time.sleep(seconds)
+    wall = time.perf_counter() - wall_start
+    return 100.0 * (time.process_time() - cpu_start) / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mierzy koszt CPU stale otwartego strumienia wejściowego.")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Czas każdego pomiaru w sekundach.")
+    parser.add_argument("--preroll", type=float, default=0.3, help="Długość bufora pre-roll w sekundach.")
+    parser.add_argument("--samplerate", type=int, default=0,
+                        help="Częstotliwość strumienia (0 = natywna urządzenia z przepróbkowaniem, 16000 = bez).")
+    parser.add_argument("--synthetic", action="store_true",
+                        help=f"Bloki syntetyczne zamiast urządzenia (--samplerate 0 = {SYNTHETIC_NATIVE_RATE} Hz).")
+    args = parser.parse_args()
+
+    print("--- Pomiar Kosztu Stałego Strumienia Audio ---")
+    print(f"Czas pomiaru: {args.seconds:.0f}s, blok: {CAPTURE_BLOCK_SECONDS * 1000:.0f} ms, pre-roll: {args.preroll:.2f}s"
+          + (", strumień syntetyczny" if args.synthetic else ""))
+
+    synthetic_streams = []
+    if args.synthetic:
+        def stream_factory(*stream_args):
+            stream, resampler = open_synthetic_stream(*stream_args)
+            synthetic_streams.append(stream)
+            return stream, resampler
+    else:
+        # Import sounddevice poza oknem pomiaru
+        import sounddevice  # noqa: F401
+        from src.resampler import open_input_stream as stream_factory
+
+    print("\n[1/2] Proces bez strumienia (punkt odniesienia)...")
+    baseline = measure_process_cpu(args.seconds)
+
+    print("[2/2] Proces z otwartym strumieniem i buforem pre-roll...")
+    try:
+        capture = PersistentAudioCapture(args.preroll, args.samplerate).start(stream_factory)
+    except Exception as e:
+        print(f"❌ Nie udało się otworzyć strumienia: {e}")
+        sys.exit(1)
+    try:
+        opened_at = time.perf_counter()
+        with_stream = measure_process_cpu(args.seconds)
+        stream_wall = time.perf_counter() - opened_at
+    finally:
+        capture.close()
+
+    per_callback = capture.callback_cpu_time / max(capture.callback_count, 1)
+    print("\n" + "=" * 60)
+    print(f"CPU procesu bez strumienia:      {baseline:.3f}% rdzenia")
+    print(f"CPU procesu z otwartym strumieniem: {with_stream:.3f}% rdzenia")
+    print(f"Narzut strumienia:                {with_stream - baseline:.3f}% rdzenia")
+    print(f"Sam callback (Python):            {capture.idle_cpu_percent():.3f}% rdzenia "
+          f"({capture.callback_count} wywołań, {per_callback * 1e6:.0f} µs na blok)")
+    for stream in synthetic_streams:
+        print(f"Przepróbkowanie + callback:       {100.0 * stream.path_cpu_time / stream_wall:.3f}% rdzenia "
+              f"({stream.path_cpu_time / max(capture.callback_count, 1) * 1e6:.0f} µs na blok)")
+    print("=" * 60)
+    if args.synthetic:
+        print("Uwaga: narzut obejmuje przepróbkowanie, callback z pre-rollem i wybudzenia wątku strumienia;")
+        print("koszt sterownika i serwera dźwięku (PipeWire/PulseAudio) zmierz bez --synthetic.")
+    else:
+        print("Uwaga: koszt po stronie serwera dźwięku (PipeWire/PulseAudio) nie jest tu uwzględniony;")
+        print("sprawdź go np. poleceniem 'top -p $(pidof pipewire)' w trakcie pomiaru.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# FILE: tools/metrics_report.py
+# Raport z ustrukturyzowanych metryk sesji (JSONL): percentyle p50/p95/p99 w zadanym okresie,
+# wpływ promptu, oszczędności z kompaktowania ciszy oraz porównanie dwóch rewizji konfiguracji.
+# Użycie:
+#   python tools/metrics_report.py [--file logs/sessions.jsonl] [--since 2025-10-01] [--until 2025-10-31] [--days 7]
+#   python tools/metrics_report.py --compare <rewizja_A> <rewizja_B>
+
+import argparse
+import datetime
+import json
+import os
+import sys
+
+# Dodaj katalog główny do ścieżki, aby umożliwić import
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from src.session_metrics import percentile, summarize, resolve_path
+from src.settings import SettingsError, load_settings
+
+# Metryki na poziomie sesji i na poziomie fragmentu
+SESSION_FIELDS = ('user_latency', 'paste_time', 'recording_duration', 'text_length', 'chunk_count')
+CHUNK_FIELDS = ('queue_wait', 'preprocessing_time', 'transcription_time', 'rtf')
+# Przedziały długości promptu [tokeny] do oceny jego wpływu na czas dekodowania
+PROMPT_TOKEN_BUCKETS = ((0, 0), (1, 15), (16, 31), (32, 63), (64, 223))
+
+
+def parse_time(value):
+    """Akceptuje datę (YYYY-MM-DD) lub pełny znacznik ISO; bez strefy = czas lokalny."""
+    parsed = datetime.datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.astimezone()
+
+
+def load_records(path, since=None, until=None):
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Pominięto uszkodzoną linię {line_number}", file=sys.stderr)
+                continue
+            timestamp = parse_time(record['timestamp'])
+            if since and timestamp < since:
+                continue
+            if until and timestamp >= until:
+                continue
+            records.append(record)
+    return records
+
+
+def compute_stats(records):
+    stats = {}
+    for name in SESSION_FIELDS:
+        stats[name] = summarize([r.get(name) for r in records])
+    chunks = [c for r in records for c in r.get('chunks', [])]
+    for name in CHUNK_FIELDS:
+        stats[f"chunk.{name}"] = summarize([c.get(name) for c in chunks])
+    reasons = {}
+    for r in records:
+        for reason, count in r.get('split_reasons', {}).items():
+            reasons[reason] = reasons.get(reason, 0) + count
+    return stats, reasons
+
+
+def fmt(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def print_stats(title, records):
+    stats, reasons = compute_stats(records)
+    print(f"\n--- {title} ({len(records)} sesji) ---")
+    print(f"{'metryka':<28}{'n':>6}{'średnia':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, s in stats.items():
+        print(f"{name:<28}{s['count']:>6}{fmt(s['mean']):>10}{fmt(s['p50']):>10}{fmt(s['p95']):>10}{fmt(s['p99']):>10}")
+    if reasons:
+        print("Przyczyny cięcia: " + ", ".join(f"{k}={v}" for k, v in sorted(reasons.items())))
+
+
+def print_prompt_effect(records):
+    """RTF fragmentów według długości promptu (fragmenty bez pola prompt_tokens są pomijane)."""
+    chunks = [c for r in records for c in r.get('chunks', []) if c.get('prompt_tokens') is not None]
+    if not chunks:
+        return
+    print(f"\n--- RTF fragmentu wg długości promptu ({len(chunks)} fragmentów) ---")
+    print(f"{'prompt [tokeny]':<28}{'n':>6}{'średnia':>10}{'p50':>10}{'p95':>10}")
+    for low, high in PROMPT_TOKEN_BUCKETS:
+        s = summarize([c['rtf'] for c in chunks if low <= c['prompt_tokens'] <= high])
+        if s['count']:
+            label = f"{low}" if low == high else f"{low}-{high}"
+            print(f"{label:<28}{s['count']:>6}{fmt(s['mean']):>10}{fmt(s['p50']):>10}{fmt(s['p95']):>10}")
+
+
+def print_silence_savings(records):
+    """Oszczędności z kompaktowania ciszy i pomijania fragmentów bez mowy (sesje z polem silence_removed_seconds)."""
+    records = [r for r in records if 'silence_removed_seconds' in r]
+    if not records:
+        return
+    recorded = sum(c['duration'] for r in records for c in r.get('chunks', []))
+    removed = sum(r['silence_removed_seconds'] for r in records)
+    skipped = sum(r.get('skipped_seconds', 0.0) for r in records)
+    print(f"\n--- Cisza przed modelem ({len(records)} sesji, {recorded:.0f}s audio we fragmentach) ---")
+    print(f"Usunięta cisza: {removed:.1f}s, pominięte fragmenty bez mowy: {sum(r.get('skipped_chunks', 0) for r in records)} "
+          f"({skipped:.1f}s) – razem {100.0 * (removed + skipped) / recorded if recorded else 0.0:.1f}% audio")
+    print(f"Szacowana oszczędność inferencji: {sum(r.get('inference_saved_seconds', 0.0) for r in records):.1f}s")
+
+
+CASCADE_BUCKETS = ((0.0, 3.0), (3.0, 6.0), (6.0, 10.0), (10.0, float('inf')))   # [s] Przedziały długości fragmentu
+
+
+def print_cascade(records):
+    """Kaskada szkic/model główny: latencje i WER szkicu wg długości fragmentu (fragmenty z polem draft_latency)."""
+    chunks = [c for r in records for c in r.get('chunks', []) if 'draft_latency' in c]
+    if not chunks:
+        return
+    print(f"\n--- Podgląd z modelu szkicu ({len(chunks)} fragm.; pominięte/spóźnione: {sum(r.get('draft_missing', 0) for r in records)}) ---")
+    print(f"{'długość fragmentu':<20}{'n':>6}{'szkic p50':>11}{'główny p50':>12}{'WER szkicu':>12}")
+    for low, high in CASCADE_BUCKETS:
+        bucket = [c for c in chunks if low < c['duration'] <= high]
+        if not bucket:
+            continue
+        words = sum(c['final_words'] for c in bucket)
+        wer = sum(c['draft_wer'] * c['final_words'] for c in bucket) / words if words else None
+        name = f"{low:.0f}-{high:.0f}s" if high != float('inf') else f">{low:.0f}s"
+        print(f"{name:<20}{len(bucket):>6}{fmt(percentile([c['draft_latency'] for c in bucket], 50)):>11}"
+              f"{fmt(percentile([c['final_latency'] for c in bucket], 50)):>12}{(f'{wer:.1%}' if wer is not None else '-'):>12}")
+
+
+def print_comparison(records, revision_a, revision_b):
+    groups = {rev: [r for r in records if r.get('config_revision') == rev] for rev in (revision_a, revision_b)}
+    stats_a, _ = compute_stats(groups[revision_a])
+    stats_b, _ = compute_stats(groups[revision_b])
+    print(f"\n--- Porównanie rewizji: A={revision_a} ({len(groups[revision_a])} sesji) vs B={revision_b} ({len(groups[revision_b])} sesji) ---")
+    print(f"{'metryka':<28}{'p50 A':>9}{'p50 B':>9}{'p95 A':>9}{'p95 B':>9}{'Δp95':>9}{'p99 A':>9}{'p99 B':>9}")
+    for name in stats_a:
+        a, b = stats_a[name], stats_b[name]
+        delta = "-"
+        if a['p95'] is not None and b['p95'] is not None and a['p95'] != 0:
+            delta = f"{100.0 * (b['p95'] - a['p95']) / a['p95']:+.1f}%"
+        print(f"{name:<28}{fmt(a['p50']):>9}{fmt(b['p50']):>9}{fmt(a['p95']):>9}{fmt(b['p95']):>9}{delta:>9}{fmt(a['p99']):>9}{fmt(b['p99']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raport percentyli z metryk sesji dyktowania.")
+    parser.add_argument("--file", help="Plik JSONL z metrykami (domyślnie metrics_log_path z config.ini).")
+    parser.add_argument("--since", type=parse_time, help="Początek okresu (ISO, włącznie).")
+    parser.add_argument("--until", type=parse_time, help="Koniec okresu (ISO, wyłącznie).")
+    parser.add_argument("--days", type=float, help="Ostatnie N dni (alternatywa dla --since).")
+    parser.add_argument("--compare", nargs=2, metavar=("REWIZJA_A", "REWIZJA_B"), help="Porównaj dwie rewizje konfiguracji.")
+    args = parser.parse_args()
+
+    path = args.file
+    if path is None:
+        try:
+            path = load_settings().metrics_log_path
+        except SettingsError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    path = resolve_path(path)
+    if not os.path.exists(path):
+        print(f"❌ BŁĄD: Brak pliku z metrykami: {path}")
+        sys.exit(1)
+
+    since = args.since
+    if args.days is not None:
+        since = datetime.datetime.now().astimezone() - datetime.timedelta(days=args.days)
+
+    records = load_records(path, since, args.until)
+    if not records:
+        print("Brak sesji w wybranym okresie.")
+        return
+
+    if args.compare:
+        print_comparison(records, *args.compare)
+        return
+
+    print_stats("Wszystkie sesje", records)
+    print_prompt_effect(records)
+    print_silence_savings(records)
+    print_cascade(records)
+    revisions = sorted({r.get('config_revision') for r in records})
+    if len(revisions) > 1:
+        print("\nRewizje konfiguracji w okresie: " + ", ".join(
+            f"{rev} ({sum(1 for r in records if r.get('config_revision') == rev)} sesji)" for rev in revisions))
+
+
+if __name__ == "__main__":
+    main()
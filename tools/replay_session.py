@@ -0,0 +1,84 @@
+# FILE: tools/replay_session.py
+# Odtwarzanie nagranej sesji (session_recording_dir lub session_archive_dir w config.ini) przez potok strumieniowy
+# bez mikrofonu, serwera X i GPU – do odtwarzania błędów i porównywania zmian w cięciu.
+# Wynik (granice fragmentów, teksty, latencje) jest wypisywany jako JSON, gotowy do diffowania.
+#
+# Użycie:
+#   python tools/replay_session.py logs/recordings/20251101-120000_ab12cd34ef56.npz
+#   python tools/replay_session.py logs/archive/20251101-120000_ab12cd34ef56.json
+#   python tools/replay_session.py --synthetic 60 --speed max --rtf 0.5 --no-timings
+#   python tools/replay_session.py nagranie.npz --model real --current-config
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Dodaj katalog główny do ścieżki, aby umożliwić import
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from src.session_recorder import load_recording
+from src.settings import load_settings, SettingsError
+from src.simulation import StubWhisperModel, synthetic_dictation, recording_from_audio, replay_recording
+
+TIMING_FIELDS = ('queue_wait', 'transcription_time', 'preprocessing_time')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Odtwarza nagraną sesję przez potok strumieniowy.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("recording", nargs='?', help="Plik .npz (SessionRecorder) lub wpis archiwum .json (SessionArchiver).")
+    source.add_argument("--synthetic", type=float, metavar="SEKUNDY", help="Zamiast nagrania użyj syntetycznego dyktowania o tej długości.")
+    parser.add_argument("--seed", type=int, default=0, help="Ziarno dla --synthetic i rozrzutu atrapy modelu.")
+    parser.add_argument("--speed", choices=('realtime', 'max'), default='realtime', help="Tempo podawania bloków.")
+    parser.add_argument("--model", choices=('stub', 'real'), default='stub', help="Atrapa o zadanym RTF lub prawdziwy model z ustawień.")
+    parser.add_argument("--rtf", type=float, default=0.2, help="RTF atrapy modelu.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Względny rozrzut czasu atrapy (odchylenie standardowe).")
+    parser.add_argument("--current-config", action="store_true", help="Użyj bieżącego config.ini zamiast ustawień zapisanych w nagraniu.")
+    parser.add_argument("--no-timings", action="store_true", help="Pomiń pola zależne od czasu (wynik deterministyczny, do diffowania).")
+    parser.add_argument("--output", help="Zapisz wynik do pliku zamiast na standardowe wyjście.")
+    parser.add_argument("--verbose", action="store_true", help="Pokaż logi potoku.")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        for name in ('app', 'transcription', 'performance', 'preprocessing'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    try:
+        current_settings = load_settings() if args.current_config or args.synthetic is not None else None
+    except SettingsError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.synthetic is not None:
+        recording = recording_from_audio(synthetic_dictation(args.synthetic, seed=args.seed), current_settings)
+    else:
+        recording = load_recording(args.recording)
+    settings = current_settings or recording.settings
+
+    if args.model == 'real':
+        from src.core_utils import create_model
+        model = create_model(settings)
+    else:
+        model = StubWhisperModel(rtf=args.rtf, jitter=args.jitter, seed=args.seed)
+
+    result = replay_recording(recording, settings, model, realtime=args.speed == 'realtime')
+    if args.no_timings:
+        for chunk in result['chunks']:
+            for name in TIMING_FIELDS:
+                chunk.pop(name)
+        for name in ('user_latency', 'compute_time', 'queue', 'inference_saved_seconds'):
+            result.pop(name)
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
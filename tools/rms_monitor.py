@@ -1,46 +1,52 @@
 # FILE: tools/rms_monitor.py
 # Narzędzie do pomiaru RMS (Root Mean Square - Głośności) w czasie rzeczywistym.
+# RMS jest liczony po przepróbkowaniu do 16 kHz – tak jak w aplikacji, więc wartości
+# można wprost przenieść do vad_rms_threshold.
+# Użycie: python tools/rms_monitor.py [--samplerate 0]
 
-import sounddevice as sd
+import argparse
+import os
 import numpy as np
 import sys
 import time
 
+# Dodaj katalog główny do ścieżki, aby umożliwić import
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.audio_preprocessing import SAMPLE_RATE
+from src.resampler import open_input_stream
+
 # --- Konfiguracja ---
-SAMPLE_RATE = 16000  # Częstotliwość próbkowania (musi być zgodna z projektem)
-CHANNELS = 1         # Mono
-BLOCK_SIZE = 1024    # Rozmiar bloku do przetwarzania (wpływa na responsywność)
+BLOCK_SECONDS = 0.064  # Długość bloku do przetwarzania (wpływa na responsywność; 1024 próbki przy 16 kHz)
 
 def calculate_rms(data):
     """Oblicza RMS (Root Mean Square) dla bloku danych audio."""
     # Używamy np.float32, jak w projekcie
     return np.sqrt(np.mean(data**2))
 
-def audio_callback(indata, frames, time, status):
-    """Callback wywoływany dla każdego bloku audio."""
+def audio_callback(block, status):
+    """Callback wywoływany dla każdego bloku audio (już w 16 kHz)."""
     if status:
         sys.stderr.write(f"Status strumienia: {status}\n")
     
     # Oblicz RMS
-    rms = calculate_rms(indata)
+    rms = calculate_rms(block)
     
     # Wyczyść linię i wyświetl wynik
     sys.stdout.write(f"\rRMS: {rms:.5f} | Mów teraz, aby zobaczyć pik. Milcz, aby zobaczyć szum tła.")
     sys.stdout.flush()
 
 def main():
+    parser = argparse.ArgumentParser(description="Monitor RMS (głośności) w czasie rzeczywistym.")
+    parser.add_argument("--samplerate", type=int, default=0, help="Częstotliwość strumienia w Hz (0 = natywna urządzenia).")
+    args = parser.parse_args()
+
     print("--- Monitor RMS (Głośności) w Czasie Rzeczywistym ---")
-    print(f"Częstotliwość próbkowania: {SAMPLE_RATE} Hz")
     print("Naciśnij Ctrl+C, aby zakończyć.")
     
     try:
-        with sd.InputStream(
-            samplerate=SAMPLE_RATE, 
-            channels=CHANNELS, 
-            dtype='float32', 
-            blocksize=BLOCK_SIZE,
-            callback=audio_callback
-        ):
+        stream, resampler = open_input_stream(audio_callback, args.samplerate, BLOCK_SECONDS)
+        print(f"Częstotliwość próbkowania: {resampler.input_rate} Hz (RMS liczony po przepróbkowaniu do {SAMPLE_RATE} Hz)")
+        with stream:
             # Pętla czeka na przerwanie przez użytkownika (Ctrl+C)
             while True:
                 time.sleep(0.1)
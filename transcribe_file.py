@@ -1,120 +1,321 @@
 # transcribe_file.py
-# Wersja 3.0: Zaimplementowano segmentowy system logowania.
+# Wersja 4.6: Eksperymentalne przyspieszenie fragmentów przed transkrypcją (time_compression, WSOLA);
+#             znaczniki czasu przeliczane z powrotem na oś oryginału.
+# Wersja 4.5: Opcja --daemon – inferencja fragmentów w działającym demonie (batch_jobs_port), w przerwach
+#             między dyktowaniem; plik jest dekodowany i cięty lokalnie, bez ładowania drugiego modelu.
+# Wersja 4.4: Fragmenty bez mowy są pomijane, długie cisze skracane przed transkrypcją (czasy segmentów
+#             przeliczane na oryginalne przez TimestampMap).
+# Wersja 4.3: Prompt z budżetem w tokenach (prompt_max_tokens, prompt_glossary) zamiast 50 znaków.
+# Wersja 4.2: Tryb --follow – transkrypcja pliku w trakcie nagrywania (record_raw.py).
+# Wersja 4.1: Tryb wsadowy – katalogi, wzorce glob i listy plików; model ładowany raz,
+#             pula wątków przygotowuje kolejne pliki, manifest pozwala wznowić przebieg.
+# Wersja 4.0: Strumieniowe dekodowanie (PyAV) zamiast librosa.load – plik jest dekodowany
+#             w blokach, cięty w ciszy i transkrybowany fragment po fragmencie, a segmenty
+#             trafiają na wyjście od razu. Pamięć nie zależy od długości pliku.
 
 import sys
 import os
 import time
 import argparse
-import configparser
-import librosa
-from faster_whisper import WhisperModel
+import glob
 import logging
 
 # Dodaj katalog główny do ścieżki, aby umożliwić import
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(ROOT_DIR)
 try:
+    from src.audio_io import AudioFileError, FOLLOW_IDLE_SECONDS, iter_audio_blocks, probe_duration
     from src.audio_preprocessing import apply_preprocessing_pipeline, SAMPLE_RATE
+    from src.batch_transcription import BatchInputError, BatchManifest, ChunkPrefetcher, MANIFEST_NAME, expand_inputs
+    from src.chunking import iter_silence_chunks
     from src.logger_setup import setup_loggers
+    from src.core_utils import load_configuration, load_model
+    from src.job_server import DaemonModel, JobServerError
+    from src.metrics_server import peak_rss_bytes
+    from src.prompt_context import PromptContext, model_tokenizer
+    from src.silence_compaction import compact_silence, has_speech
+    from src.time_stretch import time_compress
 except ImportError:
-    print("BŁĄD: Nie można zaimportować modułów. Upewnij się, że pliki src/audio_preprocessing.py i src/logger_setup.py istnieją.")
+    print("BŁĄD: Nie można zaimportować modułów. Upewnij się, że pliki w katalogu src/ istnieją.")
     sys.exit(1)
 
 # --- Inicjalizacja Loggerów ---
 app_logger = logging.getLogger('app')
 transcription_logger = logging.getLogger('transcription')
+performance_logger = logging.getLogger('performance')
 
-def load_configuration():
-    """Wczytuje konfigurację z pliku config.ini z podziałem na sekcje."""
-    config = configparser.ConfigParser()
-    config_path = os.path.join(ROOT_DIR, 'config.ini')
+def format_timestamp(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+def prepare_chunks(filepath, settings, preprocessing=True, follow=False, idle_timeout=FOLLOW_IDLE_SECONDS):
+    """
+    Generator fragmentów pliku gotowych do transkrypcji: (TimestampMap, audio, przyczyna cięcia).
+    Fragmenty bez mowy są pomijane, długie cisze skracane, a przy `time_compression > 1` fragment
+    jest przyspieszany (src/time_stretch.py); TimestampMap przelicza czasy
+    w fragmencie na czasy w pliku. Z `follow=True` plik jest czytany w trakcie zapisu (np. przez record_raw.py).
+    """
+    blocks = iter_audio_blocks(filepath, follow=follow, idle_timeout=idle_timeout)
+    for offset, chunk, split_reason, levels in iter_silence_chunks(blocks, settings, with_levels=True):
+        transcription_logger.info("🧠 Fragment od %s: %.2fs (Powód: %s)", format_timestamp(offset), len(chunk) / SAMPLE_RATE, split_reason)
+        if not has_speech(levels, settings):
+            transcription_logger.info("   -> Brak mowy (energia poniżej progu) – fragment pominięty.")
+            continue
+        chunk, timestamps = compact_silence(chunk, levels, settings, offset)
+        # Przyspieszenie przed preprocessingiem – jak w sesji i w procesie inferencji demona
+        if settings.time_compression > 1.0:
+            chunk = time_compress(chunk, settings.time_compression)
+            timestamps = timestamps.compressed(settings.time_compression)
+        if preprocessing:
+            chunk = apply_preprocessing_pipeline(chunk)
+        yield timestamps, chunk, split_reason
+
+def transcribe_chunks(model, settings, chunks):
+    """
+    Generator segmentów (początek [s], koniec [s], tekst) dla kolejnych fragmentów pliku.
+    Końcówka dotychczasowego tekstu (najwyżej `prompt_max_tokens` tokenów) jest promptem kolejnego fragmentu.
+    """
+    prompt_context = PromptContext(settings.prompt_max_tokens, model_tokenizer(model), settings.prompt_glossary)
+    language_logged = settings.model_language is not None
+    for timestamps, chunk, _ in chunks:
+        prompt = prompt_context.prompt()
+        decode_start_time = time.perf_counter()
+        segments_generator, info = model.transcribe(
+            chunk,
+            language=settings.model_language,
+            beam_size=settings.beam_size,
+            vad_filter=settings.vad_filter,
+            log_prob_threshold=settings.log_prob_threshold,
+            no_speech_threshold=settings.no_speech_threshold,
+            initial_prompt=prompt
+        )
+        if not language_logged:
+            transcription_logger.info(f"   -> Wykryto język: {info.language} (prawdopodobieństwo: {info.language_probability:.2f})")
+            language_logged = True
+
+        for segment in segments_generator:
+            prompt_context.append(segment.text)
+            yield timestamps.to_original(segment.start), timestamps.to_original(segment.end, end=True), segment.text
+        decode_duration = time.perf_counter() - decode_start_time
+        # Liczenie tokenów promptu tylko przy włączonym poziomie DEBUG
+        if performance_logger.isEnabledFor(logging.DEBUG):
+            performance_logger.debug("   -> RTF fragmentu: %.3f (prompt: %d tokenów)",
+                                     decode_duration / (len(chunk) / SAMPLE_RATE * timestamps.time_scale),
+                                     PromptContext.token_count(prompt))
+        del chunk
+
+def transcribe_stream(model, settings, filepath, preprocessing=True, follow=False, idle_timeout=FOLLOW_IDLE_SECONDS):
+    """
+    Generator segmentów (początek [s], koniec [s], tekst) dla pliku audio.
+    Dekodowanie, cięcie, preprocessing i transkrypcja odbywają się fragment po fragmencie.
+    """
+    return transcribe_chunks(model, settings, prepare_chunks(filepath, settings, preprocessing, follow, idle_timeout))
+
+class TranscriptWriter:
+    """Zapisuje segmenty na bieżąco (stdout lub plik), z opcjonalnymi znacznikami czasu."""
+
+    def __init__(self, stream, timestamps=False):
+        self.stream = stream
+        self.timestamps = timestamps
+        self.segments = 0
+
+    def write(self, start, end, text):
+        if self.timestamps:
+            self.stream.write(f"[{format_timestamp(start)} -> {format_timestamp(end)}] {text.strip()}\n")
+        else:
+            self.stream.write(text.lstrip() if self.segments == 0 else text)
+        self.stream.flush()
+        self.segments += 1
+
+    def finish(self):
+        if self.segments and not self.timestamps:
+            self.stream.write("\n")
+            self.stream.flush()
+
+def local_preprocessing(args, model):
+    """Preprocessing w tym procesie – chyba że wyłączony lub wykonuje go proces inferencji demona."""
+    return not args.no_preprocessing and not getattr(model, 'preprocesses_audio', False)
+
+def transcribe_single(args, app_settings, model):
+    """Jeden plik: segmenty na standardowe wyjście lub do --output."""
+    filepath = args.inputs[0]
+    # Długość śledzonego pliku nie jest jeszcze znana
+    duration = None if args.follow else probe_duration(filepath)
+    duration_info = f" ({format_timestamp(duration)})" if duration else ""
+    app_logger.info(f"\n--- Przetwarzanie pliku: {os.path.basename(filepath)}{duration_info} ---")
+    if args.follow:
+        app_logger.info(f"👀 Tryb --follow: plik jest czytany w trakcie zapisu; koniec po {args.follow_idle:g}s bez nowych danych.")
+
+    transcription_logger.info("\n🧠 Rozpoczynanie transkrypcji...")
+    transcription_logger.debug(f"   -> Używane parametry: VAD={app_settings.vad_filter}, LogProb={app_settings.log_prob_threshold}, NoSpeech={app_settings.no_speech_threshold}")
+
+    output_stream = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    if not args.output:
+        app_logger.info("\n" + "="*80)
+        app_logger.info("--- WYNIK TRANSKRYPCJI ---")
+        app_logger.info("="*80)
+    writer = TranscriptWriter(output_stream, timestamps=args.timestamps)
+    transcription_start_time = time.perf_counter()
+    first_output_time = None
+    audio_end = 0.0
     try:
-        config.read(config_path)
-        settings = {
-            'model_path': config.get('settings', 'model_path', fallback='medium'),
-            'device': config.get('settings', 'device', fallback='cuda'),
-            'language': config.get('settings', 'language', fallback='auto'),
-        }
-        settings.update({
-            'compute_type': config.get('advanced', 'compute_type', fallback='int8'),
-            'vad_filter': config.getboolean('advanced', 'vad_filter', fallback=True),
-            'log_prob_threshold': config.getfloat('advanced', 'log_prob_threshold', fallback=-1.0),
-            'no_speech_threshold': config.getfloat('advanced', 'no_speech_threshold', fallback=0.6),
-            'local_files_only': config.getboolean('advanced', 'local_files_only', fallback=True)
-        })
-        return settings
-    except Exception as e:
-        app_logger.error(f"Błąd wczytywania {config_path}: {e}")
+        segments = transcribe_stream(model, app_settings, filepath, preprocessing=local_preprocessing(args, model),
+                                     follow=args.follow, idle_timeout=args.follow_idle)
+        for start, end, text in segments:
+            writer.write(start, end, text)
+            audio_end = end
+            if first_output_time is None:
+                first_output_time = time.perf_counter() - transcription_start_time
+                performance_logger.info(f"⏱️ Czas do pierwszego wyniku: {first_output_time:.2f}s")
+        writer.finish()
+    except (AudioFileError, JobServerError) as e:
+        app_logger.error(f"❌ BŁĄD: {e}")
         sys.exit(1)
+    finally:
+        if args.output:
+            output_stream.close()
 
-def load_model(settings):
-    """Wczytuje i zwraca model Whisper na podstawie ustawień."""
-    app_logger.info(f"--- Ładowanie Modelu '{settings['model_path']}' ({settings['device']}, {settings['compute_type']}) ---")
-    start_time = time.time()
+    transcription_duration = time.perf_counter() - transcription_start_time
+    if not args.output:
+        app_logger.info("="*80)
+    transcription_logger.info(f"   -> Transkrypcja zakończona w {transcription_duration:.2f}s.")
+    audio_seconds = duration or audio_end
+    if audio_seconds:
+        performance_logger.info(f"   -> RTF: {transcription_duration / audio_seconds:.3f}, szczytowa pamięć procesu: {peak_rss_bytes() / 2**20:.0f} MB")
+    if args.output:
+        app_logger.info(f"✅ Transkrypcję zapisano w: {args.output}")
+
+def run_batch(args, app_settings, model, files):
+    """
+    Tryb wsadowy: model ładowany raz, kolejne pliki przygotowywane w puli wątków,
+    wyniki w --output-dir i manifest umożliwiający wznowienie przerwanego przebiegu.
+    """
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest = BatchManifest(os.path.join(args.output_dir, MANIFEST_NAME))
+    pending = [(path, name) for path, name in files if not manifest.is_done(path)]
+    output_names = dict(pending)
+    app_logger.info(f"\n--- Tryb wsadowy: {len(files)} plików, pominięto już przetworzone: {len(files) - len(pending)} ---")
+    if not pending:
+        return
+
+    def prepare(path):
+        return prepare_chunks(path, app_settings, preprocessing=local_preprocessing(args, model))
+
+    totals = {'audio': 0.0, 'done': 0, 'failed': 0}
+    batch_start_time = time.perf_counter()
+    prefetcher = ChunkPrefetcher([path for path, _ in pending], prepare, workers=args.workers)
     try:
-        model = WhisperModel(settings['model_path'], device=settings['device'], compute_type=settings['compute_type'], local_files_only=settings['local_files_only'])
-        app_logger.info(f"✅ Model załadowany w {time.time() - start_time:.2f}s.")
-        return model
-    except Exception as e:
-        app_logger.critical(f"❌ BŁĄD KRYTYCZNY: Nie udało się załadować modelu: {e}")
-        sys.exit(1)
+        for index, prepared in enumerate(prefetcher, start=1):
+            path, chunks = prepared.path, prepared.chunks()
+            name = output_names[path]
+            output_path = os.path.join(args.output_dir, os.path.splitext(name)[0] + ".txt")
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            app_logger.info(f"\n[{index}/{len(pending)}] {name}")
+
+            audio_seconds = [0.0]
+            def counted(chunks):
+                # Długość oryginalnego audio: fragment po kompaktowaniu (przed przyspieszeniem) + usunięta cisza
+                for item in chunks:
+                    audio_seconds[0] += len(item[1]) / SAMPLE_RATE * item[0].time_scale + item[0].removed_seconds
+                    yield item
+
+            file_start_time = time.perf_counter()
+            # Wynik powstaje w pliku .part – po przerwaniu niedokończony plik nie udaje gotowego
+            partial_path = output_path + ".part"
+            try:
+                with open(partial_path, 'w', encoding='utf-8') as output_stream:
+                    writer = TranscriptWriter(output_stream, timestamps=args.timestamps)
+                    for start, end, text in transcribe_chunks(model, app_settings, counted(chunks)):
+                        writer.write(start, end, text)
+                    writer.finish()
+                os.replace(partial_path, output_path)
+            except Exception as e:
+                prepared.cancel()
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                app_logger.error(f"❌ BŁĄD: {name}: {e}")
+                manifest.record(path, 'failed', error=str(e))
+                totals['failed'] += 1
+                continue
+
+            wall_seconds = time.perf_counter() - file_start_time
+            audio_seconds[0] = probe_duration(path) or audio_seconds[0] # Łącznie z pominiętymi fragmentami bez mowy
+            totals['audio'] += audio_seconds[0]
+            totals['done'] += 1
+            manifest.record(path, 'done', output=os.path.abspath(output_path), audio_seconds=round(audio_seconds[0], 2),
+                            wall_seconds=round(wall_seconds, 2), segments=writer.segments)
+            performance_logger.info(f"   -> {audio_seconds[0]:.0f}s audio w {wall_seconds:.1f}s (RTF {wall_seconds / max(audio_seconds[0], 1e-9):.3f})")
+    finally:
+        prefetcher.close()
+
+    wall_seconds = time.perf_counter() - batch_start_time
+    app_logger.info("\n" + "="*80)
+    app_logger.info(f"✅ Zakończono: {totals['done']} plików, błędy: {totals['failed']} (manifest: {manifest.path})")
+    performance_logger.info(f"   -> Przepustowość: {totals['audio'] / wall_seconds:.1f} h audio / h ({totals['audio'] / 3600:.2f} h audio w {wall_seconds / 3600:.2f} h), "
+                            f"szczytowa pamięć procesu: {peak_rss_bytes() / 2**20:.0f} MB")
+    app_logger.info("="*80)
 
 def main():
     setup_loggers()
 
-    parser = argparse.ArgumentParser(description="Dokonuje transkrypcji pliku audio przy użyciu modelu Whisper.")
-    parser.add_argument("filepath", help="Ścieżka do pliku audio do przetworzenia.")
+    parser = argparse.ArgumentParser(description="Dokonuje transkrypcji plików audio przy użyciu modelu Whisper.")
+    parser.add_argument("inputs", nargs='+', help="Plik audio, katalog, wzorzec glob lub @lista.txt (wiele = tryb wsadowy).")
     parser.add_argument("--no-preprocessing", action="store_true", help="Wyłącza potok przetwarzania wstępnego audio.")
+    parser.add_argument("-o", "--output", help="Zapisuj transkrypcję do pliku zamiast na standardowe wyjście (jeden plik).")
+    parser.add_argument("--output-dir", help="Katalog wyników i manifestu trybu wsadowego.")
+    parser.add_argument("--workers", type=int, default=2, help="Liczba plików przygotowywanych równolegle z transkrypcją (tryb wsadowy).")
+    parser.add_argument("--timestamps", action="store_true", help="Jeden segment na linię ze znacznikami czasu.")
+    parser.add_argument("--follow", action="store_true", help="Transkrybuj plik w trakcie zapisu (np. nagrywany przez record_raw.py).")
+    parser.add_argument("--follow-idle", type=float, default=FOLLOW_IDLE_SECONDS, help="Sekundy bez nowych danych kończące tryb --follow.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Transkrybuj modelem działającego demona (batch_jobs_port) w przerwach między dyktowaniem.")
     args = parser.parse_args()
 
-    if not os.path.exists(args.filepath):
-        app_logger.error(f"❌ BŁĄD: Plik nie istnieje: {args.filepath}")
+    first_input = args.inputs[0]
+    batch_mode = (args.output_dir is not None or len(args.inputs) > 1 or os.path.isdir(first_input)
+                  or first_input.startswith('@') or glob.has_magic(first_input))
+    if batch_mode and args.follow:
+        app_logger.error("❌ BŁĄD: --follow działa tylko dla pojedynczego pliku.")
         sys.exit(1)
-
-    app_settings = load_configuration()
-    model = load_model(app_settings)
-
-    app_logger.info(f"\n--- Przetwarzanie pliku: {os.path.basename(args.filepath)} ---")
-    try:
-        audio_data, _ = librosa.load(args.filepath, sr=SAMPLE_RATE, mono=True)
-    except Exception as e:
-        app_logger.error(f"❌ BŁĄD: Nie udało się wczytać pliku audio: {e}")
+    if batch_mode:
+        if args.output_dir is None:
+            app_logger.error("❌ BŁĄD: Tryb wsadowy (katalog, wzorzec, lista lub wiele plików) wymaga --output-dir.")
+            sys.exit(1)
+        try:
+            files = expand_inputs(args.inputs)
+        except (BatchInputError, OSError) as e:
+            app_logger.error(f"❌ BŁĄD: {e}")
+            sys.exit(1)
+        if not files:
+            app_logger.error("❌ BŁĄD: Nie znaleziono plików audio.")
+            sys.exit(1)
+    elif not os.path.exists(args.inputs[0]):
+        app_logger.error(f"❌ BŁĄD: Plik nie istnieje: {args.inputs[0]}")
         sys.exit(1)
 
-    if not args.no_preprocessing:
-        audio_data = apply_preprocessing_pipeline(audio_data)
+    app_settings = load_configuration()
+    if args.daemon:
+        if not app_settings.batch_jobs_port:
+            app_logger.error("❌ BŁĄD: --daemon wymaga batch_jobs_port > 0 w config.ini (i działającego main_streaming.py).")
+            sys.exit(1)
+        try:
+            model = DaemonModel(app_settings.batch_jobs_port)
+        except JobServerError as e:
+            app_logger.error(f"❌ BŁĄD: {e}")
+            sys.exit(1)
+        app_logger.info(f"📥 Inferencja w demonie ({model.url}); dyktowanie ma pierwszeństwo przed tym zadaniem.")
     else:
+        model = load_model(app_settings)
+    if args.no_preprocessing:
         app_logger.info("🔊 Przetwarzanie wstępne audio pominięte (opcja --no-preprocessing).")
 
-    transcription_logger.info("\n🧠 Rozpoczynanie transkrypcji...")
-    transcription_logger.debug(f"   -> Używane parametry: VAD={app_settings['vad_filter']}, LogProb={app_settings['log_prob_threshold']}, NoSpeech={app_settings['no_speech_threshold']}")
-    transcription_start_time = time.time()
-    
-    language_for_model = None if app_settings['language'].lower() == 'auto' else app_settings['language']
-    
-    segments_generator, info = model.transcribe(
-        audio_data,
-        language=language_for_model,
-        beam_size=5,
-        vad_filter=app_settings['vad_filter'],
-        log_prob_threshold=app_settings['log_prob_threshold'],
-        no_speech_threshold=app_settings['no_speech_threshold']
-    )
-
-    if language_for_model is None:
-        transcription_logger.info(f"   -> Wykryto język: {info.language} (prawdopodobieństwo: {info.language_probability:.2f})")
-
-    final_text = "".join(segment.text for segment in segments_generator).strip()
-    transcription_duration = time.time() - transcription_start_time
-    
-    transcription_logger.info(f"   -> Transkrypcja zakończona w {transcription_duration:.2f}s.")
-
-    app_logger.info("\n" + "="*80)
-    app_logger.info("--- WYNIK TRANSKRYPCJI ---")
-    app_logger.info("="*80)
-    # Używamy print dla samego wyniku, aby ułatwić przekierowanie strumienia
-    print(final_text)
-    app_logger.info("="*80)
+    if batch_mode:
+        run_batch(args, app_settings, model, files)
+    else:
+        transcribe_single(args, app_settings, model)
+    if args.daemon:
+        performance_logger.info(f"   -> Oczekiwanie na model demona (sesje dyktowania): {model.waited:.1f}s")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()